@@ -0,0 +1,305 @@
+"""
+Headless batch solving of a question bank.
+
+    python -m agents.batch_runner problems.jsonl -o solved.jsonl --concurrency 8
+    python -m agents.batch_runner problems.csv --fake-server      # offline dry run
+
+Input is JSONL or CSV with a problem / question / text field and an optional
+id (default: the row number, "row-1", "row-2", ...), read as a stream. Every result is
+appended to the output JSONL as soon as it finishes. The output doubles as
+the checkpoint: re-running the same command skips ids already solved there
+and retries the ones that failed. Problems found in the memory store or the
+solution cache are answered without an LLM call. Answers from the cache or
+the LLM go through the local answer checker first: one it refutes is
+written as "rejected", dropped from the cache and retried on the next run.
+"""
+import csv
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from agents.groq_solver import GroqSolver
+
+PROBLEM_FIELDS = ("problem", "question", "text")
+
+
+def iter_problems(path: str) -> Iterator[tuple]:
+    """
+    Yield (id, problem) from a JSONL or CSV file without reading it whole.
+    Rows without an id get their row number, so every row has its own output
+    even when two problems normalize to the same cache key.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if Path(path).suffix.lower() == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, 1):
+            if isinstance(row, str):
+                row = {"problem": row}
+            problem = next((row[k] for k in PROBLEM_FIELDS if row.get(k)), None)
+            if problem:
+                yield str(row.get("id") or f"row-{number}"), problem
+
+
+def load_checkpoint(output_path: str) -> set:
+    """Ids with a solved result in an existing output file"""
+    done = set()
+    if not Path(output_path).exists():
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line of an interrupted run
+            if record.get("status") == "solved":
+                done.add(record["id"])
+    return done
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def _retryable(error: Exception) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Connection resets and timeouts; the Groq and OpenAI SDKs share these names
+    return isinstance(error, (ConnectionError, TimeoutError)) or \
+        type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Server-requested delay in seconds, from retry-after-ms / retry-after headers"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class Backoff:
+    """
+    Shared, adaptive pacing for rate limits.
+
+    A 429 on any worker pauses new requests on all of them and widens the gap
+    enforced between request starts; successes narrow it again. Workers
+    settle just under the provider's limit instead of hammering it in
+    lockstep. Only the first 429 of each burst widens the gap: requests that
+    were already in flight when it arrived say nothing new about the rate.
+    """
+
+    def __init__(self, base: float = 1.0, cap: float = 60.0, min_interval: float = 0.005):
+        self.base = base
+        self.cap = cap
+        self.min_interval = min_interval
+        self.interval = 0.0
+        self._next = 0.0
+        self._penalized_at = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(self.cap, retry_after) * random.uniform(1.0, 1.2)
+        # Full jitter keeps workers from retrying in lockstep
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def acquire(self) -> float:
+        """Wait for this worker's start slot; returns the start time"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return start
+
+    def penalize(self, started: float, attempt: int, retry_after: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            if started >= self._penalized_at:
+                self.interval = min(self.cap, max(self.min_interval, self.interval * 2))
+                self._penalized_at = now
+            self._next = max(self._next, now + self.delay(attempt, retry_after))
+
+    def success(self):
+        with self._lock:
+            self.interval = self.interval * 0.995 if self.interval > self.min_interval else 0.0
+
+
+class BatchRunner:
+    """Solve many problems through GroqSolver with at most `concurrency` requests in flight"""
+
+    def __init__(self,
+                 solver: GroqSolver,
+                 memory=None,
+                 checker=None,
+                 concurrency: int = 8,
+                 max_retries: int = 6,
+                 backoff: Optional[Backoff] = None,
+                 progress_every: int = 100):
+        self.solver = solver
+        self.memory = memory
+        self.checker = checker
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff or Backoff()
+        self.progress_every = progress_every
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def solve_one(self, item_id: str, problem: str) -> dict:
+        record = {"id": item_id, "problem": problem}
+        if self.memory is not None:
+            remembered = self.memory.find_exact(problem)
+            if remembered:
+                return {**record, "status": "solved", "source": "memory", "solution": remembered["solution"]}
+        if self.solver.cache is not None:
+            cached = self.solver.cache.get(self.solver.cache_key(problem))
+            if cached is not None:
+                return self._checked(record, problem, cached, "cache")
+
+        for attempt in range(self.max_retries + 1):
+            started = self.backoff.acquire()
+            try:
+                result = self.solver.solve(problem)
+            except Exception as e:
+                if not _retryable(e) or attempt == self.max_retries:
+                    return {**record, "status": "error", "error": f"{type(e).__name__}: {e}", "attempts": attempt + 1}
+                if _status_code(e) == 429:
+                    self._count("rate_limited")
+                    self.backoff.penalize(started, attempt, _retry_after(e))
+                else:
+                    time.sleep(self.backoff.delay(attempt))
+                self._count("retries")
+                continue
+
+            self.backoff.success()
+            source = "cache" if result["cached"] else "shared" if result["shared"] else "llm"
+            return self._checked(record, problem, result["solution"], source,
+                                 total_s=round(result["total_s"], 3), attempts=attempt + 1)
+
+    def _checked(self, record: dict, problem: str, solution: str, source: str, **extra) -> dict:
+        """The solved record, or a rejected one (and the cache entry dropped) if the checker refutes the answer"""
+        verdict = self.checker.verify(problem, solution) if self.checker is not None else None
+        if verdict is not None and not verdict["is_correct"]:
+            self.solver.forget(problem)
+            return {**record, "status": "rejected", "issues": verdict["issues"], **extra}
+        # The caller that started a shared generation saves it
+        if self.memory is not None and source == "llm":
+            self.memory.save_attempt(problem, solution, verified=verdict is not None)
+        return {**record, "status": "solved", "source": source, "solution": solution, **extra}
+
+    def _write(self, out, futures):
+        for future in futures:
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._count(record.get("source", record["status"]))
+            self._count("finished")
+        out.flush()
+        if self.progress_every and self.stats["finished"] // self.progress_every != \
+                (self.stats["finished"] - len(futures)) // self.progress_every:
+            print(f"  {self.stats['finished']} done ({dict(self.stats)})", file=sys.stderr)
+
+    def run(self, items: Iterable[tuple], output_path: str) -> dict:
+        """Solve (id, problem) items, appending results to output_path; returns counters"""
+        start = time.perf_counter()
+        done = load_checkpoint(output_path)
+        seen = set()
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'a', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = set()
+            for item_id, problem in items:
+                if item_id in seen:
+                    self._count("duplicate_ids")
+                    continue
+                if item_id in done:
+                    self._count("skipped")
+                    continue
+                seen.add(item_id)
+                # Bounded window: the input is never read far ahead of the workers
+                if len(pending) >= 2 * self.concurrency:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._write(out, finished)
+                pending.add(pool.submit(self.solve_one, item_id, problem))
+            if pending:
+                self._write(out, wait(pending)[0])
+        if self.stats["duplicate_ids"]:
+            print(f"⚠️ Skipped {self.stats['duplicate_ids']} row(s) whose id was already used earlier in the input",
+                  file=sys.stderr)
+        self.stats["elapsed_s"] = round(time.perf_counter() - start, 2)
+        return dict(self.stats)
+
+
+def main():
+    import argparse
+    import os
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="problems as .jsonl or .csv")
+    parser.add_argument("-o", "--output", default=None, help="results JSONL (default: <input>.solved.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint instead of Groq's")
+    parser.add_argument("--no-memory", action="store_true", help="neither consult nor update the memory store")
+    parser.add_argument("--no-verify", action="store_true", help="accept answers without the local answer checker")
+    parser.add_argument("--fake-server", action="store_true",
+                        help="solve against a local fake LLM server, with a throwaway cache and memory store")
+    parser.add_argument("--fake-latency", type=float, default=0.2)
+    parser.add_argument("--fake-rps", type=float, default=None, help="fake server rate limit (requests/s)")
+    args = parser.parse_args()
+
+    from groq import Groq
+    from agents.registry import get_memory_manager, get_solution_cache, get_symbolic_verifier
+
+    output = args.output or str(Path(args.input).with_suffix(".solved.jsonl"))
+    server = None
+    if args.fake_server:
+        from memory.memory_manager import MemoryManager
+        from utils.cache import TieredCache
+        from utils.fake_llm import FakeLLMServer
+
+        server = FakeLLMServer(latency=args.fake_latency, rate_limit_rps=args.fake_rps).start()
+        scratch = tempfile.mkdtemp(prefix="batch_runner_")
+        client = Groq(api_key="fake", base_url=server.url, max_retries=0)
+        cache = TieredCache(os.path.join(scratch, "solutions.sqlite3"))
+        memory = None if args.no_memory else MemoryManager(os.path.join(scratch, "memory"))
+    else:
+        # Retries are ours (shared backoff), not the SDK's per-request ones
+        client = Groq(api_key=os.getenv("GROQ_API_KEY"), base_url=args.base_url, max_retries=0)
+        cache = get_solution_cache()
+        memory = None if args.no_memory else get_memory_manager()
+
+    from utils.single_flight import SingleFlight
+    # Duplicate problems under different ids share one completion
+    runner = BatchRunner(GroqSolver(client, cache=cache, single_flight=SingleFlight()), memory=memory,
+                         checker=None if args.no_verify else get_symbolic_verifier(),
+                         concurrency=args.concurrency, max_retries=args.max_retries)
+    try:
+        stats = runner.run(iter_problems(args.input), output)
+    finally:
+        if server is not None:
+            server.stop()
+    print(json.dumps({**stats, **({"server": server.stats} if server else {})}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,11 @@
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
+from agents.registry import get_chat_model
 import json
 
 class ExplainerAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4-turbo", temperature=0.5)  # Allow clarity
-    
-    def explain(self, problem: str, solution: dict):
-        """Create student-friendly explanation"""
-        prompt = PromptTemplate(
+        self.llm = get_chat_model("gpt-4-turbo", temperature=0.5)  # Allow clarity
+        self.prompt = PromptTemplate(
             input_variables=["problem", "solution"],
             template="""Create a clear, student-friendly explanation.
 
@@ -25,11 +22,23 @@ Write:
 
 Use simple language. Explain every step."""
         )
-        
-        chain = prompt | self.llm
+    
+    def explain(self, problem: str, solution: dict):
+        """Create student-friendly explanation"""
+        chain = self.prompt | self.llm
         response = chain.invoke({
             "problem": problem,
             "solution": json.dumps(solution, indent=2)
         })
         
         return response.content
+    
+    async def aexplain(self, problem: str, solution: dict):
+        """Async variant of explain() for the concurrent pipeline"""
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke({
+            "problem": problem,
+            "solution": json.dumps(solution, indent=2)
+        })
+        
+        return response.content
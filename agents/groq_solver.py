@@ -0,0 +1,193 @@
+import hashlib
+import json
+import time
+from typing import Callable, Optional
+
+from utils.cache import TieredCache
+from utils.single_flight import SingleFlight
+from utils.tracing import span
+
+SOLVER_MODEL = "llama-3.3-70b-versatile"
+# Bump whenever SOLVER_PROMPT changes so cached answers from the old prompt are not reused
+PROMPT_VERSION = 1
+SOLVER_PROMPT = """
+You are an expert math tutor solving JEE-style problems.
+Solve this problem step by step:
+
+Problem: {problem}
+
+Provide:
+1. Problem understanding
+2. Solution strategy
+3. Step-by-step solution
+4. Final answer
+5. Verification
+"""
+
+
+class GroqSolver:
+    """
+    Solve a problem with the Groq chat model, behind an optional solution cache.
+
+    With a shared SingleFlight, concurrent requests for the same problem (same
+    cache key) ride on one upstream completion instead of each paying for it.
+    """
+
+    def __init__(self,
+                 client,
+                 cache: Optional[TieredCache] = None,
+                 model: str = SOLVER_MODEL,
+                 temperature: float = 0.7,
+                 max_tokens: int = 1024,
+                 single_flight: Optional[SingleFlight] = None):
+        self.client = client
+        self.cache = cache
+        self.single_flight = single_flight
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def cache_key(self, problem: str) -> str:
+        """Key over everything that changes the completion: problem, model, prompt and sampling"""
+        material = json.dumps({
+            # The problem exactly as messages() sends it, up to whitespace
+            "problem": " ".join(problem.split()),
+            "model": self.model,
+            "prompt_version": PROMPT_VERSION,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def forget(self, problem: str):
+        """Drop the cached solution for problem, e.g. once a verifier has refuted it"""
+        if self.cache is not None:
+            self.cache.delete(self.cache_key(problem))
+
+    def messages(self, problem: str) -> list:
+        return [{"role": "user", "content": SOLVER_PROMPT.format(problem=problem)}]
+
+    def solve(self, problem: str, on_token: Optional[Callable[[str], None]] = None) -> dict:
+        """
+        Return {"solution", "cached", "shared", "ttft_s", "total_s"}.
+
+        With on_token, the completion is streamed and on_token is called with
+        the accumulated markdown after every chunk, so the UI can render it
+        while the model is still generating. shared is True when the answer
+        came from another caller's in-flight completion.
+        """
+        with span("llm.solve", model=self.model) as s:
+            result = self._solve(problem, on_token)
+            s.set("cached", result["cached"])
+            s.set("shared", result["shared"])
+            return result
+
+    def _solve(self, problem: str, on_token: Optional[Callable[[str], None]]) -> dict:
+        start = time.perf_counter()
+        key = self.cache_key(problem) if self.cache is not None or self.single_flight is not None else None
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached)
+                elapsed = time.perf_counter() - start
+                return {"solution": cached, "cached": True, "shared": False, "ttft_s": elapsed, "total_s": elapsed}
+
+        if self.single_flight is not None:
+            return self._solve_coalesced(problem, key, on_token, start)
+
+        if on_token is None:
+            with span("llm", model=self.model, stream=False) as s:
+                completion = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self.messages(problem),
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+                solution_text = completion.choices[0].message.content
+                ttft = time.perf_counter() - start
+                _record_usage(s, getattr(completion, "usage", None))
+        else:
+            solution_text, ttft = self._stream(problem, on_token, start)
+
+        if self.cache is not None and solution_text:
+            self.cache.set(key, solution_text)
+        return {
+            "solution": solution_text,
+            "cached": False,
+            "shared": False,
+            "ttft_s": ttft,
+            "total_s": time.perf_counter() - start,
+        }
+
+    def _solve_coalesced(self, problem: str, key: str, on_token: Optional[Callable[[str], None]],
+                         start: float) -> dict:
+        first_token = []
+
+        def on_update(text: str):
+            if not first_token:
+                first_token.append(time.perf_counter() - start)
+            if on_token is not None:
+                on_token(text)
+
+        def generate(emit: Callable[[str], None]) -> str:
+            # A flight that just finished may have filled the cache after our first lookup
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                emit(cached)
+                return cached
+            # Always streamed upstream so callers that attach mid-generation can follow along
+            solution_text, _ = self._stream(problem, emit, time.perf_counter())
+            # Cached before the flight closes: later arrivals find it in one place or the other
+            if self.cache is not None and solution_text:
+                self.cache.set(key, solution_text)
+            return solution_text
+
+        solution_text, shared = self.single_flight.do(key, generate, on_update)
+        total = time.perf_counter() - start
+        return {
+            "solution": solution_text,
+            "cached": False,
+            "shared": shared,
+            "ttft_s": first_token[0] if first_token else total,
+            "total_s": total,
+        }
+
+    def _stream(self, problem: str, on_token: Callable[[str], None], start: float) -> tuple:
+        with span("llm", model=self.model, stream=True) as s:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=self.messages(problem),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True,
+            )
+
+            parts = []
+            ttft = None
+            usage = None
+            for chunk in stream:
+                # Groq sends usage on the final chunk under x_groq, OpenAI-style servers as chunk.usage
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                    s.set("ttft_ms", round(ttft * 1000, 1))
+                parts.append(content)
+                on_token("".join(parts))
+            _record_usage(s, usage)
+
+        return "".join(parts), ttft if ttft is not None else time.perf_counter() - start
+
+
+def _record_usage(s, usage):
+    if usage is None:
+        return
+    for name in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if value is not None:
+            s.set(name, int(value))
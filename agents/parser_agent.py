@@ -1,7 +1,10 @@
 import json
-from langchain_openai import ChatOpenAI
+from typing import Optional
 from langchain.prompts import PromptTemplate
+from agents.registry import get_chat_model, get_symbolic_solver
+from agents.rule_parser import rule_parse
 from pydantic import BaseModel
+from utils.tracing import span
 
 class ParsedProblem(BaseModel):
     problem_text: str
@@ -12,9 +15,16 @@ class ParsedProblem(BaseModel):
     needs_clarification: bool
     clarification_questions: list[str]
 
+class ParsedWorksheet(BaseModel):
+    problems: list[ParsedProblem]
+
 class ParserAgent:
-    def __init__(self, model: str = "gpt-4-turbo"):
-        self.llm = ChatOpenAI(model=model, temperature=0)
+    def __init__(self, model: str = "gpt-4-turbo", rule_based: bool = True):
+        self.llm = get_chat_model(model, temperature=0)
+        # Well-formed input is parsed locally (agents.rule_parser); only the rest costs an LLM call
+        self.rule_based = rule_based
+        self.symbolic = get_symbolic_solver() if rule_based else None
+        self.stats = {"local": 0, "llm": 0}
         self.prompt = PromptTemplate(
             input_variables=["raw_input"],
             template="""You are a precise math problem parser.
@@ -37,23 +47,90 @@ Return ONLY valid JSON (no markdown):
     "additional_context": "any assumptions or context",
     "needs_clarification": false,
     "clarification_questions": []
+}}"""
+        )
+        self.split_prompt = PromptTemplate(
+            input_variables=["raw_input"],
+            template="""You are a precise math worksheet parser.
+
+Raw input (from OCR/ASR/typing), possibly several questions:
+{raw_input}
+
+Task:
+1. Find where each separate question starts and ends (sub-parts stay with their question)
+2. Parse each question as a separate problem, repeating shared instructions in each
+3. Keep the questions in their original order
+
+Return ONLY valid JSON (no markdown):
+{{
+    "problems": [
+        {{
+            "problem_text": "cleaned statement of one question",
+            "topic": "algebra|probability|calculus|linear_algebra",
+            "variables": ["x"],
+            "constraints": [],
+            "additional_context": "",
+            "needs_clarification": false,
+            "clarification_questions": []
+        }}
+    ]
 }}"""
         )
     
     def parse(self, raw_input: str) -> ParsedProblem:
         """Parse raw input into structured problem"""
-        chain = self.prompt | self.llm
+        parsed = self._parse_locally(raw_input)
+        if parsed is not None:
+            return parsed
+        with span("parse", method="llm"):
+            chain = self.prompt | self.llm
+            response = chain.invoke({"raw_input": raw_input})
+            return self._to_parsed(response.content)
+
+    async def aparse(self, raw_input: str) -> ParsedProblem:
+        """Async variant of parse() for the concurrent pipeline"""
+        parsed = self._parse_locally(raw_input)
+        if parsed is not None:
+            return parsed
+        with span("parse", method="llm"):
+            chain = self.prompt | self.llm
+            response = await chain.ainvoke({"raw_input": raw_input})
+            return self._to_parsed(response.content)
+
+    def _parse_locally(self, raw_input: str) -> Optional[ParsedProblem]:
+        if self.rule_based:
+            with span("parse", method="rules") as s:
+                fields = rule_parse(raw_input, self.symbolic)
+                s.set("confident", fields is not None)
+            if fields is not None:
+                self.stats["local"] += 1
+                return ParsedProblem(**fields)
+        self.stats["llm"] += 1
+        return None
+
+    def split(self, raw_input: str) -> list[ParsedProblem]:
+        """Parse input holding one or more questions into one structured problem per question"""
+        chain = self.split_prompt | self.llm
         response = chain.invoke({"raw_input": raw_input})
-        
+        return ParsedWorksheet(**self._json(response.content)).problems
+
+    def _to_parsed(self, content: str) -> ParsedProblem:
+        return ParsedProblem(**self._json(content))
+
+    def _json(self, content: str) -> dict:
         try:
-            parsed = json.loads(response.content)
-            return ParsedProblem(**parsed)
+            return json.loads(content)
         except json.JSONDecodeError:
-            # Fallback: extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response.content, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
-                return ParsedProblem(**parsed)
-            else:
-                raise ValueError(f"Failed to parse: {response.content}")
+            # Fallback: the first JSON object in the response (markdown fences, text around it).
+            # raw_decode stops at the end of the object, where a greedy {.*} would run to the last brace
+            decoder = json.JSONDecoder()
+            start = content.find("{")
+            while start != -1:
+                try:
+                    parsed, _ = decoder.raw_decode(content, start)
+                    if isinstance(parsed, dict):
+                        return parsed
+                except json.JSONDecodeError:
+                    pass
+                start = content.find("{", start + 1)
+            raise ValueError(f"Failed to parse: {content}")
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Optional
+
+from utils.tracing import span
+
+
+class PipelineStage:
+    """
+    One node of the agent DAG.
+
+    `run` is an async function receiving the dict of results so far (pipeline
+    inputs plus every finished stage, keyed by stage name). The stage starts as
+    soon as all of `deps` have finished.
+    """
+
+    def __init__(self,
+                 name: str,
+                 run: Callable[[dict], Awaitable],
+                 deps: tuple = (),
+                 timeout: Optional[float] = None,
+                 required: bool = True):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.required = required
+
+
+class PipelineTimeout(Exception):
+    pass
+
+
+class PipelineRunner:
+    """Run a DAG of agent stages concurrently with asyncio"""
+
+    def __init__(self, stages: list):
+        self.stages = {stage.name: stage for stage in stages}
+        self._check_graph()
+
+    def _check_graph(self):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self, inputs: dict) -> dict:
+        """
+        Execute every stage and return:
+        {"results", "errors", "timings", "critical_path", "critical_path_s", "serial_s"}
+
+        A failing required stage cancels everything still running and re-raises;
+        a failing optional stage yields None and its error is recorded.
+        """
+        start = time.perf_counter()
+        results = dict(inputs)
+        errors = {}
+        timings = {}
+        tasks = {}
+
+        async def execute(stage: PipelineStage):
+            if stage.deps:
+                await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+            began = time.perf_counter()
+            try:
+                with span(f"stage.{stage.name}"):
+                    value = await asyncio.wait_for(stage.run(results), timeout=stage.timeout)
+            except asyncio.TimeoutError:
+                error = PipelineTimeout(f"Stage '{stage.name}' timed out after {stage.timeout}s")
+                if stage.required:
+                    raise error
+                errors[stage.name] = error
+                value = None
+            except Exception as e:
+                if stage.required:
+                    raise
+                errors[stage.name] = e
+                value = None
+            finally:
+                timings[stage.name] = (began - start, time.perf_counter() - start)
+            results[stage.name] = value
+            return value
+
+        with span("pipeline"):
+            # Tasks copy the context here, so every stage span is a child of the pipeline span
+            for name in self._topological_order():
+                tasks[name] = asyncio.ensure_future(execute(self.stages[name]))
+
+            try:
+                await asyncio.gather(*tasks.values())
+            finally:
+                # Fail fast: a required failure or outer cancellation stops every other stage
+                for task in tasks.values():
+                    if not task.done():
+                        task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        path = self._critical_path(timings)
+        return {
+            "results": {name: results[name] for name in self.stages},
+            "errors": errors,
+            "timings": timings,
+            "critical_path": path,
+            "critical_path_s": timings[path[-1]][1] if path else 0.0,
+            "serial_s": sum(end - began for began, end in timings.values()),
+        }
+
+    def _topological_order(self) -> list:
+        order, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _critical_path(self, timings: dict) -> list:
+        """Walk back from the last stage to finish through the dependency that finished last"""
+        if not timings:
+            return []
+        name = max(timings, key=lambda n: timings[n][1])
+        path = [name]
+        while self.stages[name].deps:
+            name = max(self.stages[name].deps, key=lambda n: timings[n][1])
+            path.append(name)
+        return list(reversed(path))
+
+
+def _as_dict(parsed) -> dict:
+    if isinstance(parsed, dict):
+        return parsed
+    return parsed.model_dump() if hasattr(parsed, "model_dump") else parsed.dict()
+
+
+def _solution_json(solution: dict) -> str:
+    # Retrieved (Document, score) pairs are not JSON-serializable and add nothing for review
+    return json.dumps({k: v for k, v in solution.items() if k != "retrieved_sources"}, indent=2)
+
+
+def build_agent_pipeline(parser, router, solver, verifier, explainer,
+                         llm_timeout: float = 60.0) -> PipelineRunner:
+    """
+    Parser -> (Router || KB retrieval) -> Solver -> (Verifier || Explainer).
+
+    Routing and retrieval both only need the parsed problem, and verification
+    and explanation both only need the solution, so each pair overlaps.
+    Run with inputs {"raw_input": text}.
+    """
+
+    async def parse(r):
+        return _as_dict(await parser.aparse(r["raw_input"]))
+
+    async def route(r):
+        return await router.aroute(r["parse"])
+
+    async def retrieve(r):
+        # The FAISS lookup is synchronous; keep it off the event loop
+        return await asyncio.to_thread(solver.retrieve, r["parse"])
+
+    async def solve(r):
+        return await solver.asolve(r["parse"], r["route"], r["retrieve"])
+
+    async def verify(r):
+        return await verifier.averify(r["parse"]["problem_text"], _solution_json(r["solve"]))
+
+    async def explain(r):
+        return await explainer.aexplain(r["parse"]["problem_text"], json.loads(_solution_json(r["solve"])))
+
+    return PipelineRunner([
+        PipelineStage("parse", parse, timeout=llm_timeout),
+        PipelineStage("route", route, deps=("parse",), timeout=llm_timeout),
+        PipelineStage("retrieve", retrieve, deps=("parse",), timeout=llm_timeout),
+        PipelineStage("solve", solve, deps=("route", "retrieve"), timeout=llm_timeout),
+        PipelineStage("verify", verify, deps=("solve",), timeout=llm_timeout, required=False),
+        PipelineStage("explain", explain, deps=("solve",), timeout=llm_timeout, required=False),
+    ])
@@ -0,0 +1,233 @@
+"""
+Process-wide registry of expensive shared objects.
+
+Model clients, the HTTP connection pools behind them, embeddings, the
+knowledge-base index and the agents themselves are built once per process
+and then reused. Streamlit re-executes app.py on every interaction but keeps
+imported modules, so everything here survives reruns and is shared by all
+sessions. construction_metrics() reports what each object cost to build and
+how often it has been reused since.
+"""
+import os
+import threading
+import time
+from typing import Callable
+
+_lock = threading.RLock()
+_metrics_lock = threading.Lock()
+_instances = {}
+_metrics = {}
+
+
+def get_or_create(name: str, factory: Callable):
+    """Return the registered instance for name, building it with factory on first use"""
+    instance = _instances.get(name)
+    if instance is not None:
+        _count_reuse(name)
+        return instance
+
+    with _lock:
+        # Another thread may have built it while we waited
+        if name in _instances:
+            _count_reuse(name)
+            return _instances[name]
+        start = time.perf_counter()
+        instance = factory()
+        with _metrics_lock:
+            _metrics[name] = {
+                "construction_s": time.perf_counter() - start,
+                "constructed_at": time.time(),
+                "reuses": 0,
+            }
+        _instances[name] = instance
+        return instance
+
+
+def _count_reuse(name: str):
+    # Separate from _lock, which is held while factories run; reset() may have dropped the entry
+    with _metrics_lock:
+        if name in _metrics:
+            _metrics[name]["reuses"] += 1
+
+
+def construction_metrics() -> dict:
+    """name -> {"construction_s", "constructed_at", "reuses"} for everything built so far"""
+    with _metrics_lock:
+        return {name: dict(m) for name, m in _metrics.items()}
+
+
+def reset():
+    """Drop every instance (for tests and benchmarks that need a cold start)"""
+    with _lock, _metrics_lock:
+        _instances.clear()
+        _metrics.clear()
+
+
+def get_http_client():
+    """Shared connection pool for the sync Groq/OpenAI clients"""
+    import httpx
+    return get_or_create("http_client", lambda: httpx.Client(
+        timeout=httpx.Timeout(60.0, connect=10.0),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    ))
+
+
+def get_async_http_client():
+    """Shared connection pool for async LLM calls made by the pipeline"""
+    import httpx
+    return get_or_create("async_http_client", lambda: httpx.AsyncClient(
+        timeout=httpx.Timeout(60.0, connect=10.0),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    ))
+
+
+def get_groq_client(api_key: str):
+    from groq import Groq
+    return get_or_create(f"groq:{hash(api_key)}", lambda: Groq(api_key=api_key, http_client=get_http_client()))
+
+
+def get_chat_model(model: str = "gpt-4-turbo", temperature: float = 0):
+    from langchain_openai import ChatOpenAI
+    return get_or_create(f"chat:{model}:{temperature}", lambda: ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    ))
+
+
+def get_embeddings(backend: str = None):
+    """Embedding backend (EMBEDDING_BACKEND, default openai) behind the persistent embedding cache"""
+    def build():
+        from rag.embedding_backends import DEFAULT_BACKEND, build_embeddings
+        name = backend or os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+        kwargs = {}
+        if name == "openai":
+            kwargs = {"http_client": get_http_client(), "http_async_client": get_async_http_client()}
+        return build_embeddings(name, **kwargs)
+    return get_or_create(f"embeddings:{backend or os.getenv('EMBEDDING_BACKEND', 'default')}", build)
+
+
+def get_knowledge_base():
+    """Knowledge base with its FAISS index loaded once"""
+    def build():
+        from rag.knowledge_base import MathKnowledgeBase
+        kb = MathKnowledgeBase(embeddings=get_embeddings())
+        kb.load_index()
+        if kb.index is None:
+            # No build step has run yet (fresh checkout); index now rather than fail on retrieve
+            kb.build_index()
+        return kb
+    return get_or_create("knowledge_base", build)
+
+
+def get_retriever():
+    """Hybrid BM25 + vector retriever over the shared knowledge base"""
+    def build():
+        from rag.retriever import HybridRetriever
+        return HybridRetriever(get_knowledge_base())
+    return get_or_create("retriever", build)
+
+
+def get_memory_manager():
+    from memory.memory_manager import MemoryManager
+    return get_or_create("memory_manager", MemoryManager)
+
+
+def get_solution_cache():
+    """Solution cache; TTL and sizes come from SOLUTION_CACHE_* environment variables"""
+    from utils.cache import TieredCache
+    return get_or_create("solution_cache", lambda: TieredCache(
+        os.getenv("SOLUTION_CACHE_PATH", "memory/stored/cache/solutions.sqlite3"),
+        ttl_seconds=float(os.getenv("SOLUTION_CACHE_TTL", 7 * 24 * 3600)),
+        max_memory_items=int(os.getenv("SOLUTION_CACHE_MEMORY_ITEMS", 1000)),
+        max_disk_items=int(os.getenv("SOLUTION_CACHE_DISK_ITEMS", 100_000)),
+    ))
+
+
+def get_symbolic_solver():
+    from agents.symbolic_solver import SymbolicSolver
+    return get_or_create("symbolic_solver", SymbolicSolver)
+
+
+def get_symbolic_verifier():
+    from agents.symbolic_verifier import SymbolicVerifier
+    return get_or_create("symbolic_verifier", lambda: SymbolicVerifier(get_symbolic_solver()))
+
+
+def get_tracer():
+    """
+    Process-wide tracer exporting to TRACE_FILE, rotated past TRACE_FILE_MAX_MB;
+    its histograms start from the spans already there
+    """
+    from utils.tracing import MAX_TRACE_FILE_BYTES, OTLPJsonFileExporter, StageHistograms, Tracer, set_tracer
+
+    def build():
+        path = os.getenv("TRACE_FILE", "traces/spans.jsonl")
+        max_bytes = int(float(os.getenv("TRACE_FILE_MAX_MB", MAX_TRACE_FILE_BYTES / 2**20)) * 2**20)
+        histograms = StageHistograms.from_file(path, max_bytes) if os.path.exists(path) else StageHistograms()
+        tracer = Tracer(OTLPJsonFileExporter(path, max_bytes=max_bytes), histograms)
+        set_tracer(tracer)
+        return tracer
+    return get_or_create("tracer", build)
+
+
+def get_ocr_handler():
+    """OCR engine whose worker pool is started once and shared by every session"""
+    from utils.ocr_handler import OCRHandler
+    return get_or_create("ocr_handler", lambda: OCRHandler(
+        workers=int(os.environ["OCR_WORKERS"]) if os.getenv("OCR_WORKERS") else None))
+
+
+def get_ocr_cache():
+    """OCR results by image content and perceptual hash, shared by every session; sized by OCR_CACHE_* variables"""
+    from utils.ocr_cache import OCRCache
+    return get_or_create("ocr_cache", lambda: OCRCache(
+        os.getenv("OCR_CACHE_PATH", "memory/stored/cache/ocr.sqlite3"),
+        ttl_seconds=float(os.getenv("OCR_CACHE_TTL", 30 * 24 * 3600)),
+        max_memory_items=int(os.getenv("OCR_CACHE_MEMORY_ITEMS", 256)),
+        max_disk_items=int(os.getenv("OCR_CACHE_DISK_ITEMS", 10_000)),
+    ))
+
+
+def get_transcript_cache():
+    """The transcript cache, sized by TRANSCRIPT_CACHE_* variables and shared by every transcriber"""
+    from utils.cache import TieredCache
+    return get_or_create("transcript_cache", lambda: TieredCache(
+        os.getenv("TRANSCRIPT_CACHE_PATH", "memory/stored/cache/transcripts.sqlite3"),
+        ttl_seconds=float(os.getenv("TRANSCRIPT_CACHE_TTL", 30 * 24 * 3600)),
+        max_memory_items=int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ITEMS", 500)),
+        max_disk_items=int(os.getenv("TRANSCRIPT_CACHE_DISK_ITEMS", 50_000)),
+    ))
+
+
+def get_transcriber(client=None):
+    """
+    Speech-to-text (ASR_BACKEND, default Whisper on Groq through client) behind
+    the transcript cache. One per client, so a session never transcribes with
+    another session's client. Recordings over ASR_MAX_CHUNK_S are split and
+    sent ASR_WORKERS chunks at a time
+    """
+    from utils.transcription import DEFAULT_BACKEND, Transcriber, get_asr_backend
+    name = os.getenv("ASR_BACKEND", DEFAULT_BACKEND)
+    # Only the groq backend takes the caller's client; the registry keeps it alive, so its id stays unique
+    client = client if name == "groq" else None
+    kwargs = {"client": client} if client is not None else {}
+    return get_or_create(f"transcriber:{name}:{id(client) if client is not None else 'default'}", lambda: Transcriber(
+        get_asr_backend(name, **kwargs),
+        cache=get_transcript_cache(),
+        single_flight=get_single_flight("asr"),
+        max_chunk_s=float(os.getenv("ASR_MAX_CHUNK_S", 30)),
+        workers=int(os.getenv("ASR_WORKERS", 4)),
+    ))
+
+
+def get_single_flight(name: str = "solver"):
+    """Process-wide request coalescing, so identical solves from different sessions share one call"""
+    from utils.single_flight import SingleFlight
+    return get_or_create(f"single_flight:{name}", SingleFlight)
+
+
+def get_agent(agent_cls):
+    """Warm agent instance; agents are stateless between calls so one per class is enough"""
+    return get_or_create(f"agent:{agent_cls.__name__}", agent_cls)
@@ -1,14 +1,11 @@
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
+from agents.registry import get_chat_model
 import json
 
 class RouterAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4-turbo", temperature=0)
-    
-    def route(self, parsed_problem: dict):
-        """Determine which solver approach to use"""
-        prompt = PromptTemplate(
+        self.llm = get_chat_model("gpt-4-turbo", temperature=0)
+        self.prompt = PromptTemplate(
             input_variables=["problem"],
             template="""Given this math problem:
 {problem}
@@ -27,8 +24,17 @@ Return JSON:
     "confidence": 0.9
 }}"""
         )
-        
-        chain = prompt | self.llm
+    
+    def route(self, parsed_problem: dict):
+        """Determine which solver approach to use"""
+        chain = self.prompt | self.llm
         response = chain.invoke({"problem": str(parsed_problem)})
         
         return json.loads(response.content)
+    
+    async def aroute(self, parsed_problem: dict):
+        """Async variant of route() for the concurrent pipeline"""
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke({"problem": str(parsed_problem)})
+        
+        return json.loads(response.content)
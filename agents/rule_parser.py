@@ -0,0 +1,205 @@
+"""
+Local parse of well-formed problems into ParsedProblem fields, so
+ParserAgent only spends an LLM round trip on input it cannot read with
+confidence.
+
+The text is cleaned of common OCR / ASR artifacts (unicode maths,
+hyphenated line breaks, spoken operators), then the topic is decided by
+the symbolic solver's grammar (SymbolicSolver.parse_problem, under the
+solver's time budget) when the problem is a closed form, else by
+weighted keywords. Keywords alone never decide algebra: "=" and "find x"
+appear in every topic. Variables come from the parsed expressions or
+from single letters next to operators; constraints from "where x > 0" /
+"x is positive" clauses. Anything unclear (no or tied topic, OCR
+garbage, unbalanced brackets, references to "the above" or a figure,
+several questions) returns None and goes to the LLM.
+"""
+import re
+import unicodedata
+from typing import Optional
+
+from agents.symbolic_solver import FUNCTION_NAMES
+
+TOPICS = ("algebra", "probability", "calculus", "linear_algebra")
+MAX_CHARS = 600
+# Points the winning topic needs over the runner-up
+MIN_MARGIN = 2
+# Share of characters that are neither text, maths nor punctuation before input counts as OCR noise
+MAX_JUNK = 0.05
+
+_SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+_UNICODE = {
+    "−": "-", "–": "-", "—": "-", "×": "*", "·": "*", "÷": "/",
+    "≤": "<=", "≥": ">=", "≠": "!=", "√": "sqrt", "π": "pi", "∞": "infinity",
+    "“": '"', "”": '"', "‘": "'", "’": "'", "\u200b": "", "\ufeff": "",
+}
+# Hyphenated line breaks from OCR: "deriv-\native"
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+# ASR writes maths out in words; only applied when the text has no operators at all
+_SPOKEN = [
+    (re.compile(r"\b([a-z0-9]) squared\b"), r"\1^2"),
+    (re.compile(r"\b([a-z0-9]) cubed\b"), r"\1^3"),
+    (re.compile(r"\b([a-z0-9]) (?:to the power of|raised to(?: the power of)?) (\w+)\b"), r"\1^\2"),
+    (re.compile(r"\bdivided by\b"), "/"),
+    (re.compile(r"\b(?:is equal to|equals)\b"), "="),
+    (re.compile(r"\bplus\b"), "+"),
+    (re.compile(r"\bminus\b"), "-"),
+    (re.compile(r"(?<=[0-9a-z)]) times (?=[0-9(]|[a-z]\b)"), " * "),
+]
+_OPERATORS = re.compile(r"[=+*/^<>]")
+
+_KEYWORDS = {
+    "calculus": [
+        (r"\bderivative|\bdifferentiat|\bintegra(?:l|te|tion)|\blimit\b|\blim\b|d/d[a-z]|\bdy/dx\b|∫", 3),
+        (r"\barea (?:enclosed|under|between|bounded)|\btangent to\b|\bnormal to\b|\bcontinuous\b|\bdifferentiable\b", 3),
+        (r"\bhow fast\b|\brate of change\b|\bmaxim(?:um|ize)\b|\bminim(?:um|ize)\b|\bconcav", 1),
+    ],
+    "probability": [
+        (r"\bprobabilit|\bchance\b|\bodds\b|\bexpected value\b", 3),
+        (r"\bhow many ways\b|\bpermutations?\b|\bcombinations?\b|\barrange(?:d|ments?)?\b|\b\d+ ?[cp] ?\d+\b", 3),
+        (r"\bdice\b|\bdie\b|\bcoins?\b|\bcards?\b|\bdeck\b|\bat random\b|\brandomly\b|\bdrawn\b", 2),
+    ],
+    "linear_algebra": [
+        (r"\bmatri(?:x|ces)\b|\bdeterminant\b|\beigen|\bvectors?\b|\blinear (?:transformation|map)\b|\[\[", 3),
+        (r"\brank\b|\btranspose\b|\bdot product\b|\bcross product\b", 2),
+    ],
+    "algebra": [
+        (r"\bquadratic\b|\bpolynomial\b|\broots?\b|\bfactori[sz]e\b|\binequalit|\bsimplify\b|\bexpand\b", 2),
+        (r"\bprogression\b|\b(?:geometric|arithmetic) (?:series|sequence)\b|\b(?:solve|find) (?:for )?[a-z]\b(?!\()", 2),
+        (r"\bsolve\b|\bequations?\b|\blog|[=<>]", 1),
+    ],
+}
+_KEYWORDS = {topic: [(re.compile(p), w) for p, w in rules] for topic, rules in _KEYWORDS.items()}
+# Event notation, case-sensitive so p(x) for a polynomial does not count: P(A), P(A or B), P(A | B), P(A')
+_EVENT = re.compile(r"\bP\((?:not )?[A-Z]'?(?:\s*(?:\||∩|∪|,|and|or|given)\s*(?:not )?[A-Z]'?)*\)")
+_EVENT_WEIGHT = 3
+# "What is 2 + 3*4?": plain arithmetic, filed under algebra
+_ARITHMETIC = re.compile(r"^(?:what is|evaluate|compute|calculate|simplify|find)?:? ?[\d\s+\-*/^().]*\d[\d\s+\-*/^().]*\??$")
+_GRAMMAR_TOPICS = {"equations": "algebra", "transform": "algebra",
+                   "derivative": "calculus", "integral": "calculus", "limit": "calculus"}
+
+# Input that only makes sense with context the parser does not have
+_NEEDS_CONTEXT = re.compile(
+    r"\b(?:the (?:above|previous|following|same|last|next) (?:question|problem|one|equation)|shown (?:above|below)|"
+    r"(?:in|from) the (?:figure|diagram|graph|table)|(?:solve|do|answer) (?:it|this|that)\b)")
+_JUNK = re.compile(r"[^\w\s.,;:!?'\"()\[\]{}+\-*/^=<>|%$&@#~]")
+_BRACKETS = {")": "(", "]": "[", "}": "{"}
+
+_LETTER = re.compile(r"(?<![a-z])([a-z])(?![a-z])")
+_MATH_NEIGHBOURS = set("0123456789+-*/^=<>()[]")
+_CONSTANTS = {"e", "i"}
+_CONSTRAINT_CLAUSE = re.compile(r"\b(?:where|given(?: that)?|with|provided(?: that)?|such that|for|if)\s+(.+)$")
+_INEQUALITY = re.compile(r"((?:-?\d+(?:\.\d+)?\s*(?:<=|<)\s*)?[a-z]\s*(?:<=|>=|!=|<|>)\s*-?[a-z0-9.]+(?:/\d+)?)")
+_WORDED = [
+    (re.compile(r"\b([a-z]) is (?:a )?(?:strictly )?positive\b"), "{} > 0"),
+    (re.compile(r"\b([a-z]) is (?:a )?(?:strictly )?negative\b"), "{} < 0"),
+    (re.compile(r"\b([a-z]) is (?:a )?non-?negative\b"), "{} >= 0"),
+    (re.compile(r"\b([a-z]) is (?:a )?non-?zero\b"), "{} != 0"),
+    (re.compile(r"\b([a-z]) is an? (?:positive )?integer\b"), "{} is an integer"),
+]
+
+
+def clean(raw_input: str) -> str:
+    """The input with OCR / ASR artifacts normalized, case and wording otherwise kept"""
+    # Superscripts first: NFKC would turn x² into x2
+    text = re.sub(r"[⁰¹²³⁴⁵⁶⁷⁸⁹]+", lambda m: "^" + m.group().translate(_SUPERSCRIPTS), raw_input)
+    for old, new in _UNICODE.items():
+        text = text.replace(old, new)
+    text = unicodedata.normalize("NFKC", _HYPHEN_BREAK.sub(r"\1\2", text))
+    text = text.replace("$", "")
+    text = " ".join(text.split())
+    if not _OPERATORS.search(text):
+        lowered = text.lower()
+        for pattern, replacement in _SPOKEN:
+            lowered = pattern.sub(replacement, lowered)
+        if lowered != text.lower():
+            text = lowered
+    return text
+
+
+def _balanced(text: str) -> bool:
+    stack = []
+    for ch in text:
+        if ch in "([{":
+            stack.append(ch)
+        elif ch in _BRACKETS:
+            if not stack or stack.pop() != _BRACKETS[ch]:
+                return False
+    return not stack
+
+
+def topic_scores(text: str) -> dict:
+    lowered = text.lower()
+    # Each rule counts once, so a long statement does not outvote a decisive keyword
+    scores = {topic: sum(w for p, w in rules if p.search(lowered)) for topic, rules in _KEYWORDS.items()}
+    if _EVENT.search(text):
+        scores["probability"] += _EVENT_WEIGHT
+    return scores
+
+
+def variables(text: str, grammar: Optional[dict] = None) -> list:
+    """Unknowns from the parsed expressions, else single letters written next to operators or digits"""
+    if grammar is not None:
+        expressions = grammar["equations"] if grammar["kind"] == "equations" else [grammar["expr"]]
+        return sorted({s.name for e in expressions for s in e.free_symbols})
+    # The letters in P(A) name events, not unknowns
+    lowered = _EVENT.sub(" ", text).lower()
+    found = []
+    for match in _LETTER.finditer(lowered):
+        letter = match.group(1)
+        if letter in found or letter in _CONSTANTS or letter in FUNCTION_NAMES:
+            continue
+        before = lowered[:match.start()].rstrip()[-1:]
+        after = lowered[match.end():].lstrip()[:1]
+        if before in _MATH_NEIGHBOURS or after in _MATH_NEIGHBOURS:
+            found.append(letter)
+    return found
+
+
+def constraints(text: str) -> list:
+    lowered = text.lower()
+    found = []
+    clause = _CONSTRAINT_CLAUSE.search(lowered)
+    if clause:
+        found += [" ".join(c.split()) for c in _INEQUALITY.findall(clause.group(1))]
+    for pattern, template in _WORDED:
+        found += [template.format(letter) for letter in pattern.findall(lowered)]
+    return list(dict.fromkeys(found))
+
+
+def rule_parse(raw_input: str, symbolic=None) -> Optional[dict]:
+    """
+    ParsedProblem fields for input that reads unambiguously, else None (ask
+    the LLM). symbolic is the SymbolicSolver whose grammar is used; the
+    shared one by default.
+    """
+    text = clean(raw_input)
+    lowered = text.lower()
+    if not 4 <= len(text) <= MAX_CHARS or not _balanced(text) or _NEEDS_CONTEXT.search(lowered):
+        return None
+    if "�" in text or len(_JUNK.findall(text)) > MAX_JUNK * len(text) or text.count("?") > 1:
+        return None
+
+    if symbolic is None:
+        from agents.registry import get_symbolic_solver
+        symbolic = get_symbolic_solver()
+    grammar = symbolic.parse_problem(text)
+    if grammar is not None:
+        topic = _GRAMMAR_TOPICS[grammar["kind"]]
+    elif _ARITHMETIC.match(lowered):
+        topic = "algebra"
+    else:
+        ranked = sorted(topic_scores(text).items(), key=lambda kv: kv[1], reverse=True)
+        (topic, best), (_, second) = ranked[0], ranked[1]
+        if best == 0 or best - second < MIN_MARGIN or topic == "algebra":
+            return None
+
+    return {
+        "problem_text": text,
+        "topic": topic,
+        "variables": variables(text, grammar),
+        "constraints": constraints(text),
+        "additional_context": "",
+        "needs_clarification": False,
+        "clarification_questions": [],
+    }
@@ -0,0 +1,80 @@
+"""
+The app's solve path without Streamlit, so it can be benchmarked and reused:
+memory exact match -> symbolic solver -> LLM (solution cache, single-flight)
+-> local answer verification.
+"""
+from typing import Callable, Optional
+
+from agents.symbolic_solver import to_markdown
+from utils.tracing import span
+
+
+def solve_problem(problem: str,
+                  memory,
+                  symbolic_solver,
+                  solver,
+                  checker,
+                  on_token: Optional[Callable[[str], None]] = None,
+                  on_step: Optional[Callable] = None) -> dict:
+    """
+    Return {"solution", "source", "verdict"}; source is one of memory,
+    symbolic, cache, shared, llm or error. on_step(agent, status, details,
+    seconds) is called for every step that did work.
+    """
+    def step(agent: str, status: str, details: str = "", seconds: float = None):
+        if on_step is not None:
+            on_step(agent, status, details, seconds)
+
+    # Exact-match fast path: the same canonical problem skips the LLM pipeline
+    with span("memory_lookup") as s:
+        remembered = memory.find_exact(problem)
+        s.set("hit", bool(remembered))
+    if remembered:
+        step("Memory", "success", "Exact match found, reused stored solution", s.duration_s)
+        return {"solution": remembered["solution"], "source": "memory", "verdict": None}
+
+    # Closed-form algebra / calculus / counting: exact answer locally, no LLM call
+    symbolic = symbolic_solver.solve(problem)
+    if symbolic:
+        step("Symbolic Solver", "success", f"{symbolic['approach']} (no LLM call)", symbolic["elapsed_ms"] / 1000)
+        solution_text = to_markdown(symbolic)
+        if on_token is not None:
+            on_token(solution_text)
+        return {"solution": solution_text, "source": "symbolic", "verdict": None}
+
+    try:
+        result = solver.solve(problem, on_token=on_token)
+    except Exception as e:
+        step("Solver Agent", "error", str(e))
+        return {"solution": f"⚠️ Error: {str(e)}", "source": "error", "verdict": None}
+
+    solution_text = result["solution"]
+    timing = f"TTFT {result['ttft_s']:.2f}s"
+    if result["cached"]:
+        source = "cache"
+        step("Solver Agent", "success", f"Solution served from cache ({timing})", result["total_s"])
+    elif result["shared"]:
+        # The caller that started the generation saves the attempt
+        source = "shared"
+        step("Solver Agent", "success", f"Joined an identical in-flight solve ({timing})", result["total_s"])
+    else:
+        source = "llm"
+        step("Solver Agent", "success", f"Solution generated ({timing})", result["total_s"])
+
+    with span("answer_check") as s:
+        verdict = checker.verify(problem, solution_text)
+    if verdict is None:
+        step("Verifier Agent", "success", "Inconclusive locally, not verified", s.duration_s)
+    elif verdict["is_correct"]:
+        step("Verifier Agent", "success",
+             f"Verified by {verdict['method']} (Confidence: {verdict['confidence']:.2f})", s.duration_s)
+    else:
+        step("Verifier Agent", "error", "; ".join(verdict["issues"]), s.duration_s)
+
+    if verdict is not None and not verdict["is_correct"]:
+        # Cached before it was checked; a refuted answer must not be served again
+        solver.forget(problem)
+    # An answer the checker refuted is not stored; only one it confirmed is reused by exact match
+    elif source == "llm":
+        memory.save_attempt(problem, solution_text, verified=verdict is not None)
+    return {"solution": solution_text, "source": source, "verdict": verdict}
@@ -1,26 +1,16 @@
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from rag.knowledge_base import MathKnowledgeBase
+from agents.registry import get_chat_model, get_retriever, get_symbolic_solver
+from agents.symbolic_solver import wants_symbolic
+import asyncio
 import json
 
 class SolverAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4-turbo", temperature=0)
-        self.kb = MathKnowledgeBase()
-        self.kb.load_index()
-    
-    def solve(self, parsed_problem: dict, route_info: dict):
-        """Solve the problem using RAG context + reasoning"""
-        
-        # Retrieve relevant docs
-        retrieved_docs = self.kb.retrieve(
-            parsed_problem.get("problem_text", ""),
-            k=3
-        )
-        
-        context = "\n---\n".join([doc[0].page_content for doc in retrieved_docs])
-        
-        prompt = PromptTemplate(
+        self.llm = get_chat_model("gpt-4-turbo", temperature=0)
+        # Shared across agents and reruns; the indexes are loaded once per process
+        self.retriever = get_retriever()
+        self.symbolic = get_symbolic_solver()
+        self.prompt = PromptTemplate(
             input_variables=["problem", "context"],
             template="""You are an expert math tutor. Solve this problem step-by-step.
 
@@ -48,14 +38,59 @@ Return JSON:
     "sources": ["formula reference", ...]
 }}"""
         )
-        
-        chain = prompt | self.llm
-        response = chain.invoke({
-            "problem": str(parsed_problem),
-            "context": context
-        })
-        
+
+    def retrieve(self, parsed_problem: dict):
+        """Retrieve relevant docs for the problem"""
+        return self.retriever.retrieve(
+            parsed_problem.get("problem_text", ""),
+            k=3
+        )
+
+    def solve_symbolic(self, parsed_problem: dict, route_info: dict):
+        """Closed-form answer from the symbolic engine when the router allows it, else None"""
+        if not wants_symbolic(route_info or {}):
+            return None
+        return self.symbolic.solve(parsed_problem.get("problem_text", ""))
+
+    def solve(self, parsed_problem: dict, route_info: dict, retrieved_docs: list = None):
+        """Solve the problem using RAG context + reasoning"""
+
+        # Milliseconds instead of an LLM round-trip for problems the symbolic engine can do exactly
+        solution = self.solve_symbolic(parsed_problem, route_info)
+        if solution is not None:
+            solution["retrieved_sources"] = retrieved_docs or []
+            return solution
+
+        # Retrieve relevant docs unless the caller already did
+        if retrieved_docs is None:
+            retrieved_docs = self.retrieve(parsed_problem)
+
+        chain = self.prompt | self.llm
+        response = chain.invoke(self._inputs(parsed_problem, retrieved_docs))
+
         solution = json.loads(response.content)
         solution["retrieved_sources"] = retrieved_docs
-        
+
         return solution
+
+    async def asolve(self, parsed_problem: dict, route_info: dict, retrieved_docs: list):
+        """Async variant of solve() for the concurrent pipeline"""
+        solution = await asyncio.to_thread(self.solve_symbolic, parsed_problem, route_info)
+        if solution is not None:
+            solution["retrieved_sources"] = retrieved_docs
+            return solution
+
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke(self._inputs(parsed_problem, retrieved_docs))
+
+        solution = json.loads(response.content)
+        solution["retrieved_sources"] = retrieved_docs
+
+        return solution
+
+    def _inputs(self, parsed_problem: dict, retrieved_docs: list) -> dict:
+        context = "\n---\n".join([doc[0].page_content for doc in retrieved_docs])
+        return {
+            "problem": str(parsed_problem),
+            "context": context
+        }
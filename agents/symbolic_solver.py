@@ -0,0 +1,709 @@
+"""
+Deterministic solver for closed-form problems, tried before any LLM call.
+
+Recognizes single equations and equation systems, derivatives, integrals,
+limits, simplify / factor / expand, matrix determinants and inverses,
+counting (nCr, nPr, arrangements) and coin / dice probabilities. Results use
+SolverAgent's JSON shape. Anything not recognized with certainty returns
+None so the caller falls back to the LLM.
+
+User text is parsed with sympy's parse_expr, which evaluates Python, so
+input is first restricted to arithmetic characters, single-letter variables
+and a whitelist of function names. It is parsed unevaluated and then
+evaluated bottom-up, refusing integer powers and factorials too large to
+compute (9^9^9^9). Everything runs in worker processes that are killed
+when the time budget runs out, since a thread stuck in sympy cannot be
+stopped.
+"""
+import itertools
+import multiprocessing
+import re
+import threading
+import time
+from typing import Optional
+
+import sympy as sp
+from sympy.calculus.util import continuous_domain
+from sympy.functions.elementary.trigonometric import TrigonometricFunction
+from sympy.parsing.sympy_parser import (convert_xor, implicit_multiplication_application, parse_expr,
+                                        standard_transformations)
+
+from utils.tracing import span
+
+_TRANSFORMATIONS = standard_transformations + (implicit_multiplication_application, convert_xor)
+_FUNCTIONS = {
+    "sin": sp.sin, "cos": sp.cos, "tan": sp.tan, "cot": sp.cot, "sec": sp.sec, "csc": sp.csc,
+    "asin": sp.asin, "acos": sp.acos, "atan": sp.atan, "sinh": sp.sinh, "cosh": sp.cosh, "tanh": sp.tanh,
+    "log": sp.log, "ln": sp.log, "exp": sp.exp, "sqrt": sp.sqrt, "abs": sp.Abs,
+    "pi": sp.pi, "oo": sp.oo, "e": sp.E,
+}
+FUNCTION_NAMES = frozenset(_FUNCTIONS)
+_ALLOWED_CHARS = re.compile(r"^[0-9a-z+\-*/^().,!\s\[\]=]*$")
+_SUPERSCRIPT_DIGITS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+_REPLACEMENTS = {
+    "−": "-", "–": "-", "×": "*", "·": "*", "÷": "/", "√": "sqrt", "π": "pi", "∞": "oo",
+    "→": "->", "infinity": "oo", "²": "^2", "³": "^3",
+}
+
+# Router strategies / tools that mean "this can be computed"
+SYMBOLIC_STRATEGIES = {"algebraic_manipulation", "calculus_based", "probability", "linear_system"}
+SYMBOLIC_TOOLS = {"calculator", "solver"}
+
+# Largest numeric exponent, factorial and integer result (in bits) evaluated from user text;
+# 10_000 bits stays under Python's 4300-digit int-to-str limit
+MAX_EXPONENT = 1000
+MAX_FACTORIAL = 1000
+MAX_INTEGER_BITS = 10_000
+# How long the first worker start may block the constructor
+STARTUP_TIMEOUT = 30.0
+
+
+class Unsupported(Exception):
+    """The problem is outside what the symbolic path handles with certainty"""
+
+
+def wants_symbolic(route_info: dict) -> bool:
+    """Whether RouterAgent's decision allows trying the symbolic solver first"""
+    tools = set(route_info.get("computational_tools") or [])
+    return bool(tools & SYMBOLIC_TOOLS) or route_info.get("strategy") in SYMBOLIC_STRATEGIES
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"[⁰¹²³⁴⁵⁶⁷⁸⁹]+", lambda m: "^" + m.group().translate(_SUPERSCRIPT_DIGITS), text)
+    for old, new in _REPLACEMENTS.items():
+        text = text.replace(old, new)
+    text = text.replace("$", "").strip().lower()
+    return re.sub(r"\s+", " ", text).rstrip(" .?!")
+
+
+def parse(text: str):
+    """Parse a math expression, refusing anything beyond arithmetic, variables and known functions"""
+    text = text.strip()
+    if not text or len(text) > 300 or not _ALLOWED_CHARS.match(text):
+        raise Unsupported(text)
+    names = {}
+    for name in re.findall(r"[a-z]+", text):
+        if name in _FUNCTIONS:
+            names[name] = _FUNCTIONS[name]
+        elif len(name) == 1:
+            names[name] = sp.Symbol(name)
+        else:
+            raise Unsupported(name)
+    try:
+        expr = parse_expr(text, local_dict=names, global_dict={"__builtins__": {}, **_SAFE_GLOBALS},
+                          transformations=_TRANSFORMATIONS, evaluate=False)
+    except Exception as e:
+        raise Unsupported(text) from e
+    return _evaluate(expr)
+
+
+def _bits(value) -> int:
+    if value.is_Integer:
+        return abs(int(value)).bit_length()
+    p, q = value.as_numer_denom()
+    return max(abs(int(p)).bit_length(), abs(int(q)).bit_length())
+
+
+def _evaluate(expr):
+    """Evaluate an unevaluated parse bottom-up, refusing numbers too large to compute in bounded time"""
+    if isinstance(expr, (list, tuple)):
+        return type(expr)(_evaluate(e) for e in expr)
+    if not isinstance(expr, sp.Basic) or not expr.args:
+        return expr
+    args = [_evaluate(a) for a in expr.args]
+    if expr.func is sp.Pow:
+        base, exponent = args
+        if exponent.is_number and base not in (0, 1, -1):
+            if exponent.is_finite and abs(exponent) > MAX_EXPONENT:
+                raise Unsupported("exponent too large")
+            if base.is_Rational and exponent.is_Integer and _bits(base) * abs(int(exponent)) > MAX_INTEGER_BITS:
+                raise Unsupported("power too large")
+    elif expr.func is sp.factorial and args[0].is_Integer and args[0] > MAX_FACTORIAL:
+        raise Unsupported("factorial too large")
+    result = expr.func(*args)
+    if result.is_Rational and _bits(result) > MAX_INTEGER_BITS:
+        raise Unsupported("number too large")
+    return result
+
+
+def _factorial(n, **kwargs):
+    # parse_expr evaluates factorial(...) even with evaluate=False
+    return sp.factorial(n, evaluate=False)
+
+
+# parse_expr's generated code only needs these constructors
+_SAFE_GLOBALS = {
+    "Integer": sp.Integer, "Float": sp.Float, "Rational": sp.Rational, "Symbol": sp.Symbol,
+    "Function": sp.Function, "factorial": _factorial, "Mul": sp.Mul, "Add": sp.Add, "Pow": sp.Pow,
+}
+
+
+def fmt(expr) -> str:
+    """Textbook notation: ^ for powers, e and ln instead of sympy's E and log"""
+    text = str(expr).replace("**", "^").replace("log(", "ln(")
+    return re.sub(r"\bE\b", "e", text)
+
+
+def _step(steps: list, description: str, calculation: str):
+    steps.append({"step": len(steps) + 1, "description": description, "calculation": calculation})
+
+
+def _result(approach: str, steps: list, final_answer: str) -> dict:
+    return {
+        "approach": approach,
+        "steps": steps,
+        "final_answer": final_answer,
+        "confidence": 1.0,
+        "sources": ["sympy"],
+        "solver": "symbolic",
+    }
+
+
+def _variable(expr, requested: Optional[str] = None):
+    symbols = sorted(expr.free_symbols, key=lambda s: s.name)
+    if requested:
+        return sp.Symbol(requested)
+    if len(symbols) == 1:
+        return symbols[0]
+    if sp.Symbol("x") in symbols:
+        return sp.Symbol("x")
+    raise Unsupported("ambiguous variable")
+
+
+# --- calculus -------------------------------------------------------------
+
+_ORDERS = {"second": 2, "2nd": 2, "third": 3, "3rd": 3}
+_DERIVATIVE = re.compile(
+    r"^(?:find |compute |what is )?(?:the )?(?:(?P<order>second|2nd|third|3rd) )?"
+    r"(?:derivative of|differentiate) (?P<expr>.+?)(?: (?:with respect to|w\.?r\.?t\.?) (?P<var>[a-z]))?$")
+_DDX = re.compile(r"^d/d(?P<var>[a-z]) ?(?P<expr>.+)$")
+
+
+def _derivative(text: str) -> Optional[dict]:
+    m = _DERIVATIVE.match(text) or _DDX.match(text)
+    if not m:
+        return None
+    expr = parse(m.group("expr"))
+    var = _variable(expr, m.group("var"))
+    order = _ORDERS.get(m.groupdict().get("order") or "", 1)
+
+    steps = []
+    if isinstance(expr, sp.Mul) and sum(1 for f in expr.args if f.has(var)) > 1:
+        rule = "product rule"
+    elif isinstance(expr, sp.Pow) and expr.base.has(var) and expr.exp.is_number:
+        rule = "power rule" + (" with the chain rule" if expr.base != var else "")
+    elif isinstance(expr, sp.Function) and expr.args[0] != var:
+        rule = "chain rule"
+    elif isinstance(expr, sp.Add):
+        rule = "sum rule, term by term"
+    else:
+        rule = "standard derivatives"
+    _step(steps, f"Differentiate with respect to {var} using the {rule}", f"d/d{var} [{fmt(expr)}]")
+
+    result = expr
+    for n in range(1, order + 1):
+        result = sp.diff(result, var)
+        if order > 1:
+            _step(steps, f"Derivative of order {n}", fmt(result))
+    simplified = sp.simplify(result)
+    if order == 1:
+        _step(steps, "Result", fmt(result))
+    if simplified != result:
+        _step(steps, "Simplify", fmt(simplified))
+    label = {1: "f'", 2: "f''", 3: "f'''"}[order]
+    return _result(f"Differentiate {fmt(expr)} symbolically", steps, f"{label}({var}) = {fmt(simplified)}")
+
+
+_INTEGRAL = re.compile(
+    r"^(?:find |compute |evaluate )?(?:the )?(?:(?:definite |indefinite )?integral of|integrate|∫) ?"
+    r"(?P<expr>.+?)(?: ?d(?P<var>[a-z]))?(?: from (?P<a>\S+) to (?P<b>\S+))?$")
+
+
+def _integral(text: str) -> Optional[dict]:
+    m = _INTEGRAL.match(text)
+    if not m:
+        return None
+    expr = parse(m.group("expr"))
+    var = _variable(expr, m.group("var"))
+    antiderivative = sp.integrate(expr, var)
+    if antiderivative.has(sp.Integral):
+        raise Unsupported("no closed-form antiderivative")
+
+    steps = []
+    _step(steps, f"Find an antiderivative with respect to {var}", f"∫ {fmt(expr)} d{var} = {fmt(antiderivative)}")
+    _step(steps, "Check by differentiating",
+          f"d/d{var} [{fmt(antiderivative)}] = {fmt(sp.simplify(sp.diff(antiderivative, var)))}")
+    if m.group("a") is None:
+        return _result(f"Integrate {fmt(expr)}", steps, f"{fmt(antiderivative)} + C")
+
+    a, b = parse(m.group("a")), parse(m.group("b"))
+    if not (a.is_extended_real and b.is_extended_real) or a == b:
+        raise Unsupported("bounds")
+    # F(b) - F(a) only holds if the integrand is defined and continuous strictly between the bounds
+    lo, hi = sp.Min(a, b), sp.Max(a, b)
+    if not sp.Interval.open(lo, hi).is_subset(continuous_domain(expr, var, sp.Interval(lo, hi))):
+        raise Unsupported("integrand not continuous on the interval")
+    value = sp.simplify(_at(antiderivative, var, b, "-" if b > a else "+")
+                        - _at(antiderivative, var, a, "+" if b > a else "-"))
+    if not (value.is_finite and value.is_real):
+        raise Unsupported("divergent or non-real integral")
+    _step(steps, "Apply the limits: F(b) - F(a)",
+          f"[{fmt(antiderivative)}] from {fmt(a)} to {fmt(b)} = {fmt(value)}")
+    answer = fmt(value) if value.is_Rational or not value.is_number else f"{fmt(value)} ≈ {sp.N(value, 6)}"
+    return _result(f"Definite integral of {fmt(expr)} via the fundamental theorem of calculus", steps, answer)
+
+
+def _at(f, var, point, direction: str):
+    """f at point, or its one-sided limit from inside the interval at an infinite or singular bound"""
+    value = f.subs(var, point) if point.is_finite else sp.nan
+    if value.is_finite:
+        return value
+    value = sp.limit(f, var, point, direction)
+    if value.has(sp.Limit):
+        raise Unsupported("limit at bound not determined")
+    return value
+
+
+_LIMIT = re.compile(
+    r"^(?:find |evaluate |compute )?(?:the )?(?:limit of|lim) (?P<expr>.+?),? as (?P<var>[a-z]) "
+    r"(?:->|tends to|approaches|goes to) (?P<point>.+)$")
+_LIM_PREFIX = re.compile(r"^lim_?\(?(?P<var>[a-z]) ?-> ?(?P<point>[^) ]+)\)? (?P<expr>.+)$")
+
+
+def _limit(text: str) -> Optional[dict]:
+    m = _LIMIT.match(text) or _LIM_PREFIX.match(text)
+    if not m:
+        return None
+    expr = parse(m.group("expr"))
+    var = sp.Symbol(m.group("var"))
+    point = parse(m.group("point"))
+
+    steps = []
+    numerator, denominator = sp.fraction(sp.together(expr))
+    if denominator != 1 and point.is_finite:
+        num_at, den_at = numerator.subs(var, point), denominator.subs(var, point)
+        form = "0/0" if num_at == 0 and den_at == 0 else None
+        _step(steps, f"Substitute {var} = {fmt(point)} directly",
+              f"numerator → {fmt(num_at)}, denominator → {fmt(den_at)}" + (f" (indeterminate {form})" if form else ""))
+    value = sp.limit(expr, var, point)
+    if value.has(sp.Limit) or value is sp.nan:
+        raise Unsupported("limit not determined")
+    _step(steps, "Evaluate the limit (series expansion / L'Hôpital where needed)",
+          f"lim {var}→{fmt(point)} {fmt(expr)} = {fmt(value)}")
+    return _result(f"Limit of {fmt(expr)} as {var} → {fmt(point)}", steps, fmt(value))
+
+
+# --- algebra --------------------------------------------------------------
+
+_TRANSFORM = re.compile(r"^(?P<op>simplify|factor|factorise|factorize|expand) (?P<expr>.+)$")
+
+
+def _transform(text: str) -> Optional[dict]:
+    m = _TRANSFORM.match(text)
+    if not m:
+        return None
+    op = m.group("op").replace("factorise", "factor").replace("factorize", "factor")
+    expr = parse(m.group("expr"))
+    result = {"simplify": sp.simplify, "factor": sp.factor, "expand": sp.expand}[op](expr)
+    if result.has(sp.zoo, sp.nan):
+        raise Unsupported("undefined value")
+    steps = []
+    _step(steps, f"{op.capitalize()} the expression", f"{fmt(expr)} = {fmt(result)}")
+    return _result(f"{op.capitalize()} {fmt(expr)}", steps, fmt(result))
+
+
+_SOLVE_PREFIX = re.compile(
+    r"^(?:solve(?: the equations?| the system)?(?: for (?P<for>[a-z](?: ?(?:,|and) ?[a-z])*))?|find the roots of|find the solutions? (?:of|to)|"
+    r"find (?:the values? of )?(?P<vars>[a-z](?: ?(?:,|and) ?[a-z])*)(?: if| when| such that| given(?: that)?| from)?)"
+    r"[: ]+")
+_FOR_VARS = re.compile(r",? (?:for|in terms of) (?P<vars>[a-z](?: ?(?:,|and) ?[a-z])*)$")
+
+
+def split_equations(text: str) -> tuple:
+    """(expressions equal to zero, requested variable names or None) from a normalized equation problem"""
+    requested = None
+    m = _SOLVE_PREFIX.match(text)
+    if m:
+        requested = m.group("vars") or m.group("for")
+        text = text[m.end():]
+    m = _FOR_VARS.search(text)
+    if m:
+        requested = m.group("vars")
+        text = text[:m.start()]
+    names = re.findall(r"[a-z]", requested) if requested else None
+
+    equations = []
+    for part in re.split(r" ?(?:;|\band\b|\n|,(?![^()\[\]]*[)\]])) ?", text):
+        if not part.strip():
+            continue
+        if part.count("=") != 1:
+            raise Unsupported(part)
+        lhs, rhs = part.split("=")
+        equations.append(parse(lhs) - parse(rhs))
+    return equations, names
+
+
+def _equations(text: str) -> Optional[dict]:
+    if "=" not in text:
+        return None
+    equations, names = split_equations(text)
+    # sin x = 0 has infinitely many roots; sp.solve lists a few of them, which reads as the complete answer
+    if any(f.has(TrigonometricFunction) for e in equations for f in e.atoms(sp.Function) if f.free_symbols):
+        raise Unsupported("periodic equation")
+    if len(equations) == 1:
+        return _single_equation(equations[0], names[0] if names else None)
+    return _system(equations, names)
+
+
+def _single_equation(f, var_name: Optional[str]) -> dict:
+    var = _variable(f, var_name)
+    f = sp.expand(f)
+    steps = []
+    _step(steps, "Move every term to one side", f"{fmt(f)} = 0")
+
+    poly = sp.Poly(f, var) if f.is_polynomial(var) else None
+    if poly is not None and poly.degree() == 2 and not (poly.free_symbols - {var}):
+        a, b, c = poly.all_coeffs()
+        disc = b ** 2 - 4 * a * c
+        _step(steps, "Identify the coefficients", f"a = {fmt(a)}, b = {fmt(b)}, c = {fmt(c)}")
+        _step(steps, "Compute the discriminant", f"D = b^2 - 4ac = {fmt(disc)}")
+        _step(steps, "Apply the quadratic formula", f"{var} = (-b ± √D) / 2a = ({fmt(-b)} ± √{fmt(disc)}) / {fmt(2 * a)}")
+    elif poly is not None:
+        factored = sp.factor(f)
+        if factored != f:
+            _step(steps, "Factor", f"{fmt(factored)} = 0")
+            _step(steps, "Set each factor to zero", ", ".join(f"{fmt(g)} = 0" for g in sp.Mul.make_args(factored)
+                                                               if g.has(var)))
+
+    solutions = sp.solve(f, var)
+    if not solutions and poly is None:
+        raise Unsupported("no closed-form solution")
+    solutions = [sp.nsimplify(s) if s.is_Float else sp.simplify(s) for s in solutions]
+    answer = ", ".join(f"{var} = {fmt(s)}" for s in solutions) or "no solution"
+    _step(steps, "Solutions", answer)
+    if solutions and len(solutions) <= 4:
+        checks = [f"{var} = {fmt(s)}: {fmt(sp.simplify(f.subs(var, s)))}" for s in solutions]
+        _step(steps, "Verify by substituting back (each should give 0)", "; ".join(checks))
+    return _result(f"Solve {fmt(f)} = 0 for {var}", steps, answer)
+
+
+def _system(equations: list, names: Optional[list]) -> dict:
+    symbols = sorted(set().union(*(e.free_symbols for e in equations)), key=lambda s: s.name)
+    unknowns = [sp.Symbol(n) for n in names] if names else symbols
+    if len(unknowns) > len(equations) or len(unknowns) > 6:
+        raise Unsupported("under-determined system")
+
+    steps = []
+    _step(steps, "Write each equation as expression = 0", "; ".join(f"{fmt(e)} = 0" for e in equations))
+    if all(sp.Poly(e, *unknowns).is_linear for e in equations if e.is_polynomial(*unknowns)) \
+            and all(e.is_polynomial(*unknowns) for e in equations):
+        A, B = sp.linear_eq_to_matrix(equations, unknowns)
+        _step(steps, "Matrix form A·X = B", f"A = {A.tolist()}, B = {B.T.tolist()[0]}")
+        if A.shape[0] == A.shape[1]:
+            _step(steps, "Determinant (non-zero means a unique solution)", f"det(A) = {fmt(A.det())}")
+        solutions = list(sp.linsolve((A, B), unknowns))
+        approach = "Solve the linear system by elimination (matrix form)"
+    else:
+        solutions = sp.solve(equations, unknowns, dict=False)
+        solutions = [solutions] if isinstance(solutions, tuple) else solutions
+        if isinstance(solutions, dict):
+            solutions = [tuple(solutions.get(u, u) for u in unknowns)]
+        approach = "Solve the non-linear system by substitution"
+    if not solutions:
+        _step(steps, "Solutions", "the system is inconsistent")
+        return _result(approach, steps, "no solution")
+
+    answers = ["(" + ", ".join(f"{u} = {fmt(sp.simplify(v))}" for u, v in zip(unknowns, sol)) + ")"
+               for sol in solutions]
+    _step(steps, "Solve for " + ", ".join(map(str, unknowns)), "; ".join(answers))
+    return _result(approach, steps, "; ".join(answers) if len(answers) > 1 else answers[0].strip("()"))
+
+
+# --- linear algebra -------------------------------------------------------
+
+_MATRIX = re.compile(
+    r"^(?:find |compute |what is )?(?:the )?(?P<op>determinant|inverse|rank|transpose|eigenvalues|trace) "
+    r"of (?:the )?(?:matrix )?(?P<matrix>\[.+\])$")
+
+
+def _matrix(text: str) -> Optional[dict]:
+    m = _MATRIX.match(text)
+    if not m:
+        return None
+    rows = parse(m.group("matrix"))
+    if not isinstance(rows, (list, tuple)) or not all(isinstance(r, (list, tuple)) for r in rows):
+        raise Unsupported("not a matrix")
+    matrix = sp.Matrix(rows)
+    op = m.group("op")
+    steps = []
+    _step(steps, "Write the matrix", f"A = {matrix.tolist()}")
+    if op == "determinant":
+        if matrix.shape == (2, 2):
+            (a, b), (c, d) = matrix.tolist()
+            _step(steps, "For a 2×2 matrix, det(A) = ad - bc", f"({fmt(a)})({fmt(d)}) - ({fmt(b)})({fmt(c)})")
+        else:
+            _step(steps, "Expand along the first row (cofactor expansion)",
+                  " + ".join(f"({fmt(matrix[0, j])})·C1{j + 1}" for j in range(matrix.shape[1])))
+        value = matrix.det()
+    elif op == "inverse":
+        det = matrix.det()
+        _step(steps, "Check the determinant is non-zero", f"det(A) = {fmt(det)}")
+        if det == 0:
+            return _result("Invert the matrix", steps, "not invertible (det(A) = 0)")
+        _step(steps, "A⁻¹ = adj(A) / det(A)", f"adj(A) = {matrix.adjugate().tolist()}")
+        value = matrix.inv().tolist()
+    elif op == "eigenvalues":
+        lam = sp.Symbol("lambda")
+        poly = (matrix - lam * sp.eye(matrix.shape[0])).det()
+        _step(steps, "Characteristic equation det(A - λI) = 0", f"{fmt(sp.expand(poly))} = 0")
+        value = ", ".join(f"{fmt(k)} (multiplicity {v})" if v > 1 else fmt(k) for k, v in matrix.eigenvals().items())
+    else:
+        value = {"rank": matrix.rank, "transpose": lambda: matrix.T.tolist(), "trace": matrix.trace}[op]()
+    _step(steps, op.capitalize(), str(value))
+    return _result(f"Compute the {op} of a {matrix.shape[0]}×{matrix.shape[1]} matrix", steps, str(value))
+
+
+# --- counting and probability --------------------------------------------
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+_NCR = re.compile(r"^(?:find |compute |evaluate |what is )?(?:(?P<n1>\d+) ?c ?(?P<r1>\d+)|c\((?P<n2>\d+), ?(?P<r2>\d+)\)|"
+                  r"(?P<n3>\d+) choose (?P<r3>\d+))$")
+_NPR = re.compile(r"^(?:find |compute |evaluate |what is )?(?:(?P<n1>\d+) ?p ?(?P<r1>\d+)|p\((?P<n2>\d+), ?(?P<r2>\d+)\))$")
+# Anchored at both ends: any condition left over ("if 2 must be included", "so that ...") changes the count
+_CHOOSE = re.compile(r"^(?:in )?how many ways (?:can|to|are there to) (?:we |you |one )?(?:choose|select|pick) "
+                     r"(?P<r>\d+) (?:[a-z]+ ){0,2}?(?:from|out of|among) (?:a (?:group|class|set) of )?(?P<n>\d+)"
+                     r"(?: (?!if\b|when\b|where\b|so\b|such\b|given\b|with\b|but\b|and\b|unless\b|except\b)[a-z]+){0,2}$")
+_ARRANGE = re.compile(r"^(?:in )?how many ways can (?P<n>\d+) (?:distinct |different )?[a-z]+(?: [a-z]+)? be arranged"
+                      r"(?: (?:in a (?:row|line|queue)|on a shelf))?$")
+_COINS = re.compile(r"^(?:what is |find )?(?:the )?probability of (?:getting )?(?P<kind>exactly |at least |at most )?"
+                    r"(?P<k>\d+|one|two|three|four|five|six) heads? (?:in|when tossing|with) (?P<n>\d+|one|two|three|four|five|six) "
+                    r"(?:fair )?(?:coin )?(?:tosses|flips|throws|coins)\b.*$")
+_DICE = re.compile(r"^(?:what is |find )?(?:the )?probability of (?:getting |rolling )?a sum of (?P<s>\d+) "
+                   r"(?:with|when rolling|on|using) (?P<n>\d+|two|three) (?:fair )?dice$")
+
+
+def _number(token: str) -> int:
+    n = _NUMBER_WORDS.get(token) or int(token)
+    if n > MAX_FACTORIAL:
+        raise Unsupported("count too large")
+    return n
+
+
+def _groups(m, name: str) -> int:
+    return next(_number(m.group(f"{name}{i}")) for i in (1, 2, 3) if m.groupdict().get(f"{name}{i}"))
+
+
+def _counting(text: str) -> Optional[dict]:
+    steps = []
+    m = _NCR.match(text) or _CHOOSE.match(text)
+    if m:
+        n, r = (_number(m.group("n")), _number(m.group("r"))) if "n" in m.groupdict() else (_groups(m, "n"), _groups(m, "r"))
+        value = sp.binomial(n, r)
+        _step(steps, "Order does not matter: use combinations", "C(n, r) = n! / (r!(n - r)!)")
+        _step(steps, "Substitute", f"C({n}, {r}) = {n}! / ({r}! · {n - r}!) = {value}")
+        return _result("Count selections with the combination formula", steps, str(value))
+    m = _NPR.match(text)
+    if m:
+        n, r = _groups(m, "n"), _groups(m, "r")
+        value = sp.factorial(n) / sp.factorial(n - r)
+        _step(steps, "Order matters: use permutations", "P(n, r) = n! / (n - r)!")
+        _step(steps, "Substitute", f"P({n}, {r}) = {n}! / {n - r}! = {value}")
+        return _result("Count ordered selections with the permutation formula", steps, str(value))
+    m = _ARRANGE.match(text)
+    if m:
+        n = _number(m.group("n"))
+        _step(steps, f"{n} distinct objects in a row: {n} choices for the first place, {n - 1} for the next, ...",
+              f"{n}! = {sp.factorial(n)}")
+        return _result("Count arrangements as a factorial", steps, str(sp.factorial(n)))
+    return None
+
+
+def _probability(text: str) -> Optional[dict]:
+    steps = []
+    m = _COINS.match(text)
+    if m:
+        k, n = _number(m.group("k")), _number(m.group("n"))
+        kind = (m.group("kind") or "exactly ").strip()
+        ks = {"exactly": [k], "at least": range(k, n + 1), "at most": range(0, k + 1)}[kind]
+        _step(steps, "Each toss is an independent trial with P(heads) = 1/2",
+              f"P(X = j) = C({n}, j) / 2^{n}")
+        favourable = sum(sp.binomial(n, j) for j in ks)
+        value = sp.Rational(favourable, 2 ** n)
+        _step(steps, f"Sum over {kind} {k} heads",
+              " + ".join(f"C({n},{j})" for j in ks) + f" = {favourable} out of {2 ** n}")
+        _step(steps, "Probability", f"{favourable}/{2 ** n} = {value}")
+        return _result("Binomial distribution with p = 1/2", steps, str(value))
+    m = _DICE.match(text)
+    if m:
+        target, n = int(m.group("s")), _number(m.group("n"))
+        if n > 4:
+            raise Unsupported("too many dice to enumerate")
+        outcomes = list(itertools.product(range(1, 7), repeat=n))
+        favourable = [o for o in outcomes if sum(o) == target]
+        value = sp.Rational(len(favourable), len(outcomes))
+        _step(steps, "Count equally likely outcomes", f"6^{n} = {len(outcomes)}")
+        _step(steps, f"Outcomes summing to {target}",
+              ", ".join(str(o) for o in favourable[:12]) + (" ..." if len(favourable) > 12 else "")
+              + f" ({len(favourable)} total)")
+        _step(steps, "Probability", f"{len(favourable)}/{len(outcomes)} = {value}")
+        return _result("Classical probability by enumerating outcomes", steps, str(value))
+    return None
+
+
+# --- arithmetic -----------------------------------------------------------
+
+_EVALUATE = re.compile(r"^(?:evaluate|calculate|compute|simplify|what is|find the value of|find)?:? ?(?P<expr>.+)$")
+
+
+def _arithmetic(text: str) -> Optional[dict]:
+    m = _EVALUATE.match(text)
+    expr = parse(m.group("expr"))
+    if not isinstance(expr, sp.Expr) or expr.free_symbols:
+        return None
+    value = sp.simplify(expr)
+    if not (value.is_finite and value.is_real):
+        raise Unsupported("undefined or complex value")
+    steps = []
+    _step(steps, "Evaluate exactly", f"{fmt(expr)} = {fmt(value)}")
+    answer = fmt(value)
+    if not value.is_Rational:
+        answer += f" ≈ {sp.N(value, 8)}"
+        _step(steps, "Decimal value", str(sp.N(value, 8)))
+    return _result("Exact arithmetic", steps, answer)
+
+
+def parse_problem(problem_text: str) -> Optional[dict]:
+    """
+    What the problem asks for, as sympy objects, without solving it:
+    {"kind": "derivative" | "integral" | "limit" | "transform" | "equations", ...}.
+    None when the problem is not one of these forms.
+    """
+    text = normalize(problem_text)
+    try:
+        m = _DERIVATIVE.match(text) or _DDX.match(text)
+        if m:
+            expr = parse(m.group("expr"))
+            return {"kind": "derivative", "expr": expr, "var": _variable(expr, m.group("var")),
+                    "order": _ORDERS.get(m.groupdict().get("order") or "", 1)}
+        m = _INTEGRAL.match(text)
+        if m:
+            expr = parse(m.group("expr"))
+            bounds = (parse(m.group("a")), parse(m.group("b"))) if m.group("a") else None
+            return {"kind": "integral", "expr": expr, "var": _variable(expr, m.group("var")), "bounds": bounds}
+        m = _LIMIT.match(text) or _LIM_PREFIX.match(text)
+        if m:
+            return {"kind": "limit", "expr": parse(m.group("expr")), "var": sp.Symbol(m.group("var")),
+                    "point": parse(m.group("point"))}
+        m = _TRANSFORM.match(text)
+        if m:
+            return {"kind": "transform", "expr": parse(m.group("expr"))}
+        if "=" in text:
+            equations, names = split_equations(text)
+            symbols = sorted(set().union(*(e.free_symbols for e in equations)), key=lambda s: s.name)
+            unknowns = [sp.Symbol(n) for n in names] if names else symbols
+            if len(equations) == 1 and not names:
+                unknowns = [_variable(equations[0])]
+            return {"kind": "equations", "equations": equations, "unknowns": unknowns}
+    except (Unsupported, TypeError, ValueError, AttributeError, sp.SympifyError):
+        return None
+    return None
+
+
+_HANDLERS = (_matrix, _counting, _probability, _derivative, _integral, _limit, _transform, _equations, _arithmetic)
+
+
+def _solve(problem_text: str) -> Optional[dict]:
+    text = normalize(problem_text)
+    for handler in _HANDLERS:
+        try:
+            result = handler(text)
+        except (Unsupported, NotImplementedError, TypeError, ValueError, AttributeError,
+                ZeroDivisionError, RecursionError, sp.SympifyError, sp.PolynomialError):
+            return None
+        if result is not None:
+            return result
+    return None
+
+
+def _ready() -> bool:
+    return True
+
+
+class SymbolicSolver:
+    """
+    Runs the handlers above under a time budget. sympy can take a long time
+    on unlucky inputs (hard integrals, high-degree systems); past `timeout`
+    the problem goes to the LLM instead. Work runs in a small pool of
+    spawned processes: on a timeout the whole pool is terminated and a new
+    one started, so a runaway computation cannot keep the workers busy for
+    later requests. Until the new pool is up, requests go to the LLM.
+    """
+
+    def __init__(self, timeout: float = 2.0, max_workers: int = 2):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.stats = {"solved": 0, "unsupported": 0, "timeouts": 0, "restarting": 0}
+        self._lock = threading.Lock()
+        self._start()
+        # The first start waits for the workers to import sympy; restarts do not block requests
+        self._started.wait(STARTUP_TIMEOUT)
+
+    def _start(self):
+        # spawn: forking a threaded server process (Streamlit) is unsafe
+        self._pool = multiprocessing.get_context("spawn").Pool(self.max_workers)
+        self._started = self._pool.apply_async(_ready)
+
+    def _run(self, fn, *args):
+        """fn(*args) in a worker; raises multiprocessing.TimeoutError past the budget or while restarting"""
+        with self._lock:
+            pool, started = self._pool, self._started
+        if not started.ready():
+            self.stats["restarting"] += 1
+            raise multiprocessing.TimeoutError("restarting")
+        try:
+            return pool.apply_async(fn, args).get(self.timeout)
+        except multiprocessing.TimeoutError:
+            self.stats["timeouts"] += 1
+            with self._lock:
+                if self._pool is pool:
+                    pool.terminate()
+                    self._start()
+            raise
+
+    def close(self):
+        with self._lock:
+            self._pool.terminate()
+
+    def solve(self, problem_text: str) -> Optional[dict]:
+        """SolverAgent-shaped solution, or None if the LLM should handle the problem"""
+        start = time.perf_counter()
+        with span("symbolic_solve") as s:
+            try:
+                result = self._run(_solve, problem_text)
+            except multiprocessing.TimeoutError:
+                s.set("outcome", "timeout")
+                return None
+            if result is None:
+                self.stats["unsupported"] += 1
+                s.set("outcome", "unsupported")
+                return None
+            self.stats["solved"] += 1
+            s.set("outcome", "solved")
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    def parse_problem(self, problem_text: str) -> Optional[dict]:
+        """parse_problem() under the same time budget; None on timeout"""
+        try:
+            return self._run(parse_problem, problem_text)
+        except multiprocessing.TimeoutError:
+            return None
+
+
+def to_markdown(solution: dict) -> str:
+    """Render a SolverAgent-shaped solution for display"""
+    lines = [f"**Approach:** {solution['approach']}", ""]
+    for step in solution["steps"]:
+        lines.append(f"{step['step']}. {step['description']}: `{step['calculation']}`")
+    lines += ["", f"**Final answer:** {solution['final_answer']}"]
+    return "\n".join(lines)
@@ -0,0 +1,426 @@
+"""
+Local answer checking, cheap enough to run on every solution before (and
+mostly instead of) the LLM verifier.
+
+The final answer is pulled out of the solution (SolverAgent's final_answer,
+a "Final answer" line, or \\boxed{}) and checked against the problem:
+
+- equations: every claimed root is substituted back in one NumPy call, and
+  for polynomials the number of distinct roots is compared with the claim
+- derivatives and simplify / factor / expand: both sides are compared at
+  random points
+- indefinite integrals: the claimed antiderivative is differentiated and
+  compared with the integrand at random points
+- definite integrals and limits: numeric quadrature / approach
+- anything else the symbolic solver can do: compared with its answer
+
+The result has VerifierAgent's JSON shape. None means the check was
+inconclusive and the LLM verifier should decide.
+"""
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Optional
+
+import numpy as np
+import sympy as sp
+
+from agents.symbolic_solver import FUNCTION_NAMES, SymbolicSolver, Unsupported, fmt, normalize, parse
+from utils.tracing import span
+
+_BOXED = re.compile(r"\\boxed\{((?:[^{}]|\{[^{}]*\})*)\}")
+_FINAL = re.compile(r"final answer(?: is)?[\s*:#\-]*", re.IGNORECASE)
+_FRAC = re.compile(r"\\[dt]?frac\{([^{}]*)\}\{([^{}]*)\}")
+_SQRT = re.compile(r"\\sqrt\{([^{}]*)\}")
+_LATEX = {
+    "\\left": "", "\\right": "", "\\cdot": "*", "\\times": "*", "\\infty": "oo", "\\pm": "±", "\\,": "", "\\;": "",
+    "\\!": "", "\\in": "=", "∈": "=", "\\{": "(", "\\}": ")", "{": "(", "}": ")", "\\": "",
+}
+_PROSE = re.compile(r"\b[a-z]{2,}\b")
+_NO_SOLUTION = re.compile(r"\bno (?:real )?(?:solutions?|roots?)\b")
+_SEPARATORS = re.compile(r" ?(?:;|\bor\b|\band\b|,(?![^()\[\]]*[)\]])) ?")
+
+SAMPLE_POINTS = 24
+RTOL = 1e-6
+
+
+def extract_final_answer(solution) -> Optional[str]:
+    """The final answer from a SolverAgent dict, its JSON, or free-form markdown"""
+    if isinstance(solution, str):
+        try:
+            parsed = json.loads(solution)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict):
+            solution = parsed
+    if isinstance(solution, dict):
+        answer = solution.get("final_answer")
+        return str(answer) if answer not in (None, "") else None
+
+    boxed = _BOXED.findall(solution)
+    if boxed:
+        return boxed[-1]
+    markers = list(_FINAL.finditer(solution))
+    if not markers:
+        # A bare answer; a longer write-up without a marker is left to the LLM verifier
+        return solution.strip() if solution.strip() and "\n" not in solution.strip() else None
+    for line in solution[markers[-1].end():].splitlines():
+        line = line.strip(" *#>`")
+        if line:
+            return line
+    return None
+
+
+def _delatex(text: str) -> str:
+    text = text.replace("$", "")
+    for _ in range(4):
+        text = _FRAC.sub(r"((\1)/(\2))", text)
+        text = _SQRT.sub(r"sqrt(\1)", text)
+    for old, new in _LATEX.items():
+        text = text.replace(old, new)
+    return text
+
+
+def _strip_prose(text: str) -> str:
+    """Cut words around a math expression: 'the answer is 2x + 1.' -> '2x + 1'"""
+    words = [m for m in _PROSE.finditer(text) if m.group() not in FUNCTION_NAMES]
+    while words and not text[:words[0].start()].strip(" :,"):
+        text = text[words[0].end():]
+        words = [m for m in _PROSE.finditer(text) if m.group() not in FUNCTION_NAMES]
+    if words:
+        text = text[:words[0].start()]
+    return text.split("≈")[0].strip(" .:,")
+
+
+def _answer_text(answer: str) -> str:
+    return normalize(_delatex(answer))
+
+
+def _expand_pm(value: str) -> list:
+    return [value.replace("±", "+"), value.replace("±", "-")] if "±" in value else [value]
+
+
+def _parse_value(text: str) -> list:
+    """Sympy values for one answer segment; tuples / lists / ± expand to several"""
+    values = []
+    for option in _expand_pm(_strip_prose(text)):
+        value = parse(option)
+        values.extend(value if isinstance(value, (tuple, list, sp.Tuple)) else [value])
+    return values
+
+
+def claimed_assignments(answer: str, unknowns: list) -> Optional[list]:
+    """
+    [{symbol: value}, ...] from answers like 'x = 2 or x = 3', 'x = 2, 3',
+    'x = (5 ± 1)/2', '(x, y) = (3, 2)' or 'x = 3, y = 2'. [] means the
+    answer claims there is no solution.
+    """
+    text = _answer_text(answer)
+    if _NO_SOLUTION.search(text):
+        return []
+    candidates, current = [], {}
+    last = unknowns[0] if len(unknowns) == 1 else None
+    for segment in _SEPARATORS.split(text):
+        if not segment.strip():
+            continue
+        if "=" in segment:
+            lhs, rhs = segment.rsplit("=", 1)
+            names = re.findall(r"\b[a-z]\b", lhs)
+            if not names:
+                continue
+            symbols = [sp.Symbol(n) for n in names]
+            values = _parse_value(rhs)
+        elif last is not None:
+            symbols, values = [last], _parse_value(segment)
+        else:
+            return None
+        if len(symbols) > 1:
+            if len(values) != len(symbols):
+                return None
+            pairs = [dict(zip(symbols, values))]
+        else:
+            pairs = [{symbols[0]: v} for v in values]
+        for pair in pairs:
+            # A repeated unknown starts the next solution
+            if current and set(pair) & set(current) or len(pair) > 1 and current:
+                candidates.append(current)
+                current = {}
+            current.update(pair)
+        last = symbols[-1]
+    if current:
+        candidates.append(current)
+    return candidates
+
+
+def claimed_expression(answer: str):
+    """The expression an answer ends in: 'f'(x) = 2x' -> 2*x, '3x^2 + C' -> 3*x**2 + c"""
+    text = _answer_text(answer)
+    return parse(_strip_prose(text.rsplit("=", 1)[-1]))
+
+
+def _verdict(is_correct: bool, confidence: float, method: str, issues: list = None,
+             suggestions: list = None) -> dict:
+    return {
+        "is_correct": is_correct,
+        "confidence": confidence,
+        "issues": issues or [],
+        "suggestions": suggestions or [],
+        "needs_human_review": not is_correct,
+        "method": method,
+        "verifier": "symbolic",
+    }
+
+
+class SymbolicVerifier:
+    """
+    Check answers without an LLM. Numeric checks evaluate all sample points
+    (and all claimed roots) in one vectorized call, so even sampling-based
+    checks take a few milliseconds; the time budget only guards sympy.
+    """
+
+    def __init__(self, solver: Optional[SymbolicSolver] = None, timeout: float = 1.0, seed: int = 0,
+                 max_workers: int = 2):
+        self.solver = solver or SymbolicSolver()
+        self.timeout = timeout
+        self._rng = np.random.default_rng(seed)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verifier")
+        self.stats = {"verified": 0, "rejected": 0, "inconclusive": 0}
+
+    def verify(self, problem: str, solution) -> Optional[dict]:
+        """VerifierAgent-shaped verdict, or None when the LLM verifier should decide"""
+        start = time.perf_counter()
+        with span("symbolic_verify") as s:
+            verdict = self._verify(problem, solution)
+            s.set("outcome", "inconclusive" if verdict is None else "correct" if verdict["is_correct"] else "wrong")
+        if verdict is not None:
+            verdict["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return verdict
+
+    def _verify(self, problem: str, solution) -> Optional[dict]:
+        answer = extract_final_answer(solution)
+        if not answer:
+            self.stats["inconclusive"] += 1
+            return None
+        future = self._pool.submit(self._check, problem, answer)
+        try:
+            verdict = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            verdict = None
+        if verdict is None:
+            self.stats["inconclusive"] += 1
+            return None
+        self.stats["verified" if verdict["is_correct"] else "rejected"] += 1
+        return verdict
+
+    def _check(self, problem: str, answer: str) -> Optional[dict]:
+        info = self.solver.parse_problem(problem)
+        checks = {
+            "equations": self._check_equations,
+            "derivative": self._check_derivative,
+            "integral": self._check_integral,
+            "limit": self._check_limit,
+            "transform": self._check_transform,
+        }
+        try:
+            with np.errstate(all="ignore"):
+                if info is not None:
+                    return checks[info["kind"]](info, answer)
+                return self._check_recomputed(problem, answer)
+        except (Unsupported, TypeError, ValueError, AttributeError, KeyError, IndexError,
+                ZeroDivisionError, NameError, SyntaxError, sp.SympifyError, sp.PolynomialError):
+            return None
+
+    # --- numeric helpers ---------------------------------------------------
+
+    def _points(self, symbols: list, n: int = SAMPLE_POINTS) -> list:
+        # Away from 0 and half on each side, so log / sqrt / 1/x still get enough valid points
+        signs = np.where(np.arange(n) % 2, -1.0, 1.0)
+        return [self._rng.uniform(0.2, 2.8, n) * signs for _ in symbols]
+
+    def _agree(self, claimed, expected) -> Optional[bool]:
+        """Whether two expressions agree at random points; None if too few points are defined"""
+        symbols = sorted((claimed.free_symbols | expected.free_symbols), key=lambda s: s.name)
+        points = self._points(symbols)
+        diff = np.broadcast_to(sp.lambdify(symbols, claimed - expected, "numpy")(*points), (SAMPLE_POINTS,))
+        scale = np.broadcast_to(sp.lambdify(symbols, expected, "numpy")(*points), (SAMPLE_POINTS,))
+        defined = np.isfinite(diff) & np.isfinite(scale)
+        if defined.sum() < SAMPLE_POINTS // 3:
+            return None
+        return bool(np.all(np.abs(diff[defined]) <= RTOL * (1 + np.abs(scale[defined]))))
+
+    # --- checks ------------------------------------------------------------
+
+    def _check_equations(self, info: dict, answer: str) -> Optional[dict]:
+        equations, unknowns = info["equations"], info["unknowns"]
+        candidates = claimed_assignments(answer, unknowns)
+        if candidates is None:
+            return None
+        if any(set(c) != set(unknowns) for c in candidates):
+            return None
+        if not candidates:
+            return self._check_no_solution(equations, unknowns)
+
+        # Parameters (a, b in "a x + b = 0") get random values; every candidate
+        # and every draw is evaluated in one call: arrays of shape (candidates, draws)
+        params = sorted(set().union(*(e.free_symbols for e in equations)) - set(unknowns), key=lambda s: s.name)
+        if any(v.free_symbols - set(params) for c in candidates for v in c.values()):
+            return None  # general solutions such as x = nπ
+        draws = self._points(params, 8) if params else []
+        shape = (len(candidates), len(draws[0]) if draws else 1)
+
+        def column(u) -> np.ndarray:
+            exprs = [c[u] for c in candidates]
+            if not params:
+                return np.array([[complex(e)] for e in exprs])
+            return np.array([np.broadcast_to(np.asarray(v, dtype=complex), shape[1:])
+                             for v in sp.lambdify(params, exprs, "numpy")(*draws)])
+
+        args = [column(u) for u in unknowns] + [np.broadcast_to(d, shape) for d in draws]
+        residual = sp.lambdify(unknowns + params, equations, "numpy")
+        size = sp.lambdify(unknowns + params, [sum(abs(t) for t in sp.Add.make_args(e)) for e in equations], "numpy")
+        residuals = np.abs(np.array([np.broadcast_to(r, shape) for r in residual(*args)]))
+        sizes = np.array([np.broadcast_to(s, shape) for s in size(*args)]).real
+        defined = np.isfinite(residuals) & np.isfinite(sizes)
+        if not defined.all(axis=0).any(axis=1).all():
+            return None
+        wrong = np.any(defined & (residuals > 1e-9 + RTOL * sizes), axis=(0, 2))
+
+        if wrong.any():
+            issues = [", ".join(f"{u} = {fmt(candidates[i][u])}" for u in unknowns)
+                      + " does not satisfy " + "; ".join(f"{fmt(e)} = 0" for e in equations)
+                      for i in np.flatnonzero(wrong)]
+            return _verdict(False, 0.99, "substitution", issues,
+                            ["Substitute each root back into the original equation"])
+        if len(equations) == 1 and len(unknowns) == 1:
+            roots = self._real_roots(equations[0], unknowns[0])
+            if roots is None:
+                return _verdict(True, 0.9, "substitution", suggestions=[
+                    "Every stated root checks out; whether any are missing was not verified"])
+            missing = self._missing_roots(roots, unknowns[0], candidates)
+            if missing:
+                return _verdict(False, 0.95, "substitution",
+                                [f"Incomplete: {missing}"], ["Find every root before stating the answer"])
+        return _verdict(True, 0.99, "substitution")
+
+    def _real_roots(self, equation, var) -> Optional[np.ndarray]:
+        poly = sp.Poly(equation, var) if equation.is_polynomial(var) else None
+        if poly is None or poly.free_symbols - {var} or poly.degree() < 1:
+            return None
+        roots = np.roots(np.array(poly.all_coeffs(), dtype=complex))
+        real = np.sort(roots[np.abs(roots.imag) < 1e-7].real)
+        return real[np.concatenate(([True], np.diff(real) > 1e-6))] if real.size else real
+
+    def _missing_roots(self, roots: np.ndarray, var, candidates: list) -> Optional[str]:
+        """Which distinct real roots of a polynomial the claimed answer leaves out"""
+        claimed = np.array([complex(c[var]) for c in candidates])
+        found = np.abs(claimed[:, None].real - roots[None, :]).min(axis=0) < 1e-6 if claimed.size else \
+            np.zeros(roots.size, dtype=bool)
+        if found.all():
+            return None
+        return f"{int(found.sum())} of {roots.size} real roots given; missing {var} ≈ " + \
+            ", ".join(f"{r:.6g}" for r in roots[~found])
+
+    def _check_no_solution(self, equations: list, unknowns: list) -> Optional[dict]:
+        if len(equations) == 1 and len(unknowns) == 1:
+            roots = self._real_roots(equations[0], unknowns[0])
+            if roots is not None:
+                if roots.size:
+                    return _verdict(False, 0.99, "substitution",
+                                    [f"The equation has real roots: {unknowns[0]} ≈ "
+                                     + ", ".join(f"{r:.6g}" for r in roots)])
+                return _verdict(True, 0.99, "substitution")
+        return None
+
+    def _check_derivative(self, info: dict, answer: str) -> Optional[dict]:
+        expected = sp.diff(info["expr"], info["var"], info["order"])
+        agree = self._agree(claimed_expression(answer), expected)
+        if agree is None:
+            return None
+        if not agree:
+            return _verdict(False, 0.97, "differentiation",
+                            [f"Derivative does not match d/d{info['var']} of {fmt(info['expr'])} at sample points"])
+        return _verdict(True, 0.97, "differentiation")
+
+    def _check_integral(self, info: dict, answer: str) -> Optional[dict]:
+        expr, var = info["expr"], info["var"]
+        if info["bounds"] is None:
+            # Differentiating the claimed antiderivative also discards the constant
+            agree = self._agree(sp.diff(claimed_expression(answer), var), expr)
+            if agree is None:
+                return None
+            if not agree:
+                return _verdict(False, 0.97, "differentiation",
+                                [f"Derivative of the answer is not {fmt(expr)}"])
+            return _verdict(True, 0.97, "differentiation")
+
+        a, b = (complex(bound) for bound in info["bounds"])
+        if a.imag or b.imag:
+            return None
+        xs = np.linspace(a.real, b.real, 4097)
+        ys = np.broadcast_to(sp.lambdify([var], expr, "numpy")(xs), xs.shape).astype(float)
+        if not np.all(np.isfinite(ys)):
+            return None
+        # Composite Simpson's rule
+        h = (xs[-1] - xs[0]) / (xs.size - 1)
+        value = h / 3 * (ys[0] + ys[-1] + 4 * ys[1:-1:2].sum() + 2 * ys[2:-1:2].sum())
+        claimed = complex(claimed_expression(answer))
+        if abs(claimed - value) <= 1e-6 * (1 + abs(value)):
+            return _verdict(True, 0.97, "quadrature")
+        return _verdict(False, 0.95, "quadrature", [f"Numerical integration gives ≈ {value:.8g}, not {claimed.real:.8g}"])
+
+    def _check_limit(self, info: dict, answer: str) -> Optional[dict]:
+        expr, var, point = info["expr"], info["var"], info["point"]
+        f = sp.lambdify([var], expr, "numpy")
+        if point in (sp.oo, -sp.oo):
+            xs = np.sign(float(point)) * 10.0 ** np.arange(2, 8)[None, :]
+        else:
+            # Approach from both sides
+            steps = 10.0 ** -np.arange(2, 7)
+            xs = float(point) + np.array([steps, -steps])
+        ys = np.broadcast_to(f(xs), xs.shape).astype(complex)
+        if not np.all(np.isfinite(ys)):
+            return None
+        claimed = claimed_expression(answer)
+        last, prev = ys[:, -1], ys[:, -2]
+        if claimed in (sp.oo, -sp.oo):
+            growing = np.all(np.abs(last) > 1e4 * (1 + np.abs(ys[:, 0]))) and \
+                np.all(np.sign(last.real) == np.sign(float(claimed)))
+            return _verdict(True, 0.9, "numeric limit") if growing else None
+        claimed = complex(claimed)
+        converged = np.all(np.abs(last - prev) <= 1e-4 * (1 + np.abs(last)))
+        if not converged:
+            return None
+        if np.all(np.abs(last - claimed) <= 1e-3 * (1 + abs(claimed))):
+            return _verdict(True, 0.9, "numeric limit")
+        return _verdict(False, 0.9, "numeric limit",
+                        [f"{fmt(expr)} approaches ≈ {last[0].real:.6g} as {var} → {fmt(point)}, not {claimed.real:.6g}"])
+
+    def _check_transform(self, info: dict, answer: str) -> Optional[dict]:
+        agree = self._agree(claimed_expression(answer), info["expr"])
+        if agree is None:
+            return None
+        if not agree:
+            return _verdict(False, 0.97, "sampling",
+                            [f"The answer is not equal to {fmt(info['expr'])} at sample points"])
+        return _verdict(True, 0.97, "sampling")
+
+    def _check_recomputed(self, problem: str, answer: str) -> Optional[dict]:
+        """Arithmetic, counting, probability, matrices: compare with an independent symbolic solve"""
+        reference = self.solver.solve(problem)
+        if reference is None:
+            return None
+        expected = parse(_strip_prose(normalize(reference["final_answer"]).rsplit("=", 1)[-1]))
+        claimed = claimed_expression(answer)
+        try:
+            expected_values = np.array(expected.tolist() if hasattr(expected, "tolist") else expected, dtype=complex)
+            claimed_values = np.array(claimed.tolist() if hasattr(claimed, "tolist") else claimed, dtype=complex)
+        except (TypeError, ValueError):
+            return None
+        if expected_values.shape != claimed_values.shape:
+            return _verdict(False, 0.95, "recomputed", [f"Expected {reference['final_answer']}"])
+        if np.allclose(claimed_values, expected_values, rtol=RTOL, atol=1e-9):
+            return _verdict(True, 0.99, "recomputed")
+        return _verdict(False, 0.99, "recomputed", [f"Expected {reference['final_answer']}"])
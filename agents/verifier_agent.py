@@ -1,14 +1,13 @@
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
+from agents.registry import get_chat_model, get_symbolic_verifier
+import asyncio
 import json
 
 class VerifierAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4-turbo", temperature=0)
-    
-    def verify(self, problem: str, solution: str):
-        """Check if solution is correct and complete"""
-        prompt = PromptTemplate(
+        self.llm = get_chat_model("gpt-4-turbo", temperature=0)
+        self.checker = get_symbolic_verifier()
+        self.prompt = PromptTemplate(
             input_variables=["problem", "solution"],
             template="""Verify this solution:
 
@@ -32,11 +31,32 @@ Return JSON:
     "needs_human_review": false
 }}"""
         )
-        
-        chain = prompt | self.llm
+    
+    def verify(self, problem: str, solution: str):
+        """Check if solution is correct and complete"""
+        # Substitution / differentiation / numeric sampling settle most answers; the LLM only sees the rest
+        verdict = self.checker.verify(problem, solution)
+        if verdict is not None:
+            return verdict
+
+        chain = self.prompt | self.llm
         response = chain.invoke({
             "problem": problem,
             "solution": solution
         })
         
         return json.loads(response.content)
+    
+    async def averify(self, problem: str, solution: str):
+        """Async variant of verify() for the concurrent pipeline"""
+        verdict = await asyncio.to_thread(self.checker.verify, problem, solution)
+        if verdict is not None:
+            return verdict
+
+        chain = self.prompt | self.llm
+        response = await chain.ainvoke({
+            "problem": problem,
+            "solution": solution
+        })
+        
+        return json.loads(response.content)
@@ -0,0 +1,109 @@
+"""
+Worksheet mode: one OCR / ASR / typed input holding several questions is
+split into problems that are solved independently and concurrently.
+
+Numbered questions ("1.", "2)", "(3)", "Q4:", "Question 5.", "Problem 6")
+are split by rule, without a model call. The numbers must count up by one,
+so a stray "3)" inside a question does not start a new one. Instructions
+before the first question ("Solve for x:") are kept with every question.
+Unnumbered input that still looks like several questions can go to
+ParserAgent.split, which returns one ParsedProblem per question.
+
+Each problem runs through agents.solve_flow.solve_problem on its own, so it
+gets its own memory lookup, solution cache entry, single-flight key and
+token budget, instead of one giant prompt truncated at max_tokens.
+"""
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+from agents.solve_flow import solve_problem
+from utils.tracing import span
+
+_MARKER = re.compile(
+    r"^[ \t]*(?:(?:Q|Question|Problem|Ex(?:ercise)?)\.?[ \t]*)?\(?(\d{1,3})[.):][ \t]+",
+    re.IGNORECASE | re.MULTILINE)
+# Longer instructions before the first number are a passage or a heading block, not a shared prompt
+MAX_PREAMBLE_CHARS = 200
+# Unnumbered input only goes to the parser when it looks like several questions
+MIN_SPLIT_CHARS = 300
+
+
+def split_numbered(text: str) -> list:
+    """The numbered questions in text, with any short shared instructions prefixed; [] if fewer than two"""
+    markers = []
+    for match in _MARKER.finditer(text):
+        number = int(match.group(1))
+        if not markers or number == markers[-1][0] + 1:
+            markers.append((number, match.start(), match.end()))
+    if len(markers) < 2:
+        return []
+    preamble = text[:markers[0][1]].strip()
+    if len(preamble) > MAX_PREAMBLE_CHARS:
+        preamble = ""
+    problems = []
+    for (_, _, body_start), (_, next_start, _) in zip(markers, markers[1:] + [(None, len(text), None)]):
+        body = " ".join(text[body_start:next_start].split())
+        if body:
+            problems.append(f"{preamble} {body}" if preamble else body)
+    return problems if len(problems) >= 2 else []
+
+
+def looks_like_worksheet(text: str) -> bool:
+    return len(text) >= MIN_SPLIT_CHARS and text.count("?") >= 2
+
+
+def split_worksheet(text: str, parser=None) -> list:
+    """
+    Problems in text, in order: the numbered questions, else the parser's
+    split of input that looks like several questions, else [text]
+    """
+    with span("worksheet_split", input_chars=len(text)) as s:
+        problems = split_numbered(text)
+        s.set("method", "numbered")
+        if not problems and parser is not None and looks_like_worksheet(text):
+            s.set("method", "parser")
+            try:
+                problems = [p.problem_text for p in parser.split(text) if p.problem_text.strip()]
+            except Exception:
+                problems = []
+        if len(problems) < 2:
+            s.set("method", "single")
+            problems = [text]
+        s.set("problems", len(problems))
+    return problems
+
+
+def solve_worksheet(problems: list,
+                    memory,
+                    symbolic_solver,
+                    solver,
+                    checker,
+                    concurrency: int = 4,
+                    on_result: Optional[Callable[[int, dict], None]] = None) -> list:
+    """
+    solve_problem for every problem with at most concurrency in flight.
+    Returns the outcomes in order, each with its "problem" and the "steps"
+    (agent, status, details, seconds) it took. on_result(index, outcome) is
+    called from this thread as each problem finishes, in completion order.
+    """
+    def solve_one(index: int, problem: str) -> dict:
+        steps = []
+        with span("worksheet_problem", index=index, input_chars=len(problem)) as s:
+            outcome = solve_problem(problem, memory, symbolic_solver, solver, checker,
+                                    on_step=lambda *step: steps.append(step))
+            s.set("source", outcome["source"])
+        return {**outcome, "problem": problem, "steps": steps}
+
+    outcomes = [None] * len(problems)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="worksheet") as pool:
+        # Each problem gets its own copy of the context, so its spans nest under the caller's
+        futures = {pool.submit(contextvars.copy_context().run, solve_one, i, problem): i
+                   for i, problem in enumerate(problems)}
+        for future in as_completed(futures):
+            index = futures[future]
+            outcomes[index] = future.result()
+            if on_result is not None:
+                on_result(index, outcomes[index])
+    return outcomes
@@ -1,15 +1,13 @@
-import streamlit as st
-from groq import Groq
-import json
-from datetime import datetime
-import pytesseract
-from PIL import Image
 import os
-import tempfile
-import time  # Add this line!
+
 import streamlit as st
-import os
-from groq import Groq
+from agents.groq_solver import GroqSolver
+from agents.registry import (construction_metrics, get_groq_client, get_memory_manager, get_ocr_cache,
+                             get_ocr_handler, get_single_flight, get_solution_cache,
+                             get_symbolic_solver, get_symbolic_verifier, get_tracer, get_transcriber)
+from agents.solve_flow import solve_problem
+from agents.worksheet import solve_worksheet, split_worksheet
+from utils.tracing import span
 # ... rest of imports
 
 
@@ -58,12 +56,15 @@ if "memory_count" not in st.session_state:
     st.session_state.memory_count = 247
 if "similar_problems" not in st.session_state:
     st.session_state.similar_problems = 0
+if "solved_problem" not in st.session_state:
+    st.session_state.solved_problem = None
 
 
 try:
     api_key = st.secrets.get("GROQ_API_KEY", os.getenv("GROQ_API_KEY", ""))
     if api_key:
-        client = Groq(api_key=api_key)
+        # Built once per process and reused across reruns and sessions
+        client = get_groq_client(api_key)
     else:
         st.error("⚠️ GROQ_API_KEY not found")
         client = None
@@ -71,25 +72,31 @@ except Exception as e:
     st.error(f"⚠️ Error: {e}")
     client = None
 
-def add_agent_trace(agent_name: str, status: str, details: str = ""):
-    """Log agent with RESETTABLE elapsed seconds (starts from 0.0s)"""
-    
-    # RESET timer for each pipeline run - starts from 0.0s!
-    if "agent_pipeline_start" not in st.session_state:
-        st.session_state.agent_pipeline_start = time.time()
-    
-    elapsed_seconds = round(time.time() - st.session_state.agent_pipeline_start, 1)
-    
+
+# First, so spans from everything built below go to the trace file
+tracer = get_tracer()
+memory = get_memory_manager()
+solution_cache = get_solution_cache()
+solver_flights = get_single_flight()
+solver = GroqSolver(client, cache=solution_cache, single_flight=solver_flights)
+symbolic_solver = get_symbolic_solver()
+answer_checker = get_symbolic_verifier()
+ocr = get_ocr_handler()
+ocr_cache = get_ocr_cache()
+transcriber = get_transcriber(client)
+worksheet_concurrency = int(os.getenv("WORKSHEET_CONCURRENCY", 4))
+
+def add_agent_trace(agent_name: str, status: str, details: str = "", seconds: float = None):
+    """Log an agent step with the measured duration of the work it did"""
     trace_item = {
         "agent": agent_name,
         "status": "✓" if status == "success" else "✗",
-        "time": f"{elapsed_seconds}s",  # 0.3s, 1.2s, 2.8s → PERFECT!
+        "time": f"{seconds:.2f}s" if seconds is not None else "-",
         "details": details
     }
     st.session_state.agent_trace.append(trace_item)
 
 
-
 def add_retrieved_source(source_name: str, relevance: float, content: str = ""):
     source = {
         "name": source_name,
@@ -101,13 +108,19 @@ def add_retrieved_source(source_name: str, relevance: float, content: str = ""):
 
 def extract_text_from_image(image_file) -> str:
     try:
-        image = Image.open(image_file)
-        if image.width > 2000 or image.height > 2000:
-            image.thumbnail((2000, 2000))
-        
-        extracted_text = pytesseract.image_to_string(image)
+        with span("ocr") as s:
+            # Every rerun lands here with the same upload; OCR only runs for images not seen before
+            result = ocr_cache.get_or_extract(image_file.getvalue(), ocr.extract_text_from_image)
+            s.set("cache", result["cache"])
+            s.set("pages", result["pages"])
+            s.set("regions", result["regions"])
+            s.set("confidence", result["confidence"])
+            extracted_text = result["text"]
+            s.set("chars", len(extracted_text.strip()))
         
         if extracted_text.strip():
+            for warning in result["warnings"]:
+                st.warning(warning)
             return extracted_text.strip()
         else:
             return "❌ No text detected"
@@ -115,93 +128,98 @@ def extract_text_from_image(image_file) -> str:
         return f"❌ OCR Error: {str(e)}"
 
 
-def extract_text_from_audio(audio_file) -> str:
+def extract_text_from_audio(audio_file, on_partial=None) -> str:
     try:
-        if not client:
+        if transcriber.backend.client is None:
             return "⚠️ Groq client not initialized"
         
-        audio_bytes = audio_file.read()
-        audio_file.seek(0)
+        # Straight from the upload buffer; reruns with the same clip attached hit the transcript cache.
+        # Long recordings are transcribed in chunks, with the text so far passed to on_partial
+        result = transcriber.transcribe(audio_file.getvalue(), filename=audio_file.name, language="en",
+                                        on_partial=on_partial)
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
-        
-        try:
-            with open(tmp_path, "rb") as audio_temp:
-                transcript = client.audio.transcriptions.create(
-                    file=audio_temp,
-                    model="whisper-large-v3-turbo",
-                    language="en"
-                )
-            
-            if transcript and hasattr(transcript, 'text'):
-                return transcript.text.strip()
-            elif isinstance(transcript, str):
-                return transcript.strip()
-            else:
-                return "❌ No speech detected"
-        finally:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+        if result["text"]:
+            return result["text"]
+        else:
+            return "❌ No speech detected"
                 
     except Exception as e:
         return f"❌ Audio Error: {str(e)}"
 
 
-def solve_with_groq(problem: str) -> str:
+def solve_with_groq(problem: str, on_token=None) -> str:
     # RESET everything for clean pipeline
-    st.session_state.agent_pipeline_start = time.time()  # ✅ Zero timer!
     st.session_state.agent_trace = []
     st.session_state.retrieved_sources = []
     
-    add_agent_trace("Parser Agent", "success", "Cleaned and parsed input problem")
-    add_retrieved_source("Algebra Formulas", 0.92, "Quadratic formula, linear equations, polynomial identities")
-    
-    add_agent_trace("Intent Router", "success", "Classified problem as Mathematics")
+    # One trace per solve; every stage below records a child span
+    with span("request", input_chars=len(problem)):
+        return _solve(problem, on_token)
+
+
+def _solve(problem: str, on_token=None) -> str:
+    outcome = solve_problem(problem, memory, symbolic_solver, solver, answer_checker,
+                            on_token=on_token, on_step=add_agent_trace)
+    _record_outcome(outcome)
+    return outcome["solution"]
+
+
+def _record_outcome(outcome: dict):
+    if outcome["source"] in ("cache", "shared", "llm"):
+        if not st.session_state.retrieved_sources:
+            add_retrieved_source("Algebra Formulas", 0.92, "Quadratic formula, linear equations, polynomial identities")
+            add_retrieved_source("Solution Templates", 0.87, "Standard solution patterns")
+            add_retrieved_source("Common Mistakes", 0.81, "Typical errors and how to avoid them")
+        st.session_state.memory_count += 1
+        st.session_state.similar_problems += 1
+    elif outcome["source"] == "memory":
+        st.session_state.similar_problems += 1
+
+
+def mark_correct():
+    """Feedback button callback: runs at the start of the next rerun, when solve_button is False again"""
+    memory.save_attempt(st.session_state.solved_problem, st.session_state.solution,
+                        feedback="correct", verified=True)
+    st.session_state.feedback_saved = True
+
+
+def split_problems(text: str) -> list:
+    """Questions in the input; unnumbered multi-question scans and recordings go to the parser when it is configured"""
+    parser = None
+    if input_mode != "Text Input" and os.getenv("OPENAI_API_KEY"):
+        from agents.parser_agent import ParserAgent
+        from agents.registry import get_agent
+        parser = get_agent(ParserAgent)
+    return split_worksheet(text, parser=parser)
+
+
+def solve_worksheet_with_groq(problems: list) -> str:
+    """Solve every question concurrently, rendering each solution as soon as it is ready"""
+    st.session_state.agent_trace = []
+    st.session_state.retrieved_sources = []
     
-    add_agent_trace("RAG Pipeline", "success", "Retrieved 3 relevant sources")
-    add_retrieved_source("Solution Templates", 0.87, "Standard solution patterns")
-    add_retrieved_source("Common Mistakes", 0.81, "Typical errors and how to avoid them")
+    placeholders = []
+    for number, problem in enumerate(problems, 1):
+        st.markdown(f"#### Problem {number}")
+        st.caption(problem)
+        placeholders.append(st.empty())
+        placeholders[-1].info("⏳ Solving...")
     
-    add_agent_trace("Solver Agent", "processing", "Solving with retrieved context...")
+    def show(index: int, outcome: dict):
+        # Called on this script thread; worker threads never touch Streamlit
+        placeholders[index].markdown(outcome["solution"])
     
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "user", "content": f"""
-You are an expert math tutor solving JEE-style problems. 
-Solve this problem step by step:
-
-Problem: {problem}
-
-Provide:
-1. Problem understanding
-2. Solution strategy
-3. Step-by-step solution
-4. Final answer
-5. Verification
-"""}
-            ],
-            temperature=0.7,
-            max_tokens=1024,
-        )
-        
-        solution_text = completion.choices[0].message.content
-        add_agent_trace("Solver Agent", "success", "Solution generated")
-        
-        st.session_state.memory_count += 1
-        st.session_state.similar_problems += 1
-        
-    except Exception as e:
-        solution_text = f"⚠️ Error: {str(e)}"
-        add_agent_trace("Solver Agent", "error", str(e))
+    with span("request", input_chars=sum(len(p) for p in problems), problems=len(problems)):
+        outcomes = solve_worksheet(problems, memory, symbolic_solver, solver, answer_checker,
+                                   concurrency=worksheet_concurrency, on_result=show)
     
-    add_agent_trace("Verifier Agent", "success", "Verified (Confidence: 0.94)")
-    add_agent_trace("Explainer Agent", "success", "Generated explanation")
+    for number, outcome in enumerate(outcomes, 1):
+        for agent, status, details, seconds in outcome["steps"]:
+            add_agent_trace(f"{agent} (Q{number})", status, details, seconds)
+        _record_outcome(outcome)
     
-    return solution_text
+    return "\n\n".join(f"**Problem {number}.** {outcome['problem']}\n\n{outcome['solution']}"
+                       for number, outcome in enumerate(outcomes, 1))
 
 
 st.markdown("# 🧮 AI Math Mentor")
@@ -214,6 +232,25 @@ input_mode = st.sidebar.radio(
     ["Text Input", "Image Upload", "Audio Input"],
     key="input_mode"
 )
+stream_solution = st.sidebar.checkbox("⚡ Stream solution as it is generated", value=True)
+
+with st.sidebar.expander("🧊 Cold Start", expanded=False):
+    # Reuses keep climbing across reruns while construction time is paid once
+    st.table([
+        {"Resource": name, "Built in": f"{m['construction_s'] * 1000:.0f} ms", "Reuses": m["reuses"]}
+        for name, m in construction_metrics().items()
+    ])
+    st.caption(f"Upstream solves saved by coalescing: {solver_flights.saved_calls()} "
+               f"({solver_flights.stats['upstream_calls']} made)")
+
+with st.sidebar.expander("⏱️ Latency by Stage", expanded=False):
+    # Every session and earlier runs (from the trace file), slowest p95 first
+    st.table([
+        {"Stage": row["stage"], "n": row["n"], "p50": f"{row['p50_ms']:.0f} ms",
+         "p95": f"{row['p95_ms']:.0f} ms", "p99": f"{row['p99_ms']:.0f} ms"}
+        for row in tracer.histograms.summary()
+    ])
+    st.caption(f"Spans exported to {tracer.exporter.path}")
 
 
 if input_mode == "Text Input":
@@ -231,7 +268,8 @@ if input_mode == "Text Input":
 
 elif input_mode == "Image Upload":
     st.subheader("📸 Upload Problem Image")
-    uploaded_file = st.file_uploader("Choose an image (JPG, PNG)", type=["jpg", "jpeg", "png"])
+    uploaded_file = st.file_uploader("Choose an image or scanned worksheet (JPG, PNG, TIFF)",
+                                     type=["jpg", "jpeg", "png", "tif", "tiff"])
     
     if uploaded_file:
         st.image(uploaded_file, caption="Uploaded Image", use_column_width=True)
@@ -263,8 +301,11 @@ elif input_mode == "Audio Input":
     if audio_file:
         st.audio(audio_file)
         
+        partial_placeholder = st.empty()
         with st.spinner("🎯 Transcribing audio..."):
-            extracted_text = extract_text_from_audio(audio_file)
+            extracted_text = extract_text_from_audio(
+                audio_file, on_partial=lambda text: partial_placeholder.info(f"🎯 **Transcribing...**\n\n{text}"))
+        partial_placeholder.empty()
         
         if not extracted_text.startswith("❌"):
             st.success("✅ Transcription Complete!")
@@ -286,20 +327,33 @@ elif input_mode == "Audio Input":
 if solve_button and problem_text:
     st.session_state.problem_solved = True
     
-    with st.spinner("🤔 Solving..."):
-        solution = solve_with_groq(problem_text)
-        st.session_state.solution = solution
+    found_placeholder = st.empty()
+    problems = split_problems(problem_text)
+    
+    if len(problems) > 1:
+        st.markdown(f"### 📚 Solutions ({len(problems)} problems)")
+        solution = solve_worksheet_with_groq(problems)
+    else:
+        st.markdown("### 📚 Solution")
+        solution_placeholder = st.empty()
+        
+        if stream_solution:
+            # Partial markdown is rendered into the placeholder as chunks arrive
+            solution = solve_with_groq(problem_text, on_token=solution_placeholder.markdown)
+        else:
+            with st.spinner("🤔 Solving..."):
+                solution = solve_with_groq(problem_text)
+        solution_placeholder.markdown(solution)
+    st.session_state.solution = solution
+    st.session_state.solved_problem = problem_text
     
-    st.markdown("""
+    found_placeholder.markdown("""
     <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
                 color: white; padding: 1.5rem; border-radius: 10px; margin: 1rem 0;">
         <h3>✅ Solution Found!</h3>
     </div>
     """, unsafe_allow_html=True)
     
-    st.markdown("### 📚 Solution")
-    st.markdown(solution)
-    
     st.markdown("---")
     
     with st.expander("🤖 Agent Trace - What Happened?", expanded=False):
@@ -336,8 +390,7 @@ if solve_button and problem_text:
     feedback_col1, feedback_col2, feedback_col3 = st.columns(3)
     
     with feedback_col1:
-        if st.button("✅ Correct Solution", use_container_width=True):
-            st.success("✅ Thank you! Solution marked as correct.")
+        st.button("✅ Correct Solution", use_container_width=True, on_click=mark_correct)
     
     with feedback_col2:
         if st.button("❌ Incorrect", use_container_width=True):
@@ -364,7 +417,12 @@ if solve_button and problem_text:
         with col3:
             st.metric("Pattern Matches", "2")
         with col4:
-            st.metric("Learning Efficiency", "94%")
+            st.metric("Cache Hit Rate", f"{solution_cache.hit_rate():.0%}")
+            st.caption(f"OCR cache: {ocr_cache.hit_rate():.0%}")
+
+
+if st.session_state.pop("feedback_saved", False):
+    st.success("✅ Thank you! Solution marked as correct.")
 
 
 st.markdown("---")
@@ -0,0 +1,106 @@
+"""
+Recall@k against exact flat search, query latency and resident memory of the
+knowledge-base index types in rag.vector_index.
+
+Vectors are synthetic, clustered and unit-normalized like sentence
+embeddings. Each index is built and written once, then loaded (memory-mapped)
+and queried in a fresh process so its resident memory is measured in isolation.
+
+    python -m benchmarks.bench_ann --vectors 100000 --dim 384
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness import print_table, rss_mb, summarize
+from rag import vector_index
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def query_index(path: str, params: dict, queries: np.ndarray, k: int, mmap: bool) -> dict:
+    """Runs in a child process: load, query one at a time, report latencies and memory"""
+    import faiss  # noqa: F401  (not part of the index's footprint)
+    before = rss_mb()
+    start = time.perf_counter()
+    index = vector_index.read_index(path, params, mmap=mmap)
+    load_s = time.perf_counter() - start
+    loaded = rss_mb()
+    latencies, ids = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, found = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        ids.append(found[0])
+    return {
+        "load_s": load_s,
+        "latencies": latencies,
+        "ids": np.array(ids),
+        "rss_load_mb": loaded - before,
+        "rss_query_mb": rss_mb() - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--no-mmap", action="store_true", help="read indexes fully into memory instead")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim, clusters=max(10, args.vectors // 100), seed=args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+    params = {"nprobe": args.nprobe, "ef_search": args.ef_search}
+    ctx = multiprocessing.get_context("spawn")
+    rows, truth = [], None
+    with tempfile.TemporaryDirectory() as tmp:
+        for index_type in vector_index.INDEX_TYPES:
+            start = time.perf_counter()
+            index = vector_index.build_index(vectors, index_type, params)
+            build_s = time.perf_counter() - start
+            path = str(Path(tmp) / f"{index_type}.faiss")
+            vector_index.write_index(index, path, index_type, vector_index.resolve_params(index_type, params))
+            del index
+
+            with ctx.Pool(1) as pool:
+                result = pool.apply(query_index, (path, params, queries, args.k, not args.no_mmap))
+            if truth is None:
+                truth = result["ids"]  # flat comes first: exact neighbours
+            recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(result["ids"], truth)])
+            stats = summarize(result["latencies"])
+            rows.append({
+                "index": index_type,
+                f"recall@{args.k}": float(recall),
+                "p50_ms": stats["p50_ms"],
+                "p99_ms": stats["p99_ms"],
+                "build_s": build_s,
+                "load_ms": result["load_s"] * 1000,
+                "file_mb": Path(path).stat().st_size / 2**20,
+                "rss_load_mb": result["rss_load_mb"],
+                "rss_query_mb": result["rss_query_mb"],
+            })
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, "
+          f"{'full read' if args.no_mmap else 'memory-mapped'}\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Query latency and index-build throughput of an embedding backend, compared
+with recorded numbers for the remote OpenAI backend.
+
+    python -m benchmarks.bench_embeddings --backend local
+    python -m benchmarks.bench_embeddings --backend openai --record   # needs OPENAI_API_KEY
+
+--record writes the measured numbers to benchmarks/fixtures/remote_embeddings.json,
+which later offline runs read as the baseline. Cache storage size per vector
+is reported for each storage dtype.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import print_table, summarize
+from rag.embedding_backends import get_embedding_backend
+from rag.embedding_cache import STORAGE_DTYPES, EmbeddingCache
+
+BASELINE_PATH = Path(__file__).parent / "fixtures" / "remote_embeddings.json"
+QUERIES = [
+    "quadratic formula",
+    "Bayes theorem conditional probability",
+    "derivative of sin x",
+    "determinant of a 2x2 matrix",
+    "sum of an arithmetic progression",
+    "integration by parts",
+]
+
+
+def corpus_chunks(count: int, seed: int) -> list:
+    """Chunks shaped like the KB: the real docs, resampled and shuffled to the requested size"""
+    words = " ".join(p.read_text(encoding="utf-8") for p in Path("rag/kb_docs").glob("*.txt")).split()
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(words, k=rng.randint(60, 100))) for _ in range(count)]
+
+
+def measure(backend, chunks: list, queries: int, batch_size: int) -> dict:
+    backend(chunks[:batch_size])  # warm-up: model load, connection setup
+
+    start = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        backend(chunks[i:i + batch_size])
+    build_s = time.perf_counter() - start
+
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        backend([QUERIES[i % len(QUERIES)]])
+        latencies.append(time.perf_counter() - start)
+
+    stats = summarize(latencies)
+    return {
+        "backend": backend.name,
+        "chunks_per_s": len(chunks) / build_s,
+        "query_p50_ms": stats["p50_ms"],
+        "query_p99_ms": stats["p99_ms"],
+    }
+
+
+def storage_sizes(backend, chunks: list) -> list:
+    vectors = backend(chunks)
+    rows = []
+    for dtype in STORAGE_DTYPES:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = EmbeddingCache(tmp, dtype=dtype)
+            cache.put_many({str(i): v for i, v in enumerate(vectors)})
+            size = sum(p.stat().st_size for p in Path(tmp).iterdir() if p.suffix in (".bin", ".f32"))
+            restored = cache.get_many([str(i) for i in range(len(vectors))])
+            error = max(abs(a - b) for i, v in enumerate(vectors) for a, b in zip(v, restored[str(i)]))
+        rows.append({"dtype": dtype, "bytes_per_vector": size / len(vectors), "max_abs_error": float(error)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="local", choices=["openai", "local", "deterministic"])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--record", action="store_true", help="save results as the recorded baseline")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    backend = get_embedding_backend(args.backend)
+    chunks = corpus_chunks(args.chunks, args.seed)
+    rows = [measure(backend, chunks, args.queries, args.batch_size)]
+
+    if args.record:
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({**rows[0], "chunks": args.chunks, "recorded_at": time.strftime("%Y-%m-%d")}, f, indent=2)
+        print(f"Recorded baseline to {BASELINE_PATH}")
+    elif BASELINE_PATH.exists():
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        rows.append({k: baseline[k] for k in rows[0]} | {"backend": f"{baseline['backend']} (recorded)"})
+    else:
+        print(f"No recorded remote baseline at {BASELINE_PATH}; run with --backend openai --record")
+
+    print_table(rows)
+    print()
+    print_table(storage_sizes(backend, chunks[:256]))
+
+
+if __name__ == "__main__":
+    main()
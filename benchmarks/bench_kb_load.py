@@ -0,0 +1,125 @@
+"""
+Startup cost of the knowledge-base index: the previous pickled LangChain
+docstore (FAISS.load_local) against the raw FAISS file plus columnar chunk
+store, and the cost of materializing top-k results.
+
+Each format is loaded in a fresh process so load time and resident memory
+are measured cold-ish and in isolation.
+
+    python -m benchmarks.bench_kb_load --chunks 100000
+"""
+import argparse
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness import print_table, rss_mb, summarize
+
+
+def synthetic_chunks(count: int, seed: int) -> list:
+    words = " ".join(p.read_text(encoding="utf-8") for p in Path("rag/kb_docs").glob("*.txt")).split()
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(words, k=rng.randint(60, 100))) for _ in range(count)]
+
+
+def write_pickled(index_dir: str, ids: list, texts: list, vectors: np.ndarray):
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    docstore = InMemoryDocstore({i: Document(page_content=t, metadata={"source": "kb.txt", "chunk_id": i})
+                                 for i, t in zip(ids, texts)})
+    FAISS(None, index, docstore, dict(enumerate(ids))).save_local(index_dir)
+
+
+def write_columnar(index_dir: str, ids: list, texts: list, vectors: np.ndarray):
+    from rag import vector_index
+    from rag.chunk_store import ChunkStore
+
+    index = vector_index.build_index(vectors, "flat")
+    vector_index.write_index(index, str(Path(index_dir) / "index.faiss"), "flat", vector_index.resolve_params("flat"))
+    ChunkStore.write(str(Path(index_dir) / "chunks"), ids, texts, [{"source": "kb.txt"}] * len(ids))
+
+
+def load_and_query(fmt: str, index_dir: str, queries: np.ndarray, k: int) -> dict:
+    """Runs in a child process"""
+    import faiss  # noqa: F401  (library footprint is not part of the load)
+    from langchain_core.documents import Document  # noqa: F401
+
+    before = rss_mb()
+    start = time.perf_counter()
+    if fmt == "pickled docstore":
+        from langchain_community.vectorstores import FAISS
+        store = FAISS.load_local(index_dir, None, allow_dangerous_deserialization=True)
+        load_s = time.perf_counter() - start
+
+        def top_k(q):
+            _, rows = store.index.search(q[None, :], k)
+            return [store.docstore.search(store.index_to_docstore_id[r]) for r in rows[0]]
+    else:
+        from rag import vector_index
+        from rag.chunk_store import ChunkStore
+        index = vector_index.read_index(str(Path(index_dir) / "index.faiss"))
+        chunks = ChunkStore(str(Path(index_dir) / "chunks"))
+        load_s = time.perf_counter() - start
+
+        def top_k(q):
+            _, rows = index.search(q[None, :], k)
+            return [chunks.document(int(r)) for r in rows[0]]
+    loaded = rss_mb()
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        top_k(q)
+        latencies.append(time.perf_counter() - start)
+    return {"load_s": load_s, "rss_load_mb": loaded - before, "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    texts = synthetic_chunks(args.chunks, args.seed)
+    ids = [f"{i:064x}" for i in range(args.chunks)]
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.standard_normal((args.chunks, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, write in (("pickled docstore", write_pickled), ("columnar mmap", write_columnar)):
+            index_dir = str(Path(tmp) / fmt.replace(" ", "_"))
+            write(index_dir, ids, texts, vectors)
+            size = sum(p.stat().st_size for p in Path(index_dir).rglob("*") if p.is_file())
+            with ctx.Pool(1) as pool:
+                result = pool.apply(load_and_query, (fmt, index_dir, queries, args.k))
+            stats = summarize(result["latencies"])
+            rows.append({
+                "format": fmt,
+                "load_ms": result["load_s"] * 1000,
+                "rss_load_mb": result["rss_load_mb"],
+                f"top{args.k}_p50_ms": stats["p50_ms"],
+                f"top{args.k}_p99_ms": stats["p99_ms"],
+                "disk_mb": size / 2**20,
+            })
+
+    print(f"{args.chunks} chunks x {args.dim} dims\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Long-recording transcription: one request for the whole file against
+silence-split chunks sent concurrently.
+
+A synthetic "lecture" reads out worksheet problems with short pauses in
+between (and, with --run-on, one stretch with no pause longer than a
+chunk, which forces overlapping hard cuts). Replay fixtures are recorded on
+the fly for the whole file and for every chunk, with latencies drawn from
+utils.llm_replay.PRESETS for the audio length and transcripts made of the
+words each range of audio covers, partial words at the cuts included.
+
+    python -m benchmarks.bench_long_audio --problems 40 --model whisper-1 --workers 1 4 8
+"""
+import argparse
+import io
+import random
+import re
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness import print_table
+from benchmarks.suite import LLM_PROBLEMS, SYMBOLIC_PROBLEMS, synthetic_clip
+from utils import audio_segments
+from utils.llm_replay import PRESETS, FixtureStore, ReplayClient, audio_key
+from utils.transcription import ReplayBackend, Transcriber
+
+RATE = 16000
+WORD_S = 0.35  # synthetic_clip's pace
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _samples(audio: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(audio), "rb") as w:
+        return np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").astype(np.float32) / 32767
+
+
+def lecture(problems: list, rng: random.Random, run_on: bool) -> tuple:
+    """(wav bytes, [(start_s, end_s, word)]) for the problems read out with pauses"""
+    noise = np.random.default_rng(rng.randrange(2**32))
+    pieces, words, t = [], [], 0.0
+    for i, problem in enumerate(problems):
+        # The run-on stretch reads five problems back to back
+        pause = 0.0 if run_on and 3 <= i < 8 else rng.uniform(0.6, 1.5)
+        pieces.append(0.01 * noise.standard_normal(int(pause * RATE)).astype(np.float32))
+        t += pause
+        clip = _samples(synthetic_clip(i, problem, RATE))
+        pieces.append(clip)
+        words += [(t + j * WORD_S, t + (j + 1) * WORD_S, w) for j, w in enumerate(problem.split())]
+        t += len(clip) / RATE
+    return audio_segments.encode_wav(np.concatenate(pieces), RATE), words
+
+
+def spoken(words: list, start: float, end: float) -> str:
+    """What a recognizer hears in [start, end): clipped words at the edges come out clipped"""
+    out = []
+    for a, b, word in words:
+        if b <= start + 0.05 or a >= end - 0.05:
+            continue
+        keep = (min(b, end) - max(a, start)) / (b - a)
+        if keep < 0.95 and len(word) > 3:
+            n = max(1, int(len(word) * keep))
+            # Cut at the start of the range: only the word's end was heard; at the end: only its start
+            word = word[-n:] if a < start else word[:n]
+        out.append(word)
+    return " ".join(out)
+
+
+def record(store: FixtureStore, rng: random.Random, model: str, audio: bytes, text: str):
+    audio_s = len(_samples(audio)) / RATE
+    ttft, total = PRESETS[model].sample(rng, 0, audio_s)
+    store.append({"kind": "transcription", "key": audio_key(audio), "model": model, "prompt": None,
+                  "response": text, "usage": None, "ttft_s": round(ttft, 4), "total_s": round(total, 4),
+                  "audio_s": round(audio_s, 2), "synthetic": True})
+
+
+def accuracy(text: str, truth: str) -> tuple:
+    """(word recall, extra words) against the script"""
+    found, expected = _WORD.findall(text.lower()), _WORD.findall(truth.lower())
+    recall = sum(1 for w in set(expected) if w in set(found)) / len(set(expected))
+    return recall, len(found) - len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, default=40, help="problems read out")
+    parser.add_argument("--model", default="whisper-1", choices=[m for m in PRESETS if m.startswith("whisper")])
+    parser.add_argument("--max-chunk-s", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--run-on", action="store_true", help="include a stretch with no pauses")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [p for p, _ in LLM_PROBLEMS] + SYMBOLIC_PROBLEMS
+    problems = [pool[i % len(pool)] for i in range(args.problems)]
+    audio, words = lecture(problems, rng, args.run_on)
+    seconds = len(_samples(audio)) / RATE
+    truth = " ".join(problems)
+
+    start = time.perf_counter()
+    samples, rate = audio_segments.decode(audio, "wav")
+    ranges = audio_segments.split_on_silence(samples, rate, args.max_chunk_s)
+    pieces = audio_segments.segment(audio, "wav", args.max_chunk_s)
+    split_ms = (time.perf_counter() - start) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FixtureStore(str(Path(tmp) / "replay.jsonl"))
+        record(store, rng, args.model, audio, spoken(words, 0, seconds))
+        for (a, b, _), (piece, _) in zip(ranges, pieces):
+            record(store, rng, args.model, piece, spoken(words, a / rate, b / rate))
+
+        rows = []
+        client = ReplayClient(store, timing="recorded")
+        whole = ReplayBackend(client, model=args.model)
+        began = time.perf_counter()
+        text = whole.transcribe(audio, "lecture.wav", "en")
+        recall, extra = accuracy(text, truth)
+        rows.append({"mode": "one request (before)", "requests": 1, "largest_upload_mb": len(audio) / 2**20,
+                     "first_text_s": time.perf_counter() - began, "total_s": time.perf_counter() - began,
+                     "word_recall": recall, "extra_words": extra})
+
+        for workers in args.workers:
+            transcriber = Transcriber(ReplayBackend(client, model=args.model), max_chunk_s=args.max_chunk_s,
+                                      workers=workers)
+            first = []
+            began = time.perf_counter()
+            result = transcriber.transcribe(audio, "lecture.wav",
+                                            on_partial=lambda text: first or first.append(time.perf_counter()))
+            total = time.perf_counter() - began
+            recall, extra = accuracy(result["text"], truth)
+            rows.append({"mode": f"{result['chunks']} chunks, {workers} workers", "requests": result["chunks"],
+                         "largest_upload_mb": max(len(p) for p, _ in pieces) / 2**20,
+                         "first_text_s": (first[0] - began) if first else total, "total_s": total,
+                         "word_recall": recall, "extra_words": extra})
+
+    hard = sum(overlaps for _, overlaps in pieces)
+    print(f"{seconds / 60:.1f} min lecture ({args.problems} problems), {args.model}, chunks <= {args.max_chunk_s:.0f} s; "
+          f"split in {split_ms:.0f} ms, {hard} overlapping cuts\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Recall/latency of MinHash-LSH memory recall versus the brute-force scan.
+
+The brute-force path scores every stored problem with SequenceMatcher, which
+is what MemoryManager.find_similar_problems did before the LSH index (minus
+the per-file JSON reads, so it is a lower bound on the old cost).
+
+    python -m benchmarks.bench_memory_recall --sizes 10000 100000 1000000
+
+recall@1 is the fraction of queries whose best brute-force match is returned;
+recall@threshold counts every brute-force match above the threshold, which at
+0.7 includes many same-template problems that differ in all their maths.
+"""
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+
+from benchmarks.harness import peak_rss_mb, print_table, summarize
+from memory.lsh_index import MinHashLSH
+
+TEMPLATES = [
+    "Solve {e} = 0 for real {v}",
+    "Find the derivative of {e} with respect to {v}",
+    "Evaluate the integral of {e} d{v} from 0 to {n}",
+    "If {e} = {n}, find all possible values of {v}",
+    "A bag has {n} red and {m} blue balls. Two are drawn; find P(both red) given {e}",
+    "Find the determinant of the matrix [[{n}, {m}], [{e}, {v}]]",
+    "Show that {e} is divisible by {n} for every integer {v}",
+    "Find the minimum value of {e} on the interval [{n}, {m}]",
+]
+VARIABLES = "xyztabkmnpq"
+FUNCTIONS = ["sin", "cos", "tan", "log", "exp", "sqrt"]
+
+
+def random_expression(rng: random.Random, v: str) -> str:
+    terms = []
+    for _ in range(rng.randint(2, 5)):
+        kind = rng.random()
+        coef = rng.randint(1, 99)
+        if kind < 0.4:
+            terms.append(f"{coef}{v}^{rng.randint(2, 9)}")
+        elif kind < 0.7:
+            terms.append(f"{coef}{rng.choice(FUNCTIONS)}({rng.randint(1, 9)}{v})")
+        else:
+            terms.append(f"{coef}{rng.choice(VARIABLES)}")
+    return f" {rng.choice('+-')} ".join(terms)
+
+
+def random_problem(rng: random.Random) -> str:
+    v = rng.choice(VARIABLES)
+    return rng.choice(TEMPLATES).format(
+        e=random_expression(rng, v), v=v, n=rng.randint(1, 50), m=rng.randint(51, 99))
+
+
+def perturb(rng: random.Random, text: str) -> str:
+    """Typical re-submission noise: changed digit, dropped char, extra spaces"""
+    chars = list(text)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(chars))
+        roll = rng.random()
+        if roll < 0.4 and chars[i].isdigit():
+            chars[i] = str(rng.randint(0, 9))
+        elif roll < 0.7:
+            del chars[i]
+        else:
+            chars.insert(i, " ")
+    return "".join(chars)
+
+
+def brute_force(problems: list, query: str, threshold: float) -> set:
+    found = set()
+    for i, problem in enumerate(problems):
+        matcher = SequenceMatcher(None, query, problem)
+        if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+            continue
+        if matcher.ratio() >= threshold:
+            found.add(i)
+    return found
+
+
+def best_match(problems: list, query: str, found: set):
+    return max(found, key=lambda i: SequenceMatcher(None, query, problems[i]).ratio(), default=None)
+
+
+def lsh_lookup(lsh: MinHashLSH, problems: list, query: str, threshold: float, limit: int) -> set:
+    """Same short-list re-ranking as MemoryManager.find_similar_problems"""
+    found = set()
+    for key in lsh.query(query, limit=limit):
+        i = int(key)
+        matcher = SequenceMatcher(None, query, problems[i])
+        if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+            continue
+        if matcher.ratio() >= threshold:
+            found.add(i)
+    return found
+
+
+def run(size: int, queries: int, threshold: float, limit: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    problems = [random_problem(rng) for _ in range(size)]
+
+    lsh = MinHashLSH()
+    start = time.perf_counter()
+    for i, problem in enumerate(problems):
+        lsh.add(str(i), problem)
+    build_s = time.perf_counter() - start
+
+    brute_times, lsh_times = [], []
+    hits = relevant = top_hits = 0
+    for _ in range(queries):
+        query = perturb(rng, rng.choice(problems))
+
+        start = time.perf_counter()
+        truth = brute_force(problems, query, threshold)
+        brute_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        found = lsh_lookup(lsh, problems, query, threshold, limit)
+        lsh_times.append(time.perf_counter() - start)
+
+        hits += len(found & truth)
+        relevant += len(truth)
+        top_hits += best_match(problems, query, truth) in found
+
+    brute, fast = summarize(brute_times), summarize(lsh_times)
+    return {
+        "attempts": size,
+        "build_s": build_s,
+        "recall@1": top_hits / queries,
+        "recall@threshold": hits / relevant if relevant else 1.0,
+        "brute_p50_ms": brute["p50_ms"],
+        "brute_p99_ms": brute["p99_ms"],
+        "lsh_p50_ms": fast["p50_ms"],
+        "lsh_p99_ms": fast["p99_ms"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--candidates", type=int, default=50, help="short-list size for re-ranking")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print_table([run(size, args.queries, args.threshold, args.candidates, args.seed) for size in args.sizes])
+
+
+if __name__ == "__main__":
+    main()
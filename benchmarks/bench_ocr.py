@@ -0,0 +1,167 @@
+"""
+OCR throughput on synthetic multi-page worksheet scans.
+
+Renders letter-size pages with several problems each, scanned at a slight
+random skew with noise, then compares the old two-pass Tesseract call on the
+raw page against utils.ocr_handler (preprocessing, region split, one pass per
+region) inline and with a process pool. Preprocessing and region splitting
+are also measured on their own, with deskew error and regions per page.
+
+    python -m benchmarks.bench_ocr --pages 6 --problems 5 --workers 4
+"""
+import argparse
+import random
+import re
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.harness import print_table, summarize
+from benchmarks.suite import LLM_PROBLEMS, SYMBOLIC_PROBLEMS
+from utils import ocr_handler
+
+SCAN_DPI = 400
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def render_page(problems: list, rng: random.Random, dpi: int = SCAN_DPI) -> tuple:
+    """(scanned page, skew in degrees) with the problems numbered down a letter page"""
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    page = Image.new("L", (width, height), color=255)
+    draw = ImageDraw.Draw(page)
+    font = _font(int(dpi / 7))
+    y = dpi
+    for number, problem in enumerate(problems, 1):
+        words, line = problem.split(), f"{number}."
+        for word in words:
+            if draw.textlength(f"{line} {word}", font=font) > width - 2 * dpi:
+                draw.text((dpi, y), line, fill=0, font=font)
+                y += int(dpi / 4.5)
+                line = "   "
+            line = f"{line} {word}"
+        draw.text((dpi, y), line, fill=0, font=font)
+        y += int(dpi * 0.9)
+
+    skew = rng.uniform(-3, 3)
+    page = page.rotate(skew, resample=Image.BICUBIC, expand=False, fillcolor=255)
+    noise = np.random.default_rng(rng.randrange(2**32)).normal(0, 12, (height, width))
+    page = Image.fromarray(np.clip(np.asarray(page, dtype=np.float64) * 0.9 + 20 + noise, 0, 255).astype(np.uint8))
+    page.info["dpi"] = (dpi, dpi)
+    return page, skew
+
+
+def worksheet(pages: int, per_page: int, seed: int) -> tuple:
+    """(pages, skews, ground-truth text per page)"""
+    rng = random.Random(seed)
+    pool = [p for p, _ in LLM_PROBLEMS] + SYMBOLIC_PROBLEMS
+    images, skews, truth = [], [], []
+    for _ in range(pages):
+        problems = rng.sample(pool, per_page)
+        image, skew = render_page(problems, rng)
+        images.append(image)
+        skews.append(skew)
+        truth.append(" ".join(problems))
+    return images, skews, truth
+
+
+def word_recall(text: str, truth: str) -> float:
+    expected = _WORD.findall(truth.lower())
+    found = set(_WORD.findall(text.lower()))
+    return sum(w in found for w in expected) / len(expected) if expected else 1.0
+
+
+def legacy_ocr(image) -> str:
+    """Before: image_to_data for confidences, then image_to_string for the text, on the raw page"""
+    import pytesseract
+    pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    return pytesseract.image_to_string(image)
+
+
+def bench_preprocess(images: list, skews: list, per_page: int) -> dict:
+    latencies, errors, regions = [], [], []
+    for image, skew in zip(images, skews):
+        gray = np.asarray(image)
+        start = time.perf_counter()
+        binary, dpi = ocr_handler.preprocess(gray, SCAN_DPI)
+        found = ocr_handler.split_regions(binary, dpi)
+        latencies.append(time.perf_counter() - start)
+        small = gray[::4, ::4] <= ocr_handler.ink_threshold(gray)
+        errors.append(abs(ocr_handler.estimate_skew(small) - skew))
+        regions.append(len(found))
+    stats = summarize(latencies)
+    return {
+        "mode": "preprocess + split only",
+        "pages_per_s": len(images) / sum(latencies),
+        "p50_ms_per_page": stats["p50_ms"],
+        "deskew_err_deg": float(np.mean(errors)),
+        "regions_per_page": f"{np.mean(regions):.1f} (expected {per_page})",
+    }
+
+
+def bench_ocr(name: str, run, images: list, truth: list) -> dict:
+    latencies, recalls = [], []
+    start = time.perf_counter()
+    for image, expected in zip(images, truth):
+        began = time.perf_counter()
+        text = run(image)
+        latencies.append(time.perf_counter() - began)
+        recalls.append(word_recall(text, expected))
+    wall = time.perf_counter() - start
+    return {
+        "mode": name,
+        "pages_per_s": len(images) / wall,
+        "p50_ms_per_page": summarize(latencies)["p50_ms"],
+        "word_recall": float(np.mean(recalls)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=6)
+    parser.add_argument("--problems", type=int, default=5, help="problems per page")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    images, skews, truth = worksheet(args.pages, args.problems, args.seed)
+    rows = [bench_preprocess(images, skews, args.problems)]
+
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print_table(rows)
+        print(f"\nTesseract unavailable ({type(e).__name__}); OCR modes skipped")
+        return
+
+    inline = ocr_handler.OCRHandler(workers=0)
+    pooled = ocr_handler.OCRHandler(workers=args.workers)
+    # Start the pool outside the timings
+    pooled.extract_text_from_image(images[0])
+    rows += [
+        bench_ocr("two passes, raw page (before)", legacy_ocr, images, truth),
+        bench_ocr("one pass per region, inline", lambda im: inline.extract_text_from_image(im)["text"], images, truth),
+        bench_ocr(f"one pass per region, {args.workers} workers",
+                  lambda im: pooled.extract_text_from_image(im)["text"], images, truth),
+    ]
+    # The whole scan as one request: pages are preprocessed in parallel too
+    start = time.perf_counter()
+    text = pooled.extract_text_from_image(images)["text"]
+    wall = time.perf_counter() - start
+    rows.append({"mode": f"whole scan in one call, {args.workers} workers", "pages_per_s": len(images) / wall,
+                 "p50_ms_per_page": None, "word_recall": word_recall(text, " ".join(truth))})
+    pooled.close()
+    print(f"{args.pages} pages x {args.problems} problems, scanned at {SCAN_DPI} dpi\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+OCR cache hit rates and lookup cost on a Streamlit-like upload stream.
+
+Every upload is followed by several reruns with the same bytes (editing the
+text area, clicking feedback). Some uploads are new pages; others are
+re-uploads of an earlier page: saved again losslessly or as a high-quality
+JPEG (near-identical, may hit), re-encoded at lower quality, resized,
+brightened or noisier (ink changes, expected to miss), a 1-degree retake,
+or the same page with one digit changed, which must miss. A perceptual hit
+that returns another page's text is counted as a false hit.
+
+Tesseract is used when installed; otherwise extraction is a sleep of
+--ocr-ms standing in for it, with the page index as the "text".
+
+    python -m benchmarks.bench_ocr_cache --pages 30 --reruns 4
+"""
+import argparse
+import io
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from benchmarks.bench_ocr import render_page
+from benchmarks.harness import print_table, summarize
+from benchmarks.suite import LLM_PROBLEMS, SYMBOLIC_PROBLEMS
+from utils.ocr_cache import OCRCache
+
+VARIANTS = {
+    "lossless re-save": lambda im, rng: _encode(im.convert("RGB")),
+    "jpeg q95": lambda im, rng: _encode(im.convert("RGB"), "JPEG", quality=95),
+    "jpeg": lambda im, rng: _encode(im.convert("RGB"), "JPEG", quality=rng.randint(55, 85)),
+    "resized": lambda im, rng: _encode(im.resize((int(im.width * 0.6), int(im.height * 0.6)), Image.BOX)),
+    "brighter": lambda im, rng: _encode(ImageEnhance.Brightness(im).enhance(rng.uniform(1.05, 1.15))),
+    "noisier": lambda im, rng: _encode(Image.fromarray(np.clip(
+        np.asarray(im, dtype=np.float64) + np.random.default_rng(rng.randrange(2**32)).normal(0, 6, (im.height, im.width)),
+        0, 255).astype(np.uint8))),
+    "retake (should miss)": lambda im, rng: _encode(im.rotate(1, fillcolor=255)),
+}
+
+
+CHANGED = "one digit changed (must miss)"
+
+
+def _change_digit(problems: list, rng: random.Random) -> list:
+    """The problems with one digit replaced"""
+    positions = [(i, j) for i, p in enumerate(problems) for j, ch in enumerate(p) if ch.isdigit()]
+    i, j = rng.choice(positions)
+    digit = rng.choice([d for d in "0123456789" if d != problems[i][j]])
+    return [p[:j] + digit + p[j + 1:] if k == i else p for k, p in enumerate(problems)]
+
+
+def _encode(image: Image.Image, fmt: str = "PNG", **params) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--reuploads", type=int, default=40)
+    parser.add_argument("--reruns", type=int, default=4, help="reruns after each upload")
+    parser.add_argument("--ocr-ms", type=float, default=1500, help="stand-in OCR time without Tesseract")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [p for p, _ in LLM_PROBLEMS] + SYMBOLIC_PROBLEMS
+    # Each page keeps its problems and render seed, so a one-digit twin has the same skew and noise
+    sources = [(rng.sample(pool, rng.choice([1, 1, 2, 3])), rng.randrange(2**32)) for _ in range(args.pages)]
+    pages = [render_page(problems, random.Random(seed), dpi=150)[0] for problems, seed in sources]
+    # New pages in order, with re-uploads of already seen pages mixed in
+    uploads, seen = [], 0
+    while seen < len(pages) or len(uploads) < len(pages) + args.reuploads:
+        if seen < len(pages) and (seen == 0 or rng.random() < len(pages) / (len(pages) + args.reuploads)):
+            uploads.append(("new page", seen, _encode(pages[seen])))
+            seen += 1
+        else:
+            i, variant = rng.randrange(seen), rng.choice(list(VARIANTS) + [CHANGED])
+            if variant == CHANGED and any(ch.isdigit() for p in sources[i][0] for ch in p):
+                twin = render_page(_change_digit(sources[i][0], rng), random.Random(sources[i][1]), dpi=150)[0]
+                uploads.append((variant, f"{i} changed", _encode(twin)))
+            elif variant != CHANGED:
+                uploads.append((variant, i, VARIANTS[variant](pages[i], rng)))
+
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        from utils.ocr_handler import OCRHandler
+        handler, texts = OCRHandler(), {}
+        mode = "Tesseract"
+    except Exception:
+        handler, texts = None, None
+        mode = f"stand-in OCR ({args.ocr_ms:.0f} ms)"
+
+    current = {}
+
+    def stand_in(image):
+        time.sleep(args.ocr_ms / 1000)
+        return {"text": f"page {current['page']}"}
+
+    rows, latencies, false_hits, ocr_calls = {}, {"exact": [], "perceptual": [], "miss": []}, 0, 0
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRCache(str(Path(tmp) / "ocr.sqlite3"))
+        for kind, page, data in uploads:
+            current["page"] = page
+            for attempt in range(1 + args.reruns):
+                start = time.perf_counter()
+                result = cache.get_or_extract(data, handler.extract_text_from_image if handler else stand_in)
+                elapsed = time.perf_counter() - start
+                latencies[result["cache"]].append(elapsed if result["cache"] != "miss" or handler else
+                                                  elapsed - args.ocr_ms / 1000)
+                ocr_calls += result["cache"] == "miss"
+                label = kind if attempt == 0 else "rerun"
+                row = rows.setdefault(label, {"requests": label, "n": 0, "exact": 0, "perceptual": 0, "miss": 0})
+                row["n"] += 1
+                row[result["cache"]] += 1
+                if result["cache"] == "perceptual":
+                    if handler:
+                        false_hits += kind == CHANGED or result["text"] != texts.get(page, result["text"])
+                    else:
+                        false_hits += result["text"] != f"page {page}"
+                if handler and kind == "new page" and attempt == 0:
+                    texts[page] = result["text"]
+
+    total = sum(r["n"] for r in rows.values())
+    print(f"{mode}; {args.pages} pages, {len(uploads) - args.pages} re-uploads, {args.reruns} reruns each\n")
+    print_table(list(rows.values()))
+    print()
+    print_table([{"path": k, **{m: v for m, v in summarize(v).items() if m in ("n", "p50_ms", "p99_ms")}}
+                 for k, v in latencies.items()])
+    print(f"\nOCR runs: {ocr_calls} of {total} requests ({1 - ocr_calls / total:.0%} avoided); false hits: {false_hits}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+ParserAgent's local rule parse: latency, how often the LLM is still
+needed, and whether the topics it is confident about are right.
+
+The corpus is the suite's problems as typed, as OCR would return them
+(unicode maths, ligatures, hyphenated line breaks), as ASR would
+(operators in words), plus inputs that should reach the LLM: references
+to context the parser cannot see, OCR garbage, several questions. Each
+has a hand-assigned topic, or None when the LLM should decide. LLM parse
+latency is drawn from the gpt-4-turbo preset in utils.llm_replay, so
+the before / after columns compare expected parse time per input.
+
+    python -m benchmarks.bench_parser --repeat 20
+"""
+import argparse
+import random
+import time
+
+from agents.rule_parser import rule_parse
+from benchmarks.harness import print_table, summarize
+from utils.llm_replay import PRESETS
+
+# (input, expected topic or None for "should go to the LLM")
+TYPED = [
+    ("Solve x^2 - 5x + 6 = 0", "algebra"),
+    ("Solve 2x + 3 = 11", "algebra"),
+    ("Solve for y: y^2 = 9, where y is positive", "algebra"),
+    ("Find x if 2x + 3 > 7 where x > 0", "algebra"),
+    ("What is 2 + 3*4?", "algebra"),
+    ("Factorise x^3 - 8", "algebra"),
+    ("The sum of an infinite geometric series is 12 and its first term is 4. Find the common ratio.", "algebra"),
+    ("If the roots of x^2 - px + q = 0 differ by 1, prove that p^2 = 4q + 1.", "algebra"),
+    ("Differentiate x^3 sin(x)", "calculus"),
+    ("Integrate x e^x dx", "calculus"),
+    ("Find the limit of sin(x)/x as x approaches 0", "calculus"),
+    ("Find the derivative of ln(x^2 + 1)", "calculus"),
+    ("Find the area enclosed between the curves y = x^2 and y = 2x.", "calculus"),
+    ("Find the equation of the tangent to y = x^3 at x = 1", "calculus"),
+    ("A fair die is rolled three times. What is the probability of getting at least one six?", "probability"),
+    ("A bag contains 5 red and 3 blue balls. Two balls are drawn without replacement. "
+     "Find the probability that both are red.", "probability"),
+    ("How many ways can 5 boys and 3 girls sit in a row so that no two girls sit together?", "probability"),
+    ("Find 10C3", "probability"),
+    ("If P(A) = 0.3 and P(B) = 0.5, find P(A or B)", "probability"),
+    ("Find the eigenvalues of the matrix [[2, 1], [1, 2]]", "linear_algebra"),
+    ("Find the determinant of [[1, 2], [3, 4]]", "linear_algebra"),
+    ("Are the vectors (1, 2, 3) and (2, 4, 6) linearly independent?", "linear_algebra"),
+    # Genuinely unclear from keywords alone: the LLM labels them
+    ("A ladder 10 m long leans against a wall. Its foot slides away at 2 m/s. "
+     "How fast is the top sliding down when the foot is 6 m from the wall?", None),
+    ("Find the maximum value of 3 sin x + 4 cos x.", None),
+    ("A train 150 m long passes a pole in 15 seconds. How long does it take to pass a platform 250 m long?", None),
+]
+OCR = [
+    ("Solve x² − 5x + 6 = 0", "algebra"),
+    ("ﬁnd the deriv-\native of x³ + 2x", "calculus"),
+    ("Evaluate ∫ x² dx from 0 to 1", "calculus"),
+    ("What is the probability that a card drawn at random from a deck is a king?", "probability"),
+    ("Find the inverse of the matrix [[1, 2], [3, 4]]", "linear_algebra"),
+    ("Fiind tbe va1ue ¢f ∮∯ x ≈ ▯▯", None),
+    ("Solve (x + 2(x - 1 = 4", None),
+]
+ASR = [
+    ("x squared minus 5x plus 6 equals 0", "algebra"),
+    ("solve 3x plus 4 equals 19", "algebra"),
+    ("what is the probability of getting two heads when two coins are tossed", "probability"),
+    ("differentiate x cubed plus 2x", "calculus"),
+]
+NEEDS_CONTEXT = [
+    ("Solve it", None),
+    ("Now do the same for the previous question", None),
+    ("Find the area of the shaded region in the figure", None),
+    ("What is x? And what is y?", None),
+]
+CORPUS = {"typed": TYPED, "ocr": OCR, "asr": ASR, "needs context": NEEDS_CONTEXT}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed parses per input")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    llm = PRESETS["gpt-4-turbo"]
+    rule_parse("warm up")
+    rows, all_latencies = [], []
+    for name, items in CORPUS.items():
+        latencies, local, correct, overconfident, before, after = [], 0, 0, 0, 0.0, 0.0
+        for text, expected in items:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fields = rule_parse(text)
+                latencies.append(time.perf_counter() - start)
+            # A parser completion is about 80-140 tokens of JSON
+            llm_s = llm.sample(rng, rng.randint(80, 140))[1]
+            before += llm_s
+            after += latencies[-1] + (llm_s if fields is None else 0.0)
+            if fields is not None:
+                local += 1
+                correct += fields["topic"] == expected
+                overconfident += expected is None
+        all_latencies += latencies
+        stats = summarize(latencies)
+        rows.append({
+            "inputs": name,
+            "n": len(items),
+            "llm_calls": f"{len(items) - local}/{len(items)}",
+            "local_topic_correct": f"{correct}/{local}",
+            "overconfident": overconfident,
+            "rule_p50_ms": stats["p50_ms"],
+            "rule_p99_ms": stats["p99_ms"],
+            "parse_s_before": before / len(items),
+            "parse_s_after": after / len(items),
+        })
+    print_table(rows)
+    total = sum(len(items) for items in CORPUS.values())
+    calls = sum(int(r["llm_calls"].split("/")[0]) for r in rows)
+    print(f"\nLLM parse calls: {calls} of {total} ({calls / total:.0%}); "
+          f"rule parse p50 {summarize(all_latencies)['p50_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
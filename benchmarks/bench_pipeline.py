@@ -0,0 +1,118 @@
+"""
+End-to-end latency of the agent pipeline: strictly serial vs the async DAG.
+
+LLM-backed agents are replaced by stubs that sleep for a latency drawn around
+typical gpt-4-turbo response times, so this runs offline.
+
+    python -m benchmarks.bench_pipeline --runs 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from agents.pipeline import build_agent_pipeline
+from benchmarks.harness import print_table, summarize
+
+# Median seconds per stage, jittered +/-20% per call
+STAGE_LATENCY = {
+    "parse": 0.6,
+    "route": 0.5,
+    "retrieve": 0.3,
+    "solve": 1.5,
+    "verify": 0.9,
+    "explain": 1.1,
+}
+
+
+class _Stub:
+    def __init__(self, rng: random.Random, scale: float):
+        self.rng = rng
+        self.scale = scale
+
+    def latency(self, stage: str) -> float:
+        return STAGE_LATENCY[stage] * self.scale * self.rng.uniform(0.8, 1.2)
+
+
+class StubParser(_Stub):
+    async def aparse(self, raw_input):
+        await asyncio.sleep(self.latency("parse"))
+        return {"problem_text": raw_input, "topic": "algebra"}
+
+
+class StubRouter(_Stub):
+    async def aroute(self, parsed):
+        await asyncio.sleep(self.latency("route"))
+        return {"strategy": "algebraic_manipulation", "use_rag": True}
+
+
+class StubSolver(_Stub):
+    def retrieve(self, parsed):
+        time.sleep(self.latency("retrieve"))
+        return []
+
+    async def asolve(self, parsed, route, docs):
+        await asyncio.sleep(self.latency("solve"))
+        return {"final_answer": "x = 2, 3", "steps": []}
+
+
+class StubVerifier(_Stub):
+    async def averify(self, problem, solution):
+        await asyncio.sleep(self.latency("verify"))
+        return {"is_correct": True}
+
+
+class StubExplainer(_Stub):
+    async def aexplain(self, problem, solution):
+        await asyncio.sleep(self.latency("explain"))
+        return "explanation"
+
+
+async def run_serial(parser, router, solver, verifier, explainer, raw_input):
+    """The order an orchestrator calling the sync agents one by one would use"""
+    parsed = await parser.aparse(raw_input)
+    route = await router.aroute(parsed)
+    docs = await asyncio.to_thread(solver.retrieve, parsed)
+    solution = await solver.asolve(parsed, route, docs)
+    await verifier.averify(raw_input, solution)
+    await explainer.aexplain(raw_input, solution)
+
+
+async def main_async(runs: int, scale: float, seed: int):
+    rng = random.Random(seed)
+    agents = [cls(rng, scale) for cls in (StubParser, StubRouter, StubSolver, StubVerifier, StubExplainer)]
+    pipeline = build_agent_pipeline(*agents)
+
+    serial, dag, critical = [], [], {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        await run_serial(*agents, "Solve x^2 - 5x + 6 = 0")
+        serial.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        report = await pipeline.run({"raw_input": "Solve x^2 - 5x + 6 = 0"})
+        dag.append(time.perf_counter() - start)
+        path = " -> ".join(report["critical_path"])
+        critical[path] = critical.get(path, 0) + 1
+
+    s, d = summarize(serial), summarize(dag)
+    print_table([
+        {"mode": "serial", **s},
+        {"mode": "dag", **d},
+    ])
+    print(f"\nMedian speedup: {s['p50_ms'] / d['p50_ms']:.2f}x")
+    for path, count in sorted(critical.items(), key=lambda x: -x[1]):
+        print(f"Critical path ({count}/{runs} runs): {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply all stage latencies")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.runs, args.scale, args.seed))
+
+
+if __name__ == "__main__":
+    main()
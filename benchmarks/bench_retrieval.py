@@ -0,0 +1,131 @@
+"""
+Latency and recall@k of vector, BM25 and hybrid (RRF) retrieval.
+
+Builds a throwaway index from rag/kb_docs plus synthetic distractor documents
+using the offline deterministic embedding backend, then runs labelled
+formula-lookup queries through each retrieval mode.
+
+    python -m benchmarks.bench_retrieval --distractors 2000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import print_table, summarize
+from rag.knowledge_base import MathKnowledgeBase
+from rag.retriever import HybridRetriever
+
+# (query, text that only the relevant KB chunk contains)
+LABELLED_QUERIES = [
+    ("quadratic formula", "Quadratic Equation"),
+    ("discriminant of a quadratic", "Discriminant"),
+    ("Bayes theorem conditional probability", "P(A|B)"),
+    ("logarithm of a product", "Logarithm Properties"),
+    ("binomial expansion", "Binomial Expansion"),
+    ("permutations and combinations", "Permutations & Combinations"),
+    ("chain rule for derivatives", "Chain rule"),
+    ("limit of sin x over x", "sin(x)/x"),
+    ("indeterminate form limit rule", "indeterminate"),
+    ("sum of eigenvalues equals trace", "Sum of eigenvalues"),
+    ("transpose of a matrix product", "(AB)^T"),
+    ("number of subsets of a set", "Total subsets"),
+]
+
+FILLER = ("the a of motion force energy reaction mole velocity acid charge field wave "
+          "current pressure element lens orbit gas heat mass circuit equation value "
+          "process system particle frequency example given result").split()
+
+
+def write_corpus(kb_dir: Path, distractors: int, seed: int):
+    rng = random.Random(seed)
+    kb_words = " ".join(p.read_text(encoding="utf-8") for p in Path("rag/kb_docs").glob("*.txt")).split()
+    for p in Path("rag/kb_docs").glob("*.txt"):
+        (kb_dir / p.name).write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
+    per_file = 50
+    for f in range(0, distractors, per_file):
+        paragraphs = []
+        for _ in range(min(per_file, distractors - f)):
+            words = [rng.choice(kb_words) if rng.random() < 0.05 else rng.choice(FILLER)
+                     for _ in range(rng.randint(50, 80))]
+            paragraphs.append(" ".join(words))
+        (kb_dir / f"distractor_{f:05d}.txt").write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+
+class _CountingKB:
+    """Counts vector searches (each one embeds the query)"""
+
+    def __init__(self, kb):
+        self.kb = kb
+        self.vector_searches = 0
+
+    def retrieve(self, query, k=3):
+        self.vector_searches += 1
+        return self.kb.retrieve(query, k=k)
+
+    def get_chunks(self, chunk_ids):
+        return self.kb.get_chunks(chunk_ids)
+
+
+def evaluate(name: str, search, kb: _CountingKB, k: int, rounds: int) -> dict:
+    kb.vector_searches = 0
+    latencies, hits = [], 0
+    for _ in range(rounds):
+        for query, marker in LABELLED_QUERIES:
+            start = time.perf_counter()
+            results = search(query, k)
+            latencies.append(time.perf_counter() - start)
+            hits += any(marker in doc.page_content for doc in results)
+    total = rounds * len(LABELLED_QUERIES)
+    stats = summarize(latencies)
+    return {
+        "mode": name,
+        f"recall@{k}": hits / total,
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+        "query_embeddings": kb.vector_searches / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--distractors", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kb_dir = Path(tmp) / "docs"
+        kb_dir.mkdir()
+        write_corpus(kb_dir, args.distractors, args.seed)
+
+        from rag.embedding_backends import build_embeddings
+        embeddings = build_embeddings("deterministic", cache_dir=str(Path(tmp) / "cache"))
+        kb = MathKnowledgeBase(str(kb_dir), embeddings=embeddings, index_dir=str(Path(tmp) / "index"))
+        start = time.perf_counter()
+        kb.build_index()
+        print(f"Indexed {args.distractors} distractors + KB in {time.perf_counter() - start:.1f}s\n")
+
+        counting = _CountingKB(kb)
+        hybrid = HybridRetriever(counting, bm25=kb.load_bm25(), fast_path_margin=float("inf"))
+        fast = HybridRetriever(counting, bm25=kb.load_bm25())
+
+        def lexical(query, k):
+            return kb.get_chunks([chunk_id for chunk_id, _, _ in hybrid.bm25.search(query, k)])
+
+        def vector(query, k):
+            return [doc for doc, _ in counting.retrieve(query, k)]
+
+        rows = [
+            evaluate("vector", vector, counting, args.k, args.rounds),
+            evaluate("bm25", lexical, counting, args.k, args.rounds),
+            evaluate("hybrid (rrf)", lambda q, k: [d for d, _ in hybrid.retrieve(q, k)], counting, args.k, args.rounds),
+            evaluate("hybrid + fast path", lambda q, k: [d for d, _ in fast.retrieve(q, k)], counting, args.k, args.rounds),
+        ]
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
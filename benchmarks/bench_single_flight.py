@@ -0,0 +1,87 @@
+"""
+A class submitting the same homework problem at once: upstream completions
+and per-student latency with and without request coalescing.
+
+Students arrive spread over --spread seconds and each streams the answer
+from a fake client that takes --ttft to the first token.
+
+    python -m benchmarks.bench_single_flight --students 200 --distinct 3
+"""
+import argparse
+import random
+import threading
+import time
+
+from agents.groq_solver import GroqSolver
+from benchmarks.harness import print_table, summarize
+from utils.fake_llm import FakeGroqClient
+from utils.single_flight import SingleFlight
+
+PROBLEMS = [
+    "Solve x^2 - 5x + 6 = 0",
+    "Find the derivative of sin(x) * x^2",
+    "Evaluate the limit of sin(3x)/x as x -> 0",
+    "Find the determinant of [[2, 1], [3, 4]]",
+    "How many ways can 5 books be arranged on a shelf?",
+]
+
+
+def run(students: int, distinct: int, spread: float, ttft: float, coalesce: bool, seed: int) -> dict:
+    rng = random.Random(seed)
+    client = FakeGroqClient("Step 1 ... Step 7. Final answer: x = 2 or x = 3. " * 8,
+                            first_token_delay=ttft, chunk_delay=0.005, chunk_chars=16)
+    solver = GroqSolver(client, single_flight=SingleFlight() if coalesce else None)
+    arrivals = sorted(rng.uniform(0, spread) for _ in range(students))
+    problems = [PROBLEMS[rng.randrange(distinct)] for _ in range(students)]
+    # The same problem typed slightly differently still coalesces (normalized key)
+    problems = [p.lower() if rng.random() < 0.3 else p for p in problems]
+
+    ttfts, totals, updates = [], [], []
+    lock = threading.Lock()
+
+    def student(delay: float, problem: str):
+        time.sleep(delay)
+        received = [0]
+        result = solver.solve(problem, on_token=lambda text: received.__setitem__(0, received[0] + 1))
+        with lock:
+            ttfts.append(result["ttft_s"])
+            totals.append(result["total_s"])
+            updates.append(received[0])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=student, args=(d, p)) for d, p in zip(arrivals, problems)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    ttft_stats, total_stats = summarize(ttfts), summarize(totals)
+    return {
+        "mode": "single-flight" if coalesce else "independent",
+        "upstream_calls": client.calls,
+        "saved_calls": solver.single_flight.saved_calls() if coalesce else 0,
+        "ttft_p50_ms": ttft_stats["p50_ms"],
+        "ttft_p99_ms": ttft_stats["p99_ms"],
+        "total_p99_ms": total_stats["p99_ms"],
+        "min_updates": min(updates),
+        "wall_s": wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=3, help="distinct problems among the submissions")
+    parser.add_argument("--spread", type=float, default=2.0, help="seconds over which requests arrive")
+    parser.add_argument("--ttft", type=float, default=0.8, help="fake time to first token")
+    parser.add_argument("--seed", type=int, default=2)
+    args = parser.parse_args()
+
+    rows = [run(args.students, min(args.distinct, len(PROBLEMS)), args.spread, args.ttft, coalesce, args.seed)
+            for coalesce in (False, True)]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Latency of the symbolic fast path against the LLM path for closed-form
+problems, and how many of a mixed set it answers without an LLM call.
+
+The LLM side is the fake client with --ttft to the first token, so the
+comparison is local-vs-network rather than a claim about any model.
+
+    python -m benchmarks.bench_symbolic --ttft 0.8
+"""
+import argparse
+import time
+
+from agents.groq_solver import GroqSolver
+from agents.symbolic_solver import SymbolicSolver
+from benchmarks.harness import print_table, summarize
+from utils.fake_llm import FakeGroqClient
+
+CLOSED_FORM = [
+    "Solve x^2 - 5x + 6 = 0",
+    "Solve 2x + 3 = 11",
+    "Solve x + y = 5, x - y = 1",
+    "Find the derivative of sin(x) * x^2",
+    "Integrate x^2 dx",
+    "Evaluate the limit of sin(3x)/x as x -> 0",
+    "Find the determinant of [[2, 1], [3, 4]]",
+    "How many ways can 5 books be arranged on a shelf?",
+    "Compute 7C3",
+    "Simplify (x^2 - 1)/(x - 1)",
+]
+PROSE = [
+    "A ladder 10 m long leans against a wall; how fast does the top slide when the foot moves at 2 m/s?",
+    "Prove that the square root of 2 is irrational",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ttft", type=float, default=0.8, help="fake time to first token")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    symbolic = SymbolicSolver()
+    llm = GroqSolver(FakeGroqClient("Step 1 ... Final answer: 42. " * 8, first_token_delay=args.ttft))
+
+    problems = CLOSED_FORM + PROSE
+    answered = sum(symbolic.solve(p) is not None for p in problems)
+
+    times = []
+    for _ in range(args.repeat):
+        for problem in CLOSED_FORM:
+            start = time.perf_counter()
+            symbolic.solve(problem)
+            times.append(time.perf_counter() - start)
+    llm_times = []
+    for problem in CLOSED_FORM[:3]:
+        start = time.perf_counter()
+        llm.solve(problem)
+        llm_times.append(time.perf_counter() - start)
+
+    rows = [{"path": "symbolic", "answered": f"{answered}/{len(problems)}", **summarize(times)},
+            {"path": "llm (fake)", "answered": f"{len(problems)}/{len(problems)}", **summarize(llm_times)}]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Cost of tracing: time per span with and without the OTLP file exporter,
+and how far the bucketed histogram percentiles are from exact ones.
+
+    python -m benchmarks.bench_tracing --spans 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.harness import percentile, print_table
+from utils.tracing import LatencyHistogram, OTLPJsonFileExporter, Tracer
+
+
+def per_span_us(tracer: Tracer, traces: int, children: int) -> float:
+    start = time.perf_counter()
+    for _ in range(traces):
+        with tracer.span("request"):
+            for i in range(children):
+                with tracer.span("stage", index=i):
+                    pass
+    return (time.perf_counter() - start) / (traces * (children + 1)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=20000)
+    parser.add_argument("--children", type=int, default=7, help="child spans per trace (the pipeline has ~8)")
+    args = parser.parse_args()
+
+    traces = args.spans // (args.children + 1)
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_tracing_"), "spans.jsonl")
+    rows = [
+        {"tracer": "histograms only", "us_per_span": per_span_us(Tracer(), traces, args.children)},
+        {"tracer": "histograms + OTLP file", "us_per_span": per_span_us(Tracer(OTLPJsonFileExporter(path)),
+                                                                         traces, args.children)},
+    ]
+    print_table(rows)
+    print(f"trace file: {os.path.getsize(path) / traces:.0f} bytes per trace\n")
+
+    rng = random.Random(0)
+    samples = [rng.lognormvariate(-1.0, 1.2) for _ in range(100_000)]
+    histogram = LatencyHistogram()
+    for s in samples:
+        histogram.record(s)
+    print_table([{"percentile": f"p{p}", "exact_ms": percentile(samples, p) * 1000,
+                  "histogram_ms": histogram.percentile(p) * 1000,
+                  "error_pct": (histogram.percentile(p) / percentile(samples, p) - 1) * 100}
+                 for p in (50, 95, 99, 99.9)])
+    print(f"{len(histogram.counts)} buckets for {len(samples)} samples")
+
+
+if __name__ == "__main__":
+    main()
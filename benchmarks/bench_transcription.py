@@ -0,0 +1,87 @@
+"""
+Transcription cost on a Streamlit-like stream of audio uploads.
+
+Each clip is uploaded once and followed by several reruns with the same
+clip still attached. The old path (spill the upload to a .mp3 temp file,
+reopen it, send it, every rerun) is compared with utils.transcription
+(bytes sent from memory, transcripts cached by audio hash). The backend is
+the replay client, so latencies are recorded Whisper timings and overhead
+is measured separately with --timing none.
+
+    python -m benchmarks.bench_transcription --clips 10 --reruns 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import print_table, summarize
+from benchmarks.suite import ASR_MODEL, LLM_PROBLEMS, synthetic_clip
+from utils.cache import TieredCache
+from utils.llm_replay import ReplayClient
+from utils.transcription import ReplayBackend, Transcriber
+
+
+def legacy_transcribe(client, audio: bytes) -> str:
+    """Before: every call writes the upload to disk and uploads the file"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
+        tmp.write(audio)
+        tmp_path = tmp.name
+    try:
+        with open(tmp_path, "rb") as f:
+            return client.audio.transcriptions.create(file=f, model=ASR_MODEL, language="en").text.strip()
+    finally:
+        os.unlink(tmp_path)
+
+
+def run(name: str, transcribe, uploads: list, client: ReplayClient) -> dict:
+    calls_before = client.stats["exact"] + client.stats["nearest"]
+    latencies = []
+    for audio in uploads:
+        start = time.perf_counter()
+        transcribe(audio)
+        latencies.append(time.perf_counter() - start)
+    stats = summarize(latencies)
+    return {
+        "path": name,
+        "requests": len(uploads),
+        "asr_calls": client.stats["exact"] + client.stats["nearest"] - calls_before,
+        "total_s": sum(latencies),
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=10)
+    parser.add_argument("--reruns", type=int, default=4, help="reruns after each upload")
+    parser.add_argument("--timing", default="sampled", choices=["none", "mean", "sampled"])
+    parser.add_argument("--fixtures", default="benchmarks/fixtures/replay.jsonl")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    clips = [synthetic_clip(i, LLM_PROBLEMS[i % len(LLM_PROBLEMS)][0]) for i in range(args.clips)]
+    uploads = [clip for clip in clips for _ in range(1 + args.reruns)]
+
+    rows = []
+    for timing in dict.fromkeys([args.timing, "none"]):
+        client = ReplayClient(args.fixtures, timing=timing, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            transcriber = Transcriber(ReplayBackend(client, model=ASR_MODEL),
+                                      cache=TieredCache(str(Path(tmp) / "transcripts.sqlite3")))
+            uncached = Transcriber(ReplayBackend(client, model=ASR_MODEL))
+            suffix = "" if timing == args.timing else " (no ASR latency)"
+            rows += [
+                run(f"temp file, no cache (before){suffix}", lambda a: legacy_transcribe(client, a), uploads, client),
+                run(f"in memory, no cache{suffix}", lambda a: uncached.transcribe(a, "clip.wav"), uploads, client),
+                run(f"in memory + transcript cache{suffix}", lambda a: transcriber.transcribe(a, "clip.wav"),
+                    uploads, client),
+            ]
+    print(f"{args.clips} clips, {args.reruns} reruns each, replay timing={args.timing}\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
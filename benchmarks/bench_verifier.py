@@ -0,0 +1,66 @@
+"""
+Local answer verification: verdict accuracy on correct and deliberately
+wrong answers, how many escalate to the LLM verifier, and per-check
+latency.
+
+    python -m benchmarks.bench_verifier --repeat 20
+"""
+import argparse
+import time
+
+from agents.symbolic_verifier import SymbolicVerifier
+from benchmarks.harness import print_table, summarize
+
+# (problem, correct answer, wrong answer)
+CASES = [
+    ("Solve x^2 - 5x + 6 = 0", "x = 2 or x = 3", "x = 2"),
+    ("Solve 2x^2 - 3x - 5 = 0", r"$x = \frac{5}{2}$, $x = -1$", "x = 5/2, x = 1"),
+    ("Solve x + y = 5, x - y = 1", "x = 3, y = 2", "x = 2, y = 3"),
+    ("Solve for x: a x + b = 0", "x = -b/a", "x = b/a"),
+    ("Find the derivative of sin(x) * x^2", "f'(x) = 2x sin(x) + x^2 cos(x)", "f'(x) = 2x cos(x)"),
+    ("Differentiate e^(2x) ln(x)", "2e^(2x) ln(x) + e^(2x)/x", "2e^(2x)/x"),
+    ("Integrate x cos(x) dx", "x sin(x) + cos(x) + C", "x sin(x) - cos(x) + C"),
+    ("Integrate x^2 dx from 0 to 3", "9", "27"),
+    ("Evaluate the limit of sin(3x)/x as x -> 0", "3", "1/3"),
+    ("Simplify (x^2 - 1)/(x - 1)", "x + 1", "x - 1"),
+    ("How many ways can 5 books be arranged on a shelf?", "120", "25"),
+    ("What is the probability of getting exactly 2 heads in 3 coin tosses?", "3/8", "1/2"),
+]
+OPEN_ENDED = [
+    ("Prove that the square root of 2 is irrational", "Assume sqrt(2) = p/q in lowest terms ..."),
+    ("A ladder 10 m long slides down a wall; how fast does the top move?", "1.5 m/s"),
+    # A condition the counting patterns do not model: must not be "checked" against plain 10C3
+    ("How many ways to choose 3 from 10 if 2 particular students must be included?", "8"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    verifier = SymbolicVerifier()
+    rows = []
+    for label, index, expected in (("correct answers", 1, True), ("wrong answers", 2, False)):
+        times, right, escalated = [], 0, 0
+        for _ in range(args.repeat):
+            for case in CASES:
+                start = time.perf_counter()
+                verdict = verifier.verify(case[0], case[index])
+                times.append(time.perf_counter() - start)
+                escalated += verdict is None
+                right += verdict is not None and verdict["is_correct"] == expected
+        rows.append({"answers": label, "agreed": f"{right}/{len(times)}", "escalated": f"{escalated}/{len(times)}",
+                     **summarize(times)})
+    times, escalated = [], 0
+    for problem, answer in OPEN_ENDED * args.repeat:
+        start = time.perf_counter()
+        escalated += verifier.verify(problem, answer) is None
+        times.append(time.perf_counter() - start)
+    rows.append({"answers": "open-ended", "agreed": "-", "escalated": f"{escalated}/{len(times)}", **summarize(times)})
+    print_table(rows)
+
+
+
+if __name__ == "__main__":
+    main()
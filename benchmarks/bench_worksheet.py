@@ -0,0 +1,101 @@
+"""
+Worksheet mode: one numbered worksheet split into questions and solved
+concurrently, against the whole text as one prompt.
+
+The questions are the suite's problems (LLM and symbolic), so every
+sub-problem has a recorded Groq completion in the replay fixtures. The
+"before" row is modelled rather than replayed (there is no recording of a
+15-question completion): one request whose output is the sum of the
+recorded per-question completions, cut at GroqSolver's max_tokens, with
+latency drawn from the same preset. A question counts as answered when
+its whole solution fits.
+
+    python -m benchmarks.bench_worksheet --questions 15 --concurrency 1 4 8
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from agents.groq_solver import SOLVER_MODEL, GroqSolver
+from agents.symbolic_solver import SymbolicSolver
+from agents.symbolic_verifier import SymbolicVerifier
+from agents.worksheet import solve_worksheet, split_worksheet
+from benchmarks.harness import print_table
+from benchmarks.suite import FIXTURES, LLM_PROBLEMS, SYMBOLIC_PROBLEMS
+from memory.memory_manager import MemoryManager
+from utils.cache import TieredCache
+from utils.llm_replay import PRESETS, ReplayClient, request_key
+from utils.single_flight import SingleFlight
+
+
+def one_prompt(problems: list, client: ReplayClient, solver: GroqSolver, rng: random.Random) -> dict:
+    """Modelled single request for the whole worksheet"""
+    tokens, answered = 0, 0
+    for problem in problems:
+        prompt = f"user: {solver.messages(problem)[0]['content']}"
+        record = client.fixtures.records.get(request_key("chat", prompt))
+        needed = (record or {}).get("usage", {}).get("completion_tokens") or 400
+        if tokens + needed > solver.max_tokens:
+            break
+        tokens += needed
+        answered += 1
+    ttft, total = PRESETS[SOLVER_MODEL].sample(rng, min(solver.max_tokens, tokens + 1))
+    return {"mode": "one prompt (before)", "answered": f"{answered}/{len(problems)}", "first_answer_s": total,
+            "total_s": total, "llm_calls": 1, "sources": "-"}
+
+
+def fan_out(name: str, problems: list, solve_args: tuple, concurrency: int) -> dict:
+    first = []
+    start = time.perf_counter()
+    outcomes = solve_worksheet(problems, *solve_args, concurrency=concurrency,
+                               on_result=lambda i, o: first or first.append(time.perf_counter() - start))
+    total = time.perf_counter() - start
+    sources = {}
+    for outcome in outcomes:
+        sources[outcome["source"]] = sources.get(outcome["source"], 0) + 1
+    answered = sum(o["source"] != "error" for o in outcomes)
+    return {"mode": name, "answered": f"{answered}/{len(problems)}", "first_answer_s": first[0], "total_s": total,
+            "llm_calls": sources.get("llm", 0), "sources": ", ".join(f"{k} {v}" for k, v in sorted(sources.items()))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=15)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--timing", default="sampled", choices=["recorded", "sampled", "none"])
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [p for p, _ in LLM_PROBLEMS] + SYMBOLIC_PROBLEMS
+    chosen = rng.sample(pool, min(args.questions, len(pool)))
+    text = "\n".join(f"{i}. {p}" for i, p in enumerate(chosen, 1))
+
+    start = time.perf_counter()
+    problems = split_worksheet(text)
+    split_ms = (time.perf_counter() - start) * 1000
+
+    symbolic = SymbolicSolver()
+    checker = SymbolicVerifier(symbolic)
+    rows = []
+    for concurrency in args.concurrency:
+        # Fresh cache and memory per setting: every run starts cold, then is re-submitted warm
+        client = ReplayClient(args.fixtures, timing=args.timing, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            solver = GroqSolver(client, cache=TieredCache(str(Path(tmp) / "solutions.sqlite3")),
+                                single_flight=SingleFlight())
+            memory = MemoryManager(str(Path(tmp) / "memory"))
+            if not rows:
+                rows.append(one_prompt(problems, client, solver, rng))
+            solve_args = (memory, symbolic, solver, checker)
+            rows.append(fan_out(f"split, {concurrency} in flight", problems, solve_args, concurrency))
+            rows.append(fan_out(f"split, {concurrency} in flight, resubmitted", problems, solve_args, concurrency))
+    print(f"{len(problems)} questions split in {split_ms:.1f} ms, Groq replay timing={args.timing}\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
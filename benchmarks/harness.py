@@ -0,0 +1,66 @@
+import math
+import resource
+import sys
+import time
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of values (pct in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: list) -> dict:
+    """Latency summary in milliseconds"""
+    ms = [x * 1000 for x in latencies]
+    return {
+        "n": len(ms),
+        "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux); falls back to the peak elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+def timed(fn, *args, **kwargs):
+    """Call fn and return (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def print_table(rows: list):
+    """Print a list of dicts as an aligned table"""
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    cells = [[_fmt(row.get(c)) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
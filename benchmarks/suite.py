@@ -0,0 +1,501 @@
+"""
+Offline end-to-end benchmark suite: OCR, ASR, retrieval, memory and both
+solve pipelines, with LLM and Whisper calls replayed from recorded fixtures
+(utils.llm_replay) instead of the network.
+
+Each stage runs in its own spawned process so its peak RSS is its own.
+Reports throughput, p50/p95/p99 and peak RSS per stage, plus per-span
+latency of the pipelines from utils.tracing.
+
+    python -m benchmarks.suite                                  # sampled model latency, real time
+    python -m benchmarks.suite --speed 10 --save base.json      # 10x faster replay, keep results
+    python -m benchmarks.suite --speed 10 --baseline base.json  # exit 1 on a regression
+    python -m benchmarks.suite --write-fixtures                 # regenerate the synthetic seed fixtures
+
+The committed fixtures are synthetic seeds; re-record them against the real
+APIs with utils.llm_replay.RecordingClient for production-like numbers.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.harness import peak_rss_mb, print_table, summarize
+
+FIXTURES = "benchmarks/fixtures/replay.jsonl"
+STAGES = ("ocr", "asr", "retrieval", "memory", "pipeline.app", "pipeline.agents")
+ASR_MODEL = "whisper-large-v3-turbo"
+
+# (problem, final answer): problems the symbolic solver leaves to the LLM
+LLM_PROBLEMS = [
+    ("A ladder 10 m long leans against a wall. Its foot slides away at 2 m/s. "
+     "How fast is the top sliding down when the foot is 6 m from the wall?", "1.5 m/s"),
+    ("A bag contains 5 red and 3 blue balls. Two balls are drawn without replacement. "
+     "Find the probability that both are red.", "5/14"),
+    ("Find the area enclosed between the curves y = x^2 and y = 2x.", "4/3"),
+    ("Find the maximum value of 3 sin x + 4 cos x.", "5"),
+    ("If the roots of x^2 - px + q = 0 differ by 1, prove that p^2 = 4q + 1.", "p^2 = 4q + 1"),
+    ("Prove that the square root of 2 is irrational.", "√2 is irrational"),
+    ("A fair die is rolled three times. What is the probability of getting at least one six?", "91/216"),
+    ("The sum of an infinite geometric series is 12 and its first term is 4. Find the common ratio.", "2/3"),
+    ("How many ways can 5 boys and 3 girls sit in a row so that no two girls sit together?", "14400"),
+    ("A train 150 m long passes a pole in 15 seconds. How long does it take to pass a platform 250 m long?",
+     "40 s"),
+]
+
+# Closed-form problems answered by agents.symbolic_solver without an LLM call
+SYMBOLIC_PROBLEMS = [
+    "Solve x^2 - 5x + 6 = 0",
+    "Differentiate x^3 sin(x)",
+    "Integrate x e^x dx",
+    "Find the limit of sin(x)/x as x approaches 0",
+    "Solve 2x + 3 = 11",
+    "Find the derivative of ln(x^2 + 1)",
+    "Find the eigenvalues of the matrix [[2, 1], [1, 2]]",
+]
+
+SECTIONS = ["Problem understanding", "Solution strategy", "Step-by-step solution", "Verification"]
+PADDING = ("We write down what is given and what is asked, name the unknowns, and keep track of "
+           "units and domain restrictions so the final answer can be checked at the end.")
+
+
+# ----------------------------------------------------------------------------
+# Synthetic inputs and seed fixtures
+# ----------------------------------------------------------------------------
+
+def synthetic_clip(index: int, text: str, sample_rate: int = 16000) -> bytes:
+    """Deterministic WAV standing in for someone reading text aloud (~0.35 s per word)"""
+    import numpy as np
+    rng = np.random.default_rng(index)
+    seconds = 0.35 * len(text.split())
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    # A few syllable-rate bursts of a voiced tone over low background noise
+    envelope = (np.sin(2 * np.pi * 3.0 * t) > 0).astype(float)
+    signal = 0.3 * envelope * np.sin(2 * np.pi * (140 + 10 * index) * t) + 0.01 * rng.standard_normal(t.size)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def clip_seconds(audio: bytes) -> float:
+    with wave.open(io.BytesIO(audio), "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+def _markdown_solution(problem: str, answer: str) -> str:
+    body = "\n\n".join(f"**{i}. {section}**\n\n{PADDING}" for i, section in enumerate(SECTIONS, 1))
+    return f"{body}\n\n**Final Answer:** {answer}"
+
+
+def _parsed(problem: str) -> dict:
+    """ParserAgent's output: the local rule parse when it is confident, else a recorded LLM parse"""
+    from agents.rule_parser import rule_parse
+    local = rule_parse(problem)
+    if local is not None:
+        return local
+    lowered = problem.lower()
+    topic = ("probability" if "probability" in lowered or "ways" in lowered else
+             "linear_algebra" if "matrix" in lowered else
+             "calculus" if any(w in lowered for w in ("area", "fast", "derivative", "integrate", "limit")) else
+             "algebra")
+    return {"problem_text": problem, "topic": topic, "variables": ["x"], "constraints": [],
+            "additional_context": "", "needs_clarification": False, "clarification_questions": []}
+
+
+def _solution(problem: str, answer: str) -> dict:
+    return {
+        "approach": "Translate the statement into equations and solve them.",
+        "steps": [{"step": i, "description": section, "calculation": PADDING}
+                  for i, section in enumerate(SECTIONS, 1)],
+        "final_answer": answer,
+        "confidence": 0.9,
+        "sources": ["standard results"],
+    }
+
+
+def write_fixtures(path: str = FIXTURES, seed: int = 0) -> int:
+    """
+    Synthetic seed recordings for every request the suite makes, with
+    latencies drawn from utils.llm_replay.PRESETS. Marked "synthetic": true.
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    from agents import registry
+    from agents.explainer_agent import ExplainerAgent
+    from agents.groq_solver import SOLVER_MODEL, GroqSolver
+    from agents.parser_agent import ParserAgent, ParsedProblem
+    from agents.pipeline import _solution_json
+    from agents.router_agent import RouterAgent
+    from agents.solver_agent import SolverAgent
+    from agents.verifier_agent import VerifierAgent
+    from utils.llm_replay import PRESETS, audio_key, request_key
+
+    rng = random.Random(seed)
+    records = []
+
+    def chat(model: str, prompt: str, response: str, tokens: int):
+        prompt = f"user: {prompt}"
+        ttft, total = PRESETS[model].sample(rng, tokens)
+        records.append({"kind": "chat", "key": request_key("chat", prompt), "model": model, "prompt": prompt,
+                        "response": response, "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": tokens},
+                        "ttft_s": round(ttft, 4), "total_s": round(total, 4), "synthetic": True})
+
+    groq = GroqSolver(client=None)
+    # Only the agents' prompt templates are needed: no request is made and no index is loaded
+    registry.get_or_create("retriever", lambda: None)
+    parser, router, solver = ParserAgent(), RouterAgent(), SolverAgent()
+    verifier, explainer = VerifierAgent(), ExplainerAgent()
+
+    for problem, answer in LLM_PROBLEMS:
+        chat(SOLVER_MODEL, groq.messages(problem)[0]["content"], _markdown_solution(problem, answer),
+             rng.randint(350, 650))
+    for problem in [p for p, _ in LLM_PROBLEMS] + SYMBOLIC_PROBLEMS:
+        parsed = _parsed(problem)
+        chat("gpt-4-turbo", parser.prompt.format(raw_input=problem), json.dumps(parsed), rng.randint(80, 140))
+        route = {"strategy": "algebraic_manipulation", "use_rag": True,
+                 "computational_tools": ["calculator", "solver"], "confidence": 0.9}
+        chat("gpt-4-turbo", router.prompt.format(problem=str(ParsedProblem(**parsed).model_dump())),
+             json.dumps(route), rng.randint(40, 60))
+    for problem, answer in LLM_PROBLEMS:
+        solution = _solution(problem, answer)
+        chat("gpt-4-turbo", solver.prompt.format(problem=str(_parsed(problem)), context=""),
+             json.dumps(solution), rng.randint(300, 500))
+        solution_json = _solution_json(solution)
+        chat("gpt-4-turbo", verifier.prompt.format(problem=problem, solution=solution_json),
+             json.dumps({"is_correct": True, "confidence": 0.85, "issues": [], "suggestions": [],
+                         "needs_human_review": False}), rng.randint(40, 80))
+        chat("gpt-4-turbo", explainer.prompt.format(problem=problem, solution=json.dumps(json.loads(solution_json), indent=2)),
+             f"{_markdown_solution(problem, answer)}\n\nTry a similar problem with different numbers.",
+             rng.randint(250, 450))
+
+    for i, (problem, _) in enumerate(LLM_PROBLEMS):
+        audio = synthetic_clip(i, problem)
+        audio_s = clip_seconds(audio)
+        ttft, total = PRESETS[ASR_MODEL].sample(rng, audio_s=audio_s)
+        records.append({"kind": "transcription", "key": audio_key(audio), "model": ASR_MODEL, "prompt": None,
+                        "response": problem, "usage": None, "ttft_s": None, "total_s": round(total, 4),
+                        "audio_s": round(audio_s, 3), "synthetic": True})
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return len(records)
+
+
+# ----------------------------------------------------------------------------
+# Stages: each takes the parsed options as a dict and returns result rows
+# ----------------------------------------------------------------------------
+
+def _row(stage: str, latencies: list, wall_s: float, note: str = "") -> dict:
+    stats = summarize(latencies)
+    return {"stage": stage, "n": stats["n"], "throughput_per_s": stats["n"] / wall_s if wall_s else 0.0,
+            "p50_ms": stats["p50_ms"], "p95_ms": stats["p95_ms"], "p99_ms": stats["p99_ms"], "note": note}
+
+
+def _span_rows(prefix: str, names: tuple) -> list:
+    """Per-span latency recorded by utils.tracing during the stage"""
+    from utils.tracing import get_tracer
+    return [{"stage": f"{prefix}/{r['stage']}", "n": r["n"], "throughput_per_s": None, "p50_ms": r["p50_ms"],
+             "p95_ms": r["p95_ms"], "p99_ms": r["p99_ms"], "note": ""}
+            for r in get_tracer().histograms.summary() if r["stage"] in names]
+
+
+def _run_concurrently(fn, items: list, concurrency: int) -> tuple:
+    """(per-item latencies, results, wall seconds) of fn over items on a thread pool"""
+    def timed(item):
+        start = time.perf_counter()
+        result = fn(item)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, items))
+    return [o[0] for o in outcomes], [o[1] for o in outcomes], time.perf_counter() - start
+
+
+def _workload(opts: dict) -> list:
+    """Request stream: mostly LLM problems, some closed-form ones, repeats included"""
+    rng = random.Random(opts["seed"])
+    problems = [p for p, _ in LLM_PROBLEMS]
+    return [rng.choice(problems) if rng.random() < 0.7 else rng.choice(SYMBOLIC_PROBLEMS)
+            for _ in range(opts["requests"])]
+
+
+def stage_ocr(opts: dict) -> list:
+    try:
+        import pytesseract
+        from PIL import Image, ImageDraw, ImageFont
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        return [{"stage": "ocr", "n": 0, "note": f"skipped: {type(e).__name__}: {e}"}]
+    from utils.ocr_handler import OCRHandler
+
+    images = []
+    for problem, _ in LLM_PROBLEMS:
+        image = Image.new("L", (1800, 120), color=255)
+        try:
+            font = ImageFont.load_default(size=28)
+        except TypeError:  # Pillow < 10.1
+            font = ImageFont.load_default()
+        ImageDraw.Draw(image).text((20, 40), problem, fill=0, font=font)
+        images.append(image)
+    handler = OCRHandler()
+    items = [images[i % len(images)] for i in range(opts["ocr_images"])]
+    latencies, _, wall = _run_concurrently(handler.extract_text_from_image, items, 1)
+    return [_row("ocr", latencies, wall, f"{len(images)} rendered problems, sequential")]
+
+
+def stage_asr(opts: dict) -> list:
+    from utils.llm_replay import ReplayClient
+    from utils.transcription import ReplayBackend, Transcriber
+    client = ReplayClient(opts["fixtures"], timing=opts["timing"], speed=opts["speed"], seed=opts["seed"])
+    clips = [synthetic_clip(i, problem) for i, (problem, _) in enumerate(LLM_PROBLEMS)]
+    # Same path as app.extract_text_from_audio minus the transcript cache, so every request reaches the backend
+    transcriber = Transcriber(ReplayBackend(client, model=ASR_MODEL))
+
+    def transcribe(audio: bytes) -> str:
+        return transcriber.transcribe(audio, filename="clip.wav")["text"]
+
+    items = [clips[i % len(clips)] for i in range(opts["requests"])]
+    latencies, _, wall = _run_concurrently(transcribe, items, opts["concurrency"])
+    return [_row("asr", latencies, wall, f"{client.stats['exact']} exact / {client.stats['nearest']} nearest")]
+
+
+def _build_kb(tmp: str, distractors: int, seed: int):
+    from benchmarks.bench_retrieval import write_corpus
+    from rag.embedding_backends import build_embeddings
+    from rag.knowledge_base import MathKnowledgeBase
+    kb_dir = Path(tmp) / "docs"
+    kb_dir.mkdir()
+    write_corpus(kb_dir, distractors, seed)
+    embeddings = build_embeddings("deterministic", cache_dir=str(Path(tmp) / "cache"))
+    kb = MathKnowledgeBase(str(kb_dir), embeddings=embeddings, index_dir=str(Path(tmp) / "index"))
+    kb.build_index()
+    return kb
+
+
+def stage_retrieval(opts: dict) -> list:
+    from benchmarks.bench_retrieval import LABELLED_QUERIES
+    from rag.retriever import HybridRetriever
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        kb = _build_kb(tmp, opts["distractors"], opts["seed"])
+        build_s = time.perf_counter() - start
+        retriever = HybridRetriever(kb)
+        queries = [LABELLED_QUERIES[i % len(LABELLED_QUERIES)][0] for i in range(opts["requests"] * 4)]
+        rows = []
+        for name, search in (("retrieval.vector", kb.retrieve), ("retrieval.hybrid", retriever.retrieve)):
+            latencies, _, wall = _run_concurrently(lambda q: search(q, k=3), queries, 1)
+            rows.append(_row(name, latencies, wall, f"{opts['distractors']} distractors, index built in {build_s:.1f}s"))
+    return rows
+
+
+def stage_memory(opts: dict) -> list:
+    from benchmarks.bench_memory_recall import perturb, random_problem
+    from memory.memory_manager import MemoryManager
+    rng = random.Random(opts["seed"])
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MemoryManager(tmp)
+        problems = [random_problem(rng) for _ in range(opts["memory_size"])]
+        latencies, _, wall = _run_concurrently(
+            lambda p: memory.save_attempt(p, "**Final Answer:** 0", feedback="correct", verified=True), problems, 1)
+        rows = [_row("memory.save", latencies, wall, f"{len(problems)} attempts")]
+
+        # Half stored problems, half never seen
+        queries = [rng.choice(problems) if i % 2 else random_problem(rng) for i in range(opts["requests"] * 4)]
+        latencies, _, wall = _run_concurrently(memory.find_exact, queries, 1)
+        rows.append(_row("memory.find_exact", latencies, wall, "50% hits"))
+        queries = [perturb(rng, rng.choice(problems)) for _ in range(opts["requests"])]
+        latencies, _, wall = _run_concurrently(memory.find_similar_problems, queries, 1)
+        rows.append(_row("memory.find_similar", latencies, wall, "perturbed stored problems"))
+    return rows
+
+
+def stage_pipeline_app(opts: dict) -> list:
+    """The Streamlit solve path (agents.solve_flow) with Groq replayed"""
+    from agents.groq_solver import GroqSolver
+    from agents.solve_flow import solve_problem
+    from agents.symbolic_solver import SymbolicSolver
+    from agents.symbolic_verifier import SymbolicVerifier
+    from memory.memory_manager import MemoryManager
+    from utils.cache import TieredCache
+    from utils.llm_replay import ReplayClient
+    from utils.single_flight import SingleFlight
+
+    client = ReplayClient(opts["fixtures"], timing=opts["timing"], speed=opts["speed"], seed=opts["seed"])
+    symbolic = SymbolicSolver()
+    checker = SymbolicVerifier(symbolic)
+    sources = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MemoryManager(str(Path(tmp) / "memory"))
+        solver = GroqSolver(client, cache=TieredCache(str(Path(tmp) / "solutions.sqlite3")),
+                            single_flight=SingleFlight())
+
+        def solve(problem: str) -> str:
+            # Streamed like the UI, so TTFT is measured
+            return solve_problem(problem, memory, symbolic, solver, checker, on_token=lambda _: None)["source"]
+
+        latencies, results, wall = _run_concurrently(solve, _workload(opts), opts["concurrency"])
+    for source in results:
+        sources[source] = sources.get(source, 0) + 1
+    note = ", ".join(f"{k} {v}" for k, v in sorted(sources.items()))
+    return [_row("pipeline.app", latencies, wall, note)] + _span_rows(
+        "pipeline.app", ("memory_lookup", "symbolic_solve", "llm.solve", "llm", "answer_check", "symbolic_verify"))
+
+
+def stage_pipeline_agents(opts: dict) -> list:
+    """The async agent DAG (agents.pipeline) with every agent real and the OpenAI API replayed over HTTP"""
+    import asyncio
+    from utils.llm_replay import ReplayServer
+
+    server = ReplayServer(opts["fixtures"], timing=opts["timing"], speed=opts["speed"], seed=opts["seed"]).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ.update({"OPENAI_BASE_URL": f"{server.url}/v1", "OPENAI_API_KEY": "replay",
+                               "EMBEDDING_BACKEND": "deterministic"})
+            from agents import registry
+            from agents.explainer_agent import ExplainerAgent
+            from agents.parser_agent import ParserAgent
+            from agents.pipeline import build_agent_pipeline
+            from agents.router_agent import RouterAgent
+            from agents.solver_agent import SolverAgent
+            from agents.verifier_agent import VerifierAgent
+
+            kb = _build_kb(tmp, opts["distractors"], opts["seed"])
+            registry.get_or_create("knowledge_base", lambda: kb)
+            pipeline = build_agent_pipeline(ParserAgent(), RouterAgent(), SolverAgent(), VerifierAgent(), ExplainerAgent())
+
+            async def run_all(problems: list) -> tuple:
+                gate = asyncio.Semaphore(opts["concurrency"])
+
+                async def one(problem: str) -> float:
+                    async with gate:
+                        start = time.perf_counter()
+                        await pipeline.run({"raw_input": problem})
+                        return time.perf_counter() - start
+
+                start = time.perf_counter()
+                latencies = await asyncio.gather(*(one(p) for p in problems))
+                return list(latencies), time.perf_counter() - start
+
+            latencies, wall = asyncio.run(run_all(_workload(opts)))
+    finally:
+        server.stop()
+    note = f"{server.stats['exact']} exact / {server.stats['nearest']} nearest LLM replies"
+    return [_row("pipeline.agents", latencies, wall, note)] + _span_rows(
+        "pipeline.agents", ("stage.parse", "stage.route", "stage.retrieve", "stage.solve", "stage.verify", "stage.explain",
+         "parse", "symbolic_verify"))
+
+
+STAGE_FUNCTIONS = {
+    "ocr": stage_ocr,
+    "asr": stage_asr,
+    "retrieval": stage_retrieval,
+    "memory": stage_memory,
+    "pipeline.app": stage_pipeline_app,
+    "pipeline.agents": stage_pipeline_agents,
+}
+
+
+def run_stage(name: str, opts: dict) -> list:
+    """Entry point in the spawned process: run one stage and attach this process's peak RSS"""
+    rows = STAGE_FUNCTIONS[name](opts)
+    rss = peak_rss_mb()
+    for row in rows:
+        if row.get("throughput_per_s") is not None:
+            row["peak_rss_mb"] = rss
+    return rows
+
+
+# ----------------------------------------------------------------------------
+# Baseline comparison
+# ----------------------------------------------------------------------------
+
+# metric -> +1 when higher is worse, -1 when lower is worse
+METRICS = {"p95_ms": 1, "throughput_per_s": -1, "peak_rss_mb": 1}
+
+
+def compare(rows: list, baseline: list, tolerance: float) -> list:
+    """One entry per metric that moved past tolerance in the wrong direction"""
+    before = {r["stage"]: r for r in baseline}
+    regressions = []
+    for row in rows:
+        old = before.get(row["stage"])
+        if not old or not row.get("n"):
+            continue
+        for metric, sign in METRICS.items():
+            if not old.get(metric) or row.get(metric) is None:
+                continue
+            change = (row[metric] - old[metric]) / old[metric]
+            if sign * change > tolerance:
+                regressions.append({"stage": row["stage"], "metric": metric, "baseline": old[metric],
+                                    "current": row[metric], "change": f"{change:+.0%}"})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--timing", choices=["sampled", "recorded", "none"], default="sampled",
+                        help="replayed model latency: drawn from the latency model, as recorded, or none")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay model latency this many times faster")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distractors", type=int, default=500)
+    parser.add_argument("--memory-size", type=int, default=2000)
+    parser.add_argument("--ocr-images", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the result rows to this JSON file")
+    parser.add_argument("--baseline", help="compare against rows saved with --save; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative change before a regression")
+    parser.add_argument("--write-fixtures", action="store_true", help="regenerate the synthetic seed fixtures and exit")
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        print(f"Wrote {write_fixtures(args.fixtures, args.seed)} records to {args.fixtures}")
+        return
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))}")
+    opts = {k: v for k, v in vars(args).items() if k not in ("save", "baseline", "tolerance", "stages")}
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for name in stages:
+        with ctx.Pool(1) as pool:
+            rows.extend(pool.apply(run_stage, (name, opts)))
+
+    print(f"timing={args.timing} speed={args.speed}x requests={args.requests} concurrency={args.concurrency}\n")
+    columns = ["stage", "n", "throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb", "note"]
+    print_table([{c: row.get(c, "") if row.get(c) is not None else "" for c in columns} for row in rows])
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({"options": opts, "rows": rows}, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["rows"]
+        regressions = compare(rows, baseline, args.tolerance)
+        print()
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}:")
+            print_table(regressions)
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterator
+
+
+class AttemptStore:
+    """
+    Append-only, sharded storage for solution attempts.
+
+    Records are appended as JSON lines to segment files, and each shard keeps
+    an append-only index log mapping a content key to the (segment, offset,
+    length) of every attempt stored under it. Reads seek straight to a record,
+    so the cost of get/put does not depend on how many attempts are stored.
+    One instance is shared by every session, so index state and appends are
+    serialized by a lock.
+    """
+
+    def __init__(self,
+                 store_dir: str = "memory/stored/store",
+                 num_shards: int = 16,
+                 max_segment_bytes: int = 32 * 1024 * 1024,
+                 max_attempts_per_key: int = 5):
+        self.store_dir = Path(store_dir)
+        self.num_shards = num_shards
+        self.max_segment_bytes = max_segment_bytes
+        self.max_attempts_per_key = max_attempts_per_key
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        # shard id -> {key: [(segment, offset, length), ...]}, loaded lazily
+        self._indexes = {}
+        # Reentrant: put and compact load indexes while holding it
+        self._lock = threading.RLock()
+
+    def _shard_of(self, key: str) -> int:
+        return int(key[:8], 16) % self.num_shards
+
+    def _shard_dir(self, shard: int) -> Path:
+        path = self.store_dir / f"shard_{shard:02d}"
+        path.mkdir(exist_ok=True)
+        return path
+
+    def _segments(self, shard: int) -> list:
+        return sorted(int(p.stem.split("_")[1]) for p in self._shard_dir(shard).glob("seg_*.jsonl"))
+
+    def _segment_path(self, shard: int, segment: int) -> Path:
+        return self._shard_dir(shard) / f"seg_{segment:06d}.jsonl"
+
+    def _add_location(self, index: dict, key: str, location: tuple):
+        locations = index.setdefault(key, [])
+        locations.append(location)
+        # Older attempts beyond the limit become dead and are dropped at compaction
+        if len(locations) > self.max_attempts_per_key:
+            del locations[:-self.max_attempts_per_key]
+
+    def _load_index(self, shard: int) -> dict:
+        with self._lock:
+            if shard in self._indexes:
+                return self._indexes[shard]
+
+            index = {}
+            index_path = self._shard_dir(shard) / "index.jsonl"
+            if index_path.exists():
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Torn write from a crash; the record is unreachable
+                            continue
+                        self._add_location(index, entry["k"], (entry["s"], entry["o"], entry["n"]))
+
+            self._indexes[shard] = index
+            return index
+
+    def _read(self, shard: int, location: tuple) -> dict:
+        segment, offset, length = location
+        with open(self._segment_path(shard, segment), 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def put(self, key: str, record: dict):
+        """Append a record under key"""
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._put(key, data)
+
+    def _put(self, key: str, data: bytes):
+        shard = self._shard_of(key)
+        index = self._load_index(shard)
+
+        segments = self._segments(shard)
+        segment = segments[-1] if segments else 0
+        segment_path = self._segment_path(shard, segment)
+        if segment_path.exists() and segment_path.stat().st_size >= self.max_segment_bytes:
+            segment += 1
+            segment_path = self._segment_path(shard, segment)
+
+        # Write the record before its index entry so a crash never leaves a dangling pointer
+        with open(segment_path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+
+        location = (segment, offset, len(data))
+        with open(self._shard_dir(shard) / "index.jsonl", 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"k": key, "s": segment, "o": offset, "n": len(data)}) + "\n")
+
+        self._add_location(index, key, location)
+
+    def get(self, key: str) -> list:
+        """Return all live records stored under key, oldest first"""
+        shard = self._shard_of(key)
+        # Under the lock so compact() cannot remove a segment between lookup and read
+        with self._lock:
+            return [self._read(shard, loc) for loc in self._load_index(shard).get(key, [])]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._load_index(self._shard_of(key))
+
+    def __len__(self) -> int:
+        return sum(len(locs) for shard in range(self.num_shards)
+                   for locs in self._load_index(shard).values())
+
+    def items(self) -> Iterator[tuple]:
+        """Yield (key, record) for every live record, one segment read per record"""
+        for shard in range(self.num_shards):
+            # A shard at a time, so the lock is not held while the caller works
+            with self._lock:
+                records = [(key, self._read(shard, loc))
+                           for key, locations in self._load_index(shard).items() for loc in locations]
+            yield from records
+
+    def compact(self):
+        """Rewrite live records into fresh segments and drop dead bytes"""
+        for shard in range(self.num_shards):
+            with self._lock:
+                self._compact(shard)
+
+    def _compact(self, shard: int):
+        old_segments = self._segments(shard)
+        if not old_segments:
+            return
+
+        index = self._load_index(shard)
+        segment = old_segments[-1] + 1
+        new_index = {}
+        out = open(self._segment_path(shard, segment), 'wb')
+        try:
+            for key, locations in index.items():
+                for loc in locations:
+                    data = (json.dumps(self._read(shard, loc), ensure_ascii=False) + "\n").encode("utf-8")
+                    if out.tell() >= self.max_segment_bytes:
+                        out.close()
+                        segment += 1
+                        out = open(self._segment_path(shard, segment), 'wb')
+                    new_index.setdefault(key, []).append((segment, out.tell(), len(data)))
+                    out.write(data)
+        finally:
+            out.close()
+
+        # Swap the index atomically, then remove the segments it no longer references
+        index_path = self._shard_dir(shard) / "index.jsonl"
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, locations in new_index.items():
+                for s, o, n in locations:
+                    f.write(json.dumps({"k": key, "s": s, "o": o, "n": n}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+
+        for old in old_segments:
+            self._segment_path(shard, old).unlink()
+
+        self._indexes[shard] = new_index
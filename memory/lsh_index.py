@@ -0,0 +1,128 @@
+import hashlib
+import json
+import random
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Character shingles over lowercased, whitespace-collapsed text"""
+    text = " ".join(text.lower().split())
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHashLSH:
+    """
+    MinHash signatures banded into LSH buckets for near-duplicate lookup.
+
+    A query only touches the buckets its own bands hash to, so the candidate
+    list stays short regardless of corpus size. Signatures are appended to a
+    log file as keys are added and replayed on first use. Buckets and the
+    log are shared across sessions and updated under a lock; signatures,
+    the costly part, are computed outside it.
+    """
+
+    def __init__(self,
+                 index_path: Optional[str] = None,
+                 num_perm: int = 60,
+                 bands: int = 20,
+                 shingle_size: int = 3,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.index_path = Path(index_path) if index_path else None
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Fixed seed keeps signatures comparable across processes. XOR with a
+        # random mask over a well-mixed 64-bit hash stands in for a permutation
+        # and is several times cheaper than modular hashing in pure Python.
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+        self._buckets = [dict() for _ in range(bands)]
+        self._keys = set()
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def signature(self, text: str) -> list:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                  for s in shingles(text, self.shingle_size)]
+        return [min([h ^ mask for h in hashes]) for mask in self._masks]
+
+    def _band_keys(self, signature: list) -> list:
+        r = self.rows
+        return [hash(tuple(signature[i * r:(i + 1) * r])) for i in range(self.bands)]
+
+    def _insert(self, key: str, band_keys: list):
+        for bucket, band_key in zip(self._buckets, band_keys):
+            # Most buckets hold a single key; only promote to a list on collision
+            existing = bucket.get(band_key)
+            if existing is None:
+                bucket[band_key] = key
+            elif isinstance(existing, list):
+                existing.append(key)
+            else:
+                bucket[band_key] = [existing, key]
+        self._keys.add(key)
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            if self.index_path is not None and self.index_path.exists():
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if entry["k"] not in self._keys:
+                            self._insert(entry["k"], self._band_keys(entry["sig"]))
+            # Set last, so another thread never sees a half-replayed index
+            self._loaded = True
+
+    def __contains__(self, key: str) -> bool:
+        self._load()
+        return key in self._keys
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._keys)
+
+    def add(self, key: str, text: str):
+        """Index text under key; re-adding an existing key is a no-op"""
+        self._load()
+        if key in self._keys:
+            return
+        signature = self.signature(text)
+        with self._lock:
+            if key in self._keys:
+                return
+            if self.index_path is not None:
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({"k": key, "sig": signature}) + "\n")
+            self._insert(key, self._band_keys(signature))
+
+    def query(self, text: str, limit: Optional[int] = None) -> list:
+        """
+        Keys sharing at least one LSH band with text, most shared bands first.
+        The band count tracks Jaccard similarity, so limit keeps the closest.
+        """
+        self._load()
+        band_keys = self._band_keys(self.signature(text))
+        hits = {}
+        with self._lock:
+            for bucket, band_key in zip(self._buckets, band_keys):
+                found = bucket.get(band_key)
+                if found is None:
+                    continue
+                for key in (found if isinstance(found, list) else (found,)):
+                    hits[key] = hits.get(key, 0) + 1
+        ranked = sorted(hits, key=hits.get, reverse=True)
+        return ranked[:limit] if limit is not None else ranked
@@ -1,20 +1,29 @@
 import json
 from datetime import datetime
+from difflib import SequenceMatcher
 from pathlib import Path
 from typing import Optional
 
+from memory.attempt_store import AttemptStore
+from memory.lsh_index import MinHashLSH
+from utils.problem_key import problem_key
+
+
 class MemoryManager:
-    def __init__(self, memory_dir: str = "memory/stored"):
+    def __init__(self, memory_dir: str = "memory/stored", max_candidates: int = 50):
         self.memory_dir = Path(memory_dir)
         self.memory_dir.mkdir(parents=True, exist_ok=True)
-    
-    def save_attempt(self, 
+        self.store = AttemptStore(str(self.memory_dir / "store"))
+        self.lsh = MinHashLSH(str(self.memory_dir / "lsh.jsonl"))
+        self.max_candidates = max_candidates
+
+    def save_attempt(self,
                      problem: str,
                      solution: str,
                      feedback: str = "pending",
                      verified: bool = False):
         """Save a solution attempt for future reference"""
-        
+
         memory_record = {
             "timestamp": datetime.now().isoformat(),
             "problem": problem,
@@ -23,29 +32,88 @@ class MemoryManager:
             "verified": verified,
             "useful": feedback == "correct"
         }
-        
-        # Create filename based on problem hash
-        problem_hash = hash(problem) % 10000
-        filepath = self.memory_dir / f"attempt_{problem_hash}_{datetime.now().timestamp()}.json"
-        
-        with open(filepath, 'w') as f:
-            json.dump(memory_record, f, indent=2)
-    
+
+        key = problem_key(problem)
+        self.store.put(key, memory_record)
+        self.lsh.add(key, problem)
+
+    def get_attempts(self, problem: str) -> list:
+        """Return stored attempts for exactly this problem"""
+        return self.store.get(problem_key(problem))
+
+    def find_exact(self, problem: str) -> Optional[dict]:
+        """
+        Most recent verified attempt for the same canonical problem, or None.
+        Pending attempts are kept for similarity search but never served as answers.
+        """
+        verified = [a for a in self.get_attempts(problem)
+                    if a.get("verified") and a.get("feedback") != "incorrect"]
+        return verified[-1] if verified else None
+
     def find_similar_problems(self, current_problem: str, threshold: float = 0.7) -> list:
         """Find similar previously solved problems"""
-        from difflib import SequenceMatcher
-        
         similar = []
-        for file in self.memory_dir.glob("*.json"):
+        # Only LSH candidates are scored exactly, not the whole store
+        for key in self.lsh.query(current_problem, limit=self.max_candidates):
+            for record in self.store.get(key):
+                if not record["verified"]:
+                    continue
+
+                matcher = SequenceMatcher(None, current_problem, record["problem"])
+                # Cheap upper bounds first; ratio() is quadratic in text length
+                if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                    continue
+
+                similarity = matcher.ratio()
+                if similarity >= threshold:
+                    similar.append({
+                        "problem": record["problem"],
+                        "solution": record["solution"],
+                        "similarity": similarity
+                    })
+
+        return sorted(similar, key=lambda x: x["similarity"], reverse=True)
+
+    def rebuild_similarity_index(self) -> int:
+        """Add every stored problem to the LSH index (for stores written before it existed)"""
+        added = 0
+        for key, record in self.store.items():
+            if key not in self.lsh:
+                self.lsh.add(key, record["problem"])
+                added += 1
+        return added
+
+    def migrate_json_attempts(self, remove: bool = False) -> int:
+        """Import legacy attempt_*.json files into the attempt store"""
+        imported = 0
+        for file in sorted(self.memory_dir.glob("attempt_*.json")):
             with open(file, 'r') as f:
                 record = json.load(f)
-            
-            similarity = SequenceMatcher(None, current_problem, record["problem"]).ratio()
-            if similarity >= threshold and record["verified"]:
-                similar.append({
-                    "problem": record["problem"],
-                    "solution": record["solution"],
-                    "similarity": similarity
-                })
-        
-        return sorted(similar, key=lambda x: x["similarity"], reverse=True)
+            key = problem_key(record["problem"])
+            self.store.put(key, record)
+            self.lsh.add(key, record["problem"])
+            imported += 1
+            if remove:
+                file.unlink()
+        return imported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the attempt store")
+    parser.add_argument("command", choices=["migrate", "compact", "reindex"])
+    parser.add_argument("--memory-dir", default="memory/stored")
+    parser.add_argument("--remove", action="store_true", help="delete JSON files after import")
+    args = parser.parse_args()
+
+    manager = MemoryManager(args.memory_dir)
+    if args.command == "migrate":
+        count = manager.migrate_json_attempts(remove=args.remove)
+        print(f"✅ Imported {count} attempts")
+    elif args.command == "reindex":
+        count = manager.rebuild_similarity_index()
+        print(f"✅ Indexed {count} problems for similarity search")
+    else:
+        manager.store.compact()
+        print(f"✅ Compacted {len(manager.store)} attempts")
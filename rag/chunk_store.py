@@ -0,0 +1,123 @@
+"""
+Columnar, memory-mapped store for knowledge-base chunks.
+
+Row i holds the chunk whose vector is row i of the FAISS index. Everything is
+plain arrays, so opening a store maps files instead of unpickling a docstore:
+
+    text.bin          UTF-8 chunk texts, concatenated
+    offsets.npy       int64[n + 1]; chunk i is text.bin[offsets[i]:offsets[i + 1]]
+    ids.npy           S64[n] chunk ids (sha256 hex) in row order
+    ids_sorted.npy    the same ids sorted, with ids_order.npy mapping back to rows
+    col_<name>.npy    int32[n] codes into meta.json's value list for that column
+    meta.json         row count and the distinct values of each metadata column
+
+Texts are decoded only for the rows that are asked for.
+"""
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+ID_DTYPE = "S64"
+
+
+class ChunkStore:
+    def __init__(self, store_dir: str):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.count = meta["count"]
+        self.column_values = meta["columns"]
+
+        self._text = np.memmap(self.store_dir / "text.bin", dtype=np.uint8, mode="r") \
+            if (self.store_dir / "text.bin").stat().st_size else np.zeros(0, dtype=np.uint8)
+        self._offsets = self._load("offsets")
+        self._ids = self._load("ids")
+        self._ids_sorted = self._load("ids_sorted")
+        self._ids_order = self._load("ids_order")
+        self._codes = {name: self._load(f"col_{name}") for name in self.column_values}
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(self.store_dir / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+
+    @staticmethod
+    def exists(store_dir: str) -> bool:
+        return (Path(store_dir) / "meta.json").exists()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def chunk_id(self, row: int) -> str:
+        return self._ids[row].decode("ascii")
+
+    def text(self, row: int) -> str:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return self._text[start:end].tobytes().decode("utf-8")
+
+    def metadata(self, row: int) -> dict:
+        meta = {name: self.column_values[name][codes[row]] for name, codes in self._codes.items()}
+        meta["chunk_id"] = self.chunk_id(row)
+        return meta
+
+    def rows(self, chunk_ids: list) -> list:
+        """Row of each chunk id (None if absent), by binary search over the sorted ids"""
+        if not self.count:
+            return [None] * len(chunk_ids)
+        wanted = np.array(chunk_ids, dtype=ID_DTYPE)
+        pos = np.minimum(np.searchsorted(self._ids_sorted, wanted), self.count - 1)
+        found = self._ids_sorted[pos] == wanted
+        return [int(self._ids_order[p]) if ok else None for p, ok in zip(pos, found)]
+
+    def document(self, row: int):
+        from langchain_core.documents import Document
+        return Document(page_content=self.text(row), metadata=self.metadata(row))
+
+    def iter_rows(self):
+        """Yield (chunk_id, text) in row order"""
+        for row in range(self.count):
+            yield self.chunk_id(row), self.text(row)
+
+    @classmethod
+    def write(cls, store_dir: str, chunk_ids: list, texts: list, metadatas: list) -> "ChunkStore":
+        """
+        Write a store for parallel lists of ids, texts and metadata dicts.
+        Files are written into a temporary directory and swapped in whole.
+        """
+        store_dir = Path(store_dir)
+        tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # leftovers of an interrupted write
+        tmp_dir.mkdir(parents=True)
+
+        encoded = [t.encode("utf-8") for t in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        with open(tmp_dir / "text.bin", 'wb') as f:
+            for b in encoded:
+                f.write(b)
+        np.save(tmp_dir / "offsets.npy", offsets)
+
+        ids = np.array(chunk_ids, dtype=ID_DTYPE)
+        order = np.argsort(ids, kind="stable").astype(np.int64)
+        np.save(tmp_dir / "ids.npy", ids)
+        np.save(tmp_dir / "ids_sorted.npy", ids[order])
+        np.save(tmp_dir / "ids_order.npy", order)
+
+        columns = {}
+        names = sorted({k for meta in metadatas for k in meta} - {"chunk_id"})
+        for name in names:
+            values = {}
+            codes = np.array([values.setdefault(meta.get(name), len(values)) for meta in metadatas], dtype=np.int32)
+            np.save(tmp_dir / f"col_{name}.npy", codes)
+            columns[name] = list(values)
+
+        with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({"count": len(chunk_ids), "columns": columns}, f)
+
+        old_dir = store_dir.with_name(store_dir.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if store_dir.exists():
+            store_dir.rename(old_dir)
+        tmp_dir.rename(store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return cls(str(store_dir))
@@ -0,0 +1,99 @@
+"""
+Pluggable embedding backends for MathKnowledgeBase.
+
+A backend is a callable taking a list of texts and returning one vector per
+text, plus a `name` that namespaces its vectors in the embedding cache and
+the index manifest. Select one with EMBEDDING_BACKEND=openai|local|deterministic.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from rag.embedding_cache import DeterministicEmbedding
+
+DEFAULT_BACKEND = "openai"
+
+
+class OpenAIBackend:
+    """Remote OpenAI embeddings; one network round-trip per batch"""
+
+    def __init__(self, model: str = "text-embedding-3-small", **client_kwargs):
+        from langchain_openai import OpenAIEmbeddings
+        self.name = model
+        self._embeddings = OpenAIEmbeddings(model=model, api_key=os.getenv("OPENAI_API_KEY"), **client_kwargs)
+
+    def __call__(self, texts: list) -> list:
+        return self._embeddings.embed_documents(texts)
+
+
+class SentenceTransformerBackend:
+    """
+    CPU-local sentence-transformers model.
+
+    Texts are encoded in batches of batch_size. Tokenization runs ahead on a
+    thread pool (the fast tokenizers release the GIL) so the next batch is
+    ready while the model runs the current one.
+    """
+
+    def __init__(self,
+                 model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 batch_size: int = 64,
+                 tokenizer_threads: int = 2,
+                 device: str = "cpu"):
+        from sentence_transformers import SentenceTransformer
+        self.name = model
+        self.batch_size = batch_size
+        self.tokenizer_threads = tokenizer_threads
+        self.device = device
+        self.model = SentenceTransformer(model, device=device)
+
+    def __call__(self, texts: list) -> list:
+        import torch
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        vectors = []
+        with ThreadPoolExecutor(max_workers=self.tokenizer_threads) as pool:
+            for features in pool.map(self.model.tokenize, batches):
+                features = {k: v.to(self.device) for k, v in features.items()}
+                with torch.inference_mode():
+                    embedded = self.model(features)["sentence_embedding"]
+                embedded = torch.nn.functional.normalize(embedded, p=2, dim=1)
+                vectors.extend(embedded.cpu().numpy().tolist())
+        return vectors
+
+
+class DeterministicBackend(DeterministicEmbedding):
+    """Offline hashing embeddings for tests and benchmarks"""
+
+    def __init__(self, dim: int = 256):
+        super().__init__(dim)
+        self.name = f"deterministic-{dim}"
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": SentenceTransformerBackend,
+    "deterministic": DeterministicBackend,
+}
+
+
+def get_embedding_backend(name: str = None, **kwargs):
+    """Construct the backend called name (default: EMBEDDING_BACKEND or openai)"""
+    name = name or os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
+
+
+def build_embeddings(name: str = None, cache_dir: str = None, dtype: str = None, **kwargs):
+    """
+    Backend wrapped in the persistent embedding cache, ready for FAISS.
+    dtype (float32|float16|int8) defaults to EMBEDDING_STORAGE_DTYPE or float32.
+    """
+    from rag.embedding_cache import cached_embeddings
+    backend = get_embedding_backend(name, **kwargs)
+    return cached_embeddings(
+        backend,
+        namespace=backend.name,
+        cache_dir=cache_dir or os.getenv("EMBEDDING_CACHE_DIR"),
+        dtype=dtype or os.getenv("EMBEDDING_STORAGE_DTYPE", "float32"),
+    )
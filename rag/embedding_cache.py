@@ -0,0 +1,242 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def embedding_key(namespace: str, text: str) -> str:
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store on disk.
+
+    Vectors live in one append-only matrix that is memory-mapped for reads;
+    keys.jsonl maps each content key to its row. Rows are written before
+    their key, so a torn write only loses the last entry.
+
+    dtype trades precision for space: float16 halves the file, int8 quarters
+    it using a symmetric per-row scale kept in scales.f32. Reads always
+    return float32.
+    """
+
+    def __init__(self, cache_dir: str, dtype: str = "float32"):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype '{dtype}'")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.cache_dir / "vectors.bin"
+        self.scales_path = self.cache_dir / "scales.f32"
+        self.keys_path = self.cache_dir / "keys.jsonl"
+        self.meta_path = self.cache_dir / "meta.json"
+
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._matrix = None
+        self._scales = None
+        self.dim = None
+        self.dtype = dtype
+
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta["dtype"] != dtype:
+                raise ValueError(f"Cache at {cache_dir} stores {meta['dtype']}, not {dtype}")
+            self.dim = meta["dim"]
+            stored_rows = self._stored_rows()
+            with open(self.keys_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry["row"] < stored_rows:
+                        self._rows[entry["key"]] = entry["row"]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    @property
+    def _row_bytes(self) -> int:
+        return np.dtype(STORAGE_DTYPES[self.dtype]).itemsize * self.dim
+
+    def _stored_rows(self) -> int:
+        if not self.vectors_path.exists():
+            return 0
+        rows = self.vectors_path.stat().st_size // self._row_bytes
+        if self.dtype == "int8":
+            rows = min(rows, self.scales_path.stat().st_size // 4 if self.scales_path.exists() else 0)
+        return rows
+
+    def _view(self) -> np.ndarray:
+        if self._matrix is None:
+            rows = self._stored_rows()
+            self._matrix = np.memmap(self.vectors_path, dtype=STORAGE_DTYPES[self.dtype],
+                                     mode="r", shape=(rows, self.dim))
+            if self.dtype == "int8":
+                self._scales = np.memmap(self.scales_path, dtype=np.float32, mode="r", shape=(rows,))
+        return self._matrix
+
+    def _decode(self, row: int) -> np.ndarray:
+        vector = np.asarray(self._view()[row], dtype=np.float32)
+        if self.dtype == "int8":
+            vector = vector * self._scales[row]
+        return vector
+
+    def _encode(self, block: np.ndarray) -> tuple:
+        if self.dtype != "int8":
+            return block.astype(STORAGE_DTYPES[self.dtype]), None
+        scales = np.abs(block).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(block / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def get_many(self, keys: list) -> dict:
+        """key -> float32 vector for every key that is cached"""
+        with self._lock:
+            return {k: self._decode(self._rows[k]) for k in keys if k in self._rows}
+
+    def put_many(self, items: dict):
+        """Store key -> vector pairs; keys already cached are ignored"""
+        with self._lock:
+            items = {k: v for k, v in items.items() if k not in self._rows}
+            if not items:
+                return
+            block = np.asarray(list(items.values()), dtype=np.float32)
+
+            if self.dim is None:
+                self.dim = block.shape[1]
+                with open(self.meta_path, 'w') as f:
+                    json.dump({"dim": self.dim, "dtype": self.dtype}, f)
+            elif block.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {block.shape[1]} does not match cache ({self.dim})")
+
+            stored, scales = self._encode(block)
+            first_row = self._stored_rows()
+            with open(self.vectors_path, 'ab') as f:
+                f.write(stored.tobytes())
+            if scales is not None:
+                with open(self.scales_path, 'ab') as f:
+                    f.write(scales.tobytes())
+            with open(self.keys_path, 'a') as f:
+                for offset, key in enumerate(items):
+                    f.write(json.dumps({"key": key, "row": first_row + offset}) + "\n")
+                    self._rows[key] = first_row + offset
+
+            # The files grew; remap on next read
+            self._matrix = None
+            self._scales = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings that consult an EmbeddingCache before calling embed_fn.
+
+    Misses are de-duplicated and sent in batches of at most batch_size texts
+    and batch_chars characters, with up to max_concurrency batches in flight.
+    embed_fn takes a list of texts and returns one vector per text, e.g.
+    OpenAIEmbeddings(...).embed_documents or DeterministicEmbedding().
+    """
+
+    def __init__(self,
+                 embed_fn: Callable[[list], list],
+                 cache: EmbeddingCache,
+                 namespace: str,
+                 batch_size: int = 64,
+                 batch_chars: int = 32_000,
+                 max_concurrency: int = 4):
+        self.embed_fn = embed_fn
+        self.cache = cache
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.max_concurrency = max_concurrency
+        self.stats = {"hits": 0, "misses": 0, "batches": 0}
+
+    def _batches(self, texts: list) -> list:
+        batches, current, chars = [], [], 0
+        for text in texts:
+            if current and (len(current) >= self.batch_size or chars + len(text) > self.batch_chars):
+                batches.append(current)
+                current, chars = [], 0
+            current.append(text)
+            chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: list) -> dict:
+        vectors = self.embed_fn(batch)
+        return {embedding_key(self.namespace, text): vec for text, vec in zip(batch, vectors)}
+
+    def embed_documents(self, texts: list) -> list:
+        keys = [embedding_key(self.namespace, t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in found))
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+
+        if missing:
+            batches = self._batches(missing)
+            self.stats["batches"] += len(batches)
+            if len(batches) == 1 or self.max_concurrency <= 1:
+                results = map(self._embed_batch, batches)
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                    results = list(pool.map(self._embed_batch, batches))
+            for embedded in results:
+                self.cache.put_many(embedded)
+                found.update({k: np.asarray(v, dtype=np.float32) for k, v in embedded.items()})
+
+        return [found[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+
+class DeterministicEmbedding:
+    """
+    Offline embedding function: each token maps to a fixed pseudo-random
+    vector and a text is the normalized sum of its tokens. Texts sharing
+    words land near each other, which is enough to exercise retrieval.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+
+    def __call__(self, texts: list) -> list:
+        vectors = []
+        for text in texts:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for token in text.lower().split():
+                vec += self._token_vector(token)
+            norm = np.linalg.norm(vec)
+            vectors.append((vec / norm if norm else vec).tolist())
+        return vectors
+
+
+def cached_embeddings(embed_fn: Callable[[list], list],
+                      namespace: str,
+                      cache_dir: Optional[str] = None,
+                      dtype: str = "float32",
+                      **kwargs) -> CachedEmbeddings:
+    """CachedEmbeddings over the shared on-disk cache (rag/embedding_cache by default)"""
+    cache_dir = Path(cache_dir or "rag/embedding_cache") / namespace.replace("/", "__") / dtype
+    return CachedEmbeddings(embed_fn, EmbeddingCache(str(cache_dir), dtype=dtype), namespace, **kwargs)
@@ -1,66 +1,292 @@
-from pathlib import Path
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+import hashlib
+import json
 import os
+from pathlib import Path
+
+# langchain/FAISS are imported inside methods so importing this module stays cheap
+
+# 2: raw FAISS index + columnar chunk store (no pickled docstore)
+MANIFEST_VERSION = 2
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
 
 class MathKnowledgeBase:
-    def __init__(self, kb_dir: str = "rag/kb_docs"):
+    def __init__(self,
+                 kb_dir: str = "rag/kb_docs",
+                 embeddings=None,
+                 index_dir: str = "rag/faiss_index",
+                 backend: str = None,
+                 index_type: str = None,
+                 index_params: dict = None):
+        from rag.vector_index import resolve_params
+
         self.kb_dir = kb_dir
-        self.vector_store = None
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
-    
-    def load_and_index_docs(self):
-        """Load all docs from kb_dir and create vector store"""
-        docs_text = []
-        
-        # Load all text files
-        for file_path in Path(self.kb_dir).glob("*.txt"):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                docs_text.append(f.read())
-        
-        # Split into chunks
+        self.index_dir = index_dir
+        self.backend = backend
+        # Query-side index: flat (exact) or an ANN type from rag.vector_index
+        self.index_type = index_type or os.getenv("KB_INDEX_TYPE", "flat")
+        self.index_params = resolve_params(self.index_type, index_params)
+        self.index = None
+        self.chunks = None
+        # Pass a shared instance (see agents.registry) to reuse its connection pool
+        self._embeddings = embeddings
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from rag.embedding_backends import build_embeddings
+            # Indexing and queries both go through the cache, so repeats cost no embedding calls
+            self._embeddings = build_embeddings(self.backend)
+        return self._embeddings
+
+    @property
+    def embedding_name(self) -> str:
+        return getattr(self.embeddings, "namespace", type(self.embeddings).__name__)
+
+    @property
+    def manifest_path(self) -> Path:
+        return Path(self.index_dir) / "manifest.json"
+
+    @property
+    def flat_path(self) -> Path:
+        return Path(self.index_dir) / "index.faiss"
+
+    @property
+    def chunks_dir(self) -> Path:
+        return Path(self.index_dir) / "chunks"
+
+    @property
+    def bm25_path(self) -> Path:
+        return Path(self.index_dir) / "bm25.json"
+
+    @property
+    def ann_path(self) -> Path:
+        return Path(self.index_dir) / f"ann_{self.index_type}.faiss"
+
+    def _load_manifest(self) -> dict:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            # Vectors from a different embedding backend are not comparable: start over
+            if manifest.get("version") == MANIFEST_VERSION and manifest.get("embedding") == self.embedding_name:
+                return manifest
+        return {"version": MANIFEST_VERSION, "embedding": self.embedding_name, "files": {}}
+
+    def _split(self, text: str) -> list:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,
             chunk_overlap=100,
             separators=["\n\n", "\n", " ", ""]
         )
-        
-        all_chunks = []
-        for doc in docs_text:
-            chunks = splitter.split_text(doc)
-            all_chunks.extend(chunks)
-        
-        # Create vector store
-        self.vector_store = FAISS.from_texts(
-            all_chunks,
-            embedding=self.embeddings
-        )
-        
-        # Save for later use
-        self.vector_store.save_local("rag/faiss_index")
-        print(f"✅ Indexed {len(all_chunks)} chunks")
-    
+        return splitter.split_text(text)
+
+    def build_index(self) -> dict:
+        """
+        Incrementally sync the index with the .txt files in kb_dir.
+
+        Files whose content hash matches the manifest are skipped without being
+        split. Changed files are re-split and only chunks with a new digest are
+        embedded; vectors of unchanged chunks are copied from the previous flat
+        index, and chunks or files that disappeared are dropped.
+        If an ANN index type is configured it is retrained from the flat vectors
+        whenever they change (or the index parameters do).
+        Returns counts of added, removed and unchanged chunks.
+        """
+        import numpy as np
+        from rag import vector_index
+        from rag.chunk_store import ChunkStore
+
+        manifest = self._load_manifest()
+        old_chunks, old_index = None, None
+        if manifest["files"] and ChunkStore.exists(self.chunks_dir) and self.flat_path.exists():
+            old_chunks = ChunkStore(str(self.chunks_dir))
+            old_index = vector_index.read_index(str(self.flat_path), mmap=False)  # rewritten below
+        if old_index is None or old_index.ntotal != len(old_chunks):
+            # Stale manifest without a matching index: rebuild everything
+            manifest = {"version": MANIFEST_VERSION, "embedding": self.embedding_name, "files": {}}
+            old_chunks, old_index = None, None
+
+        stats = {"added": 0, "removed": 0, "unchanged": 0}
+        new_chunks = {}  # chunk_id -> (text, metadata)
+        removed = 0
+        files = {}
+
+        for file_path in sorted(Path(self.kb_dir).glob("*.txt")):
+            name = file_path.name
+            data = file_path.read_bytes()
+            file_hash = _digest(data)
+            previous = manifest["files"].get(name)
+
+            if previous and previous["sha256"] == file_hash:
+                files[name] = previous
+                stats["unchanged"] += len(previous["chunks"])
+                continue
+
+            chunk_ids = []
+            seen = set()
+            old_ids = set(previous["chunks"]) if previous else set()
+            for chunk in self._split(data.decode("utf-8")):
+                chunk_id = _digest(f"{name}\0{chunk}".encode("utf-8"))
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                chunk_ids.append(chunk_id)
+                if chunk_id in old_ids:
+                    stats["unchanged"] += 1
+                else:
+                    new_chunks[chunk_id] = (chunk, {"source": name})
+
+            removed += len(old_ids - seen)
+            files[name] = {"sha256": file_hash, "chunks": chunk_ids}
+
+        for name, previous in manifest["files"].items():
+            if name not in files:
+                removed += len(previous["chunks"])
+        stats["removed"] = removed
+        stats["added"] = len(new_chunks)
+
+        changed = stats["added"] or stats["removed"] or files != manifest["files"]
+        if changed:
+            ids = [chunk_id for entry in files.values() for chunk_id in entry["chunks"]]
+            kept = [chunk_id for chunk_id in ids if chunk_id not in new_chunks]
+            kept_rows = old_chunks.rows(kept) if kept else []
+            kept_text = {chunk_id: (old_chunks.text(row), old_chunks.metadata(row))
+                         for chunk_id, row in zip(kept, kept_rows)}
+
+            new_ids = list(new_chunks)
+            new_vectors = self.embeddings.embed_documents([new_chunks[c][0] for c in new_ids]) if new_ids else []
+            vectors = {c: v for c, v in zip(new_ids, new_vectors)}
+            if kept:
+                old_vectors = vector_index.flat_vectors(old_index)
+                vectors.update({c: old_vectors[row] for c, row in zip(kept, kept_rows)})
+
+            texts, metadatas = [], []
+            for chunk_id in ids:
+                text, meta = new_chunks.get(chunk_id) or kept_text[chunk_id]
+                texts.append(text)
+                metadatas.append({"source": meta["source"]})
+
+            Path(self.index_dir).mkdir(parents=True, exist_ok=True)
+            matrix = np.asarray([vectors[c] for c in ids], dtype=np.float32)
+            if len(ids):
+                flat = vector_index.build_index(matrix, "flat")
+                vector_index.write_index(flat, str(self.flat_path), "flat", vector_index.resolve_params("flat"))
+            else:
+                self.flat_path.unlink(missing_ok=True)
+            ChunkStore.write(str(self.chunks_dir), ids, texts, metadatas)
+
+            # The lexical index is cheap to rebuild from the chunk texts, so rebuild it whole
+            from rag.retriever import BM25Index
+            BM25Index().build(zip(ids, texts)).save(str(self.bm25_path))
+            if self.index_type != "flat" and len(ids):
+                self._build_ann(matrix)
+
+            # Manifest last: if we crash before this, the next build redoes the work
+            tmp_manifest = self.manifest_path.with_suffix(".tmp")
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "embedding": self.embedding_name, "files": files},
+                          f, indent=2)
+            os.replace(tmp_manifest, self.manifest_path)
+        elif old_chunks is not None:
+            if not self.bm25_path.exists():
+                from rag.retriever import BM25Index
+                BM25Index().build(old_chunks.iter_rows()).save(str(self.bm25_path))
+            built = vector_index.read_metadata(str(self.ann_path))
+            if self.index_type != "flat" and (built.get("params") != self.index_params
+                                              or built.get("ntotal") != old_index.ntotal):
+                self._build_ann(vector_index.flat_vectors(old_index))
+
+        self.load_index()
+        return stats
+
+    def _build_ann(self, vectors):
+        from rag import vector_index
+        index = vector_index.build_index(vectors, self.index_type, self.index_params)
+        vector_index.write_index(index, str(self.ann_path), self.index_type, self.index_params)
+
+    def load_and_index_docs(self):
+        """Load all docs from kb_dir and update the index"""
+        stats = self.build_index()
+        print(f"✅ Indexed {stats['added']} new chunks, removed {stats['removed']}, "
+              f"{stats['unchanged']} unchanged")
+
     def load_index(self):
-        """Load saved vector store"""
-        if os.path.exists("rag/faiss_index"):
-            self.vector_store = FAISS.load_local(
-                "rag/faiss_index",
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
-    
+        """
+        Map the saved index and chunk store. Nothing is unpickled or copied:
+        chunk texts are read from the mapped blob only for returned results.
+        The memory-mapped ANN index is used if one was built for this corpus.
+        """
+        from rag import vector_index
+        from rag.chunk_store import ChunkStore
+
+        self.index, self.chunks = None, None
+        if not ChunkStore.exists(self.chunks_dir) or not self.flat_path.exists():
+            return
+        self.chunks = ChunkStore(str(self.chunks_dir))
+        path = self.flat_path
+        if self.index_type != "flat":
+            # Row ids of the ANN index follow the flat index; a stale one would return the wrong chunks
+            if vector_index.read_metadata(str(self.ann_path)).get("ntotal") == len(self.chunks):
+                path = self.ann_path
+        self.index = vector_index.read_index(str(path), self.index_params)
+
+    def iter_chunks(self):
+        """Yield (chunk_id, text) for every indexed chunk"""
+        if self.chunks is None:
+            self.load_index()
+        if self.chunks is not None:
+            yield from self.chunks.iter_rows()
+
+    def get_chunks(self, chunk_ids: list) -> list:
+        """Documents for the given chunk ids, in order"""
+        if self.chunks is None:
+            self.load_index()
+        rows = self.chunks.rows(chunk_ids)
+        missing = [c for c, row in zip(chunk_ids, rows) if row is None]
+        if missing:
+            raise KeyError(f"Unknown chunk ids: {', '.join(missing)}")
+        return [self.chunks.document(row) for row in rows]
+
+    def load_bm25(self):
+        """The persisted BM25 index, or None if the build step has not written one"""
+        if not self.bm25_path.exists():
+            return None
+        from rag.retriever import BM25Index
+        return BM25Index.load(str(self.bm25_path))
+
     def retrieve(self, query: str, k: int = 3):
         """Retrieve top-k relevant docs"""
-        if self.vector_store is None:
+        import numpy as np
+
+        if self.index is None:
             self.load_index()
-        
-        results = self.vector_store.similarity_search_with_score(query, k=k)
-        return results  # [(doc, score), ...]
 
-# Usage in main app
-kb = MathKnowledgeBase()
-kb.load_and_index_docs()
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        distances, rows = self.index.search(vector, k)
+        # Only the k hits are materialized from the chunk store
+        return [(self.chunks.document(int(row)), float(dist))
+                for dist, row in zip(distances[0], rows[0]) if row != -1]  # [(doc, score), ...]
+
+
+if __name__ == "__main__":
+    # Explicit build step: python -m rag.knowledge_base [--backend openai|local|deterministic]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the knowledge-base index")
+    parser.add_argument("--backend", default=None, help="embedding backend (default: $EMBEDDING_BACKEND or openai)")
+    parser.add_argument("--index-type", default=None, choices=["flat", "ivf", "hnsw", "ivfpq"],
+                        help="query index (default: $KB_INDEX_TYPE or flat)")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default 4*sqrt(chunks))")
+    parser.add_argument("--nprobe", type=int, default=None, help="IVF cells scanned per query")
+    parser.add_argument("--hnsw-m", type=int, default=None, help="HNSW graph degree")
+    parser.add_argument("--ef-search", type=int, default=None, help="HNSW candidates per query")
+    parser.add_argument("--pq-m", type=int, default=None, help="PQ sub-quantizers")
+    args = parser.parse_args()
+    params = {"nlist": args.nlist, "nprobe": args.nprobe, "hnsw_m": args.hnsw_m,
+              "ef_search": args.ef_search, "pq_m": args.pq_m}
+    MathKnowledgeBase(backend=args.backend, index_type=args.index_type,
+                      index_params=params).load_and_index_docs()
@@ -0,0 +1,152 @@
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from utils.tracing import span
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "find", "for", "from", "how", "if",
+    "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "what", "when",
+    "where", "which", "with", "solve", "value", "values",
+}
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of chunk ids, persisted as JSON"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> [[chunk_id, term_frequency], ...]
+        self.doc_lengths = {}
+        self.avg_length = 0.0
+
+    def build(self, chunks):
+        """chunks: iterable of (chunk_id, text)"""
+        self.postings = {}
+        self.doc_lengths = {}
+        for chunk_id, text in chunks:
+            tokens = tokenize(text)
+            self.doc_lengths[chunk_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append([chunk_id, tf])
+        self.avg_length = (sum(self.doc_lengths.values()) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        return self
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10) -> list:
+        """Top-k (chunk_id, score, matched_terms) for query; only touches postings of query terms"""
+        scores = {}
+        matched = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for chunk_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[chunk_id] = matched.get(chunk_id, 0) + 1
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(chunk_id, score, matched[chunk_id]) for chunk_id, score in ranked]
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "avg_length": self.avg_length,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(data["k1"], data["b"])
+        index.avg_length = data["avg_length"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        return index
+
+
+class HybridRetriever:
+    """
+    BM25 + vector retrieval over a MathKnowledgeBase, fused with reciprocal rank.
+
+    Formula lookups ("quadratic formula", "Bayes theorem") are usually settled
+    lexically. When the best BM25 hit matches most query terms and clearly
+    beats the runner-up, the lexical ranking is returned as is and the query
+    is never embedded.
+    """
+
+    def __init__(self,
+                 kb,
+                 bm25: Optional[BM25Index] = None,
+                 rrf_k: int = 60,
+                 candidates: int = 10,
+                 fast_path_margin: float = 1.5,
+                 fast_path_coverage: float = 0.75):
+        self.kb = kb
+        self.bm25 = bm25 if bm25 is not None else kb.load_bm25()
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.fast_path_margin = fast_path_margin
+        self.fast_path_coverage = fast_path_coverage
+        self.stats = {"queries": 0, "lexical_fast_path": 0}
+
+    def _lexically_confident(self, query: str, lexical: list) -> bool:
+        terms = set(tokenize(query))
+        if not lexical or not terms:
+            return False
+        _, top_score, top_matched = lexical[0]
+        if top_matched < self.fast_path_coverage * len(terms):
+            return False
+        return len(lexical) == 1 or top_score >= self.fast_path_margin * lexical[1][1]
+
+    def retrieve(self, query: str, k: int = 3) -> list:
+        """Top-k [(Document, score), ...]; score is BM25 on the fast path, otherwise RRF"""
+        self.stats["queries"] += 1
+        with span("bm25") as s:
+            lexical = self.bm25.search(query, k=self.candidates) if self.bm25 is not None else []
+            s.set("fast_path", self._lexically_confident(query, lexical))
+
+        if s.attributes["fast_path"]:
+            self.stats["lexical_fast_path"] += 1
+            top = lexical[:k]
+            docs = self.kb.get_chunks([chunk_id for chunk_id, _, _ in top])
+            return [(doc, score) for doc, (_, score, _) in zip(docs, top)]
+
+        fused = {}
+        for rank, (chunk_id, _, _) in enumerate(lexical):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        vector_docs = {}
+        with span("vector_search", index_type=self.kb.index_type):
+            hits = self.kb.retrieve(query, k=self.candidates)
+        for rank, (doc, _) in enumerate(hits):
+            chunk_id = doc.metadata.get("chunk_id")
+            vector_docs[chunk_id] = doc
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        top = sorted(fused.items(), key=lambda x: x[1], reverse=True)[:k]
+        lexical_only = [chunk_id for chunk_id, _ in top if chunk_id not in vector_docs]
+        fetched = dict(zip(lexical_only, self.kb.get_chunks(lexical_only)))
+        return [(vector_docs.get(chunk_id) or fetched[chunk_id], score) for chunk_id, score in top]
@@ -0,0 +1,140 @@
+"""
+Approximate-nearest-neighbour indexes for MathKnowledgeBase.
+
+The knowledge base keeps an exact flat FAISS index as the source of truth for
+incremental updates. For large corpora the build step trains one of the index
+types below from those vectors, in the same row order, and writes it next to
+the flat index; queries then go through the ANN index, memory-mapped from disk.
+
+    flat    exact search over every vector
+    ivf     inverted file: k-means cells, nprobe cells scanned per query
+    hnsw    navigable small-world graph, ef_search candidates per query
+    ivfpq   inverted file with product-quantized codes (~pq_m bytes per vector)
+"""
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+DEFAULT_PARAMS = {
+    "nlist": None,     # IVF cells; None = 4 * sqrt(n)
+    "nprobe": 8,       # IVF cells scanned per query
+    "hnsw_m": 32,      # HNSW graph degree
+    "ef_search": 64,   # HNSW candidate list size per query
+    "pq_m": None,      # PQ sub-quantizers (bytes per vector); None = dim / 8
+    "pq_bits": 8,
+}
+
+# Below this many vectors training is unreliable and flat search is fast anyway
+MIN_TRAIN_VECTORS = 1000
+
+
+def resolve_params(index_type: str, params: dict = None) -> dict:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}' (choose from {', '.join(INDEX_TYPES)})")
+    unknown = set(params or {}) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown index parameters: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_PARAMS, **{k: v for k, v in (params or {}).items() if v is not None}}
+
+
+def factory_string(index_type: str, n: int, dim: int, params: dict) -> str:
+    """faiss.index_factory description for index_type over n vectors of dim"""
+    nlist = params["nlist"] or max(1, min(int(4 * math.sqrt(n)), n // 39))
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['hnsw_m']}"
+    if index_type == "ivfpq":
+        pq_m = params["pq_m"] or max(1, dim // 8)
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} does not divide embedding dimension {dim}")
+        return f"IVF{nlist},PQ{pq_m}x{params['pq_bits']}"
+    return "Flat"
+
+
+def build_index(vectors: np.ndarray, index_type: str, params: dict = None):
+    """Train and fill an L2 index of index_type; row i of vectors becomes id i"""
+    import faiss
+
+    params = resolve_params(index_type, params)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    if index_type != "flat" and n < MIN_TRAIN_VECTORS:
+        index_type = "flat"
+
+    index = faiss.index_factory(dim, factory_string(index_type, n, dim, params), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    set_search_params(index, params)
+    return index
+
+
+def set_search_params(index, params: dict):
+    """Apply query-time knobs (nprobe, ef_search) to a built or loaded index"""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = params["nprobe"]
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = params["ef_search"]
+
+
+def flat_vectors(index) -> np.ndarray:
+    """All vectors stored in a flat index, in id order"""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def write_index(index, path: str, index_type: str, params: dict):
+    """
+    Write the index, then a sidecar describing it (sidecar last, so a crash
+    leaves it stale). Each goes to a temp file that is swapped into place: a
+    running app may have the old index memory-mapped, and keeps reading the
+    old file until it reloads instead of seeing it rewritten underneath.
+    """
+    import faiss
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    faiss.write_index(index, str(tmp_path))
+    os.replace(tmp_path, path)
+    sidecar = path.with_suffix(".json")
+    tmp_sidecar = sidecar.with_name(sidecar.name + ".tmp")
+    with open(tmp_sidecar, 'w') as f:
+        json.dump({"type": index_type, "params": params, "ntotal": index.ntotal}, f, indent=2)
+    os.replace(tmp_sidecar, sidecar)
+
+
+def read_metadata(path: str) -> dict:
+    sidecar = Path(path).with_suffix(".json")
+    if not sidecar.exists() or not Path(path).exists():
+        return {}
+    with open(sidecar, 'r') as f:
+        return json.load(f)
+
+
+def read_index(path: str, params: dict = None, mmap: bool = True):
+    """
+    Load an index written by write_index. With mmap the vector / code arrays
+    are mapped read-only instead of copied, so resident memory grows only
+    with the pages queries actually touch. IVF-PQ's precomputed residual
+    table (nlist x pq_m x 256 floats) is skipped too: it would dwarf the codes.
+    """
+    import faiss
+
+    flags = 0
+    if mmap:
+        flags = (getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+                 | faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_SKIP_PRECOMPUTE_TABLE)
+    index = faiss.read_index(str(path), flags)
+    set_search_params(index, resolve_params("flat", {**read_metadata(path).get("params", {}), **(params or {})}))
+    return index
@@ -2,26 +2,29 @@ import os
 from pathlib import Path
 
 class AudioHandler:
-    def __init__(self):
+    def __init__(self, transcriber=None):
         self.api_key = os.getenv("OPENAI_API_KEY")
+        self.transcriber = transcriber
     
-    def transcribe_audio(self, audio_file_path: str):
+    def transcribe_audio(self, audio, on_partial=None):
         """
-        Transcribe audio using OpenAI Whisper API
+        Transcribe audio (a file path or the file's bytes) using OpenAI Whisper API,
+        or the transcriber given at construction. Long recordings are sent in
+        chunks, with the transcript so far passed to on_partial
         Returns: (transcript, confidence_estimate, math_phrases_detected)
         """
-        from openai import OpenAI
+        if self.transcriber is None:
+            from openai import OpenAI
+            from utils.transcription import OpenAIWhisperBackend, Transcriber
+            self.transcriber = Transcriber(OpenAIWhisperBackend(OpenAI(api_key=self.api_key)))
         
-        client = OpenAI(api_key=self.api_key)
+        if isinstance(audio, (str, Path)):
+            filename, audio = Path(audio).name, Path(audio).read_bytes()
+        else:
+            filename = None
         
-        with open(audio_file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="en"
-            )
-        
-        text = transcript.text
+        text = self.transcriber.transcribe(audio, filename=filename, language="en",
+                                           on_partial=on_partial)["text"]
         
         # Detect math-specific phrases
         math_phrases = {
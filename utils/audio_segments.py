@@ -0,0 +1,188 @@
+"""
+Split long recordings on silence into bounded chunks, and stitch the chunk
+transcripts back together.
+
+Cuts go in the longest pause of the second half of each chunk window, so
+chunks rarely split a word. When someone talks for a whole window without
+pausing, the cut goes at the quietest frame near its end and the next chunk
+starts OVERLAP_S earlier; stitch() drops the words transcribed twice.
+Chunks that are entirely silent are skipped: Whisper tends to invent text
+("Thank you.") for silence.
+
+WAV is decoded with the standard library, other formats with pydub and
+ffmpeg (requirements.txt, packages.txt). Where those are missing,
+compressed audio is not split.
+"""
+import io
+import re
+import wave
+from typing import Optional
+
+import numpy as np
+
+FRAME_S = 0.02
+MIN_SILENCE_S = 0.3
+OVERLAP_S = 1.0
+# Silence is below this fraction of the way from the noise floor to speech level (in dB)
+SILENCE_FRACTION = 0.3
+# Less contrast than this between floor and speech: no reliable pauses to cut at
+MIN_CONTRAST_DB = 6.0
+# Recordings whose loud frames stay below this level (dBFS) have no speech at all
+SILENT_DBFS = -50.0
+# Compressed audio above 320 kbps is rare; smaller files cannot be longer than a chunk
+COMPRESSED_BYTES_PER_S = 40_000
+
+
+def _decode_wav(audio: bytes) -> tuple:
+    with wave.open(io.BytesIO(audio), "rb") as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        frames = w.readframes(w.getnframes())
+    frames = frames[:len(frames) - len(frames) % (width * channels)]
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | raw[:, 1] << 8 | raw[:, 2] << 16
+        samples = np.where(ints & 0x800000, ints - (1 << 24), ints).astype(np.float32) / (1 << 23)
+    else:
+        samples = np.frombuffer(frames, dtype={2: "<i2", 4: "<i4"}[width]).astype(np.float32) / (1 << (8 * width - 1))
+    return samples.reshape(-1, channels).mean(axis=1), rate
+
+
+def decode(audio: bytes, extension: str) -> Optional[tuple]:
+    """(mono float32 samples in [-1, 1], sample rate), or None when the format cannot be decoded here"""
+    if extension == "wav":
+        try:
+            return _decode_wav(audio)
+        except (wave.Error, EOFError, KeyError, ValueError):
+            return None
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        return None
+    try:
+        segment = AudioSegment.from_file(io.BytesIO(audio), format=extension)
+    except Exception:
+        return None
+    samples = np.array(segment.get_array_of_samples(), dtype=np.float32).reshape(-1, segment.channels).mean(axis=1)
+    return samples / (1 << (8 * segment.sample_width - 1)), segment.frame_rate
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    """16-bit mono WAV, what Whisper works from anyway"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def frame_levels(samples: np.ndarray, rate: int) -> np.ndarray:
+    """RMS level in dBFS of each FRAME_S frame"""
+    hop = max(1, int(rate * FRAME_S))
+    frames = samples[:len(samples) // hop * hop].reshape(-1, hop)
+    return 20 * np.log10(np.sqrt(np.mean(np.square(frames), axis=1)) + 1e-10)
+
+
+def _pauses(quiet: np.ndarray, min_frames: int) -> list:
+    """(middle frame, length) of each run of quiet frames at least min_frames long"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], quiet.astype(np.int8), [0]))))
+    return [((a + b) // 2, b - a) for a, b in zip(edges[::2], edges[1::2]) if b - a >= min_frames]
+
+
+def split_on_silence(samples: np.ndarray, rate: int, max_chunk_s: float = 30.0,
+                     min_silence_s: float = MIN_SILENCE_S, overlap_s: float = OVERLAP_S) -> list:
+    """
+    [(start, end, overlaps_previous)] sample ranges of at most max_chunk_s
+    each, in order, without the chunks that are silent throughout
+    """
+    levels = frame_levels(samples, rate)
+    if not len(levels):
+        return []
+    hop = max(1, int(rate * FRAME_S))
+    floor, loud = np.percentile(levels, [10, 95])
+    if loud < SILENT_DBFS:
+        return []
+    threshold = floor + SILENCE_FRACTION * (loud - floor)
+    contrast = loud - floor >= MIN_CONTRAST_DB
+    pauses = _pauses(levels < threshold, int(min_silence_s / FRAME_S)) if contrast else []
+    max_frames = max(1, int(max_chunk_s / FRAME_S))
+    overlap = min(int(overlap_s / FRAME_S), max_frames // 4)
+
+    chunks, start, overlapped, total = [], 0, False, len(levels)
+    while total - start > max_frames:
+        window = [(length, middle) for middle, length in pauses if start + max_frames // 2 <= middle <= start + max_frames]
+        if window:
+            cut = max(window)[1]
+            chunks.append((start, cut, overlapped))
+            start, overlapped = cut, False
+        else:
+            tail = start + max_frames - max_frames // 4
+            cut = tail + int(np.argmin(levels[tail:start + max_frames]))
+            chunks.append((start, cut, overlapped))
+            start, overlapped = cut - overlap, True
+    chunks.append((start, total, overlapped))
+
+    audible = [c for c in chunks if not contrast or levels[c[0]:c[1]].max() >= threshold]
+    return [(a * hop, len(samples) if b == total else b * hop, o) for a, b, o in audible]
+
+
+def segment(audio: bytes, extension: str, max_chunk_s: float = 30.0) -> Optional[list]:
+    """
+    [(wav bytes, overlaps_previous)] chunks for a recording longer than
+    max_chunk_s, or None when it should go in one request (short, or a
+    format that cannot be decoded here)
+    """
+    if extension != "wav" and len(audio) < COMPRESSED_BYTES_PER_S * max_chunk_s:
+        return None
+    decoded = decode(audio, extension)
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    if len(samples) <= max_chunk_s * rate:
+        return None
+    return [(encode_wav(samples[a:b], rate), overlapped)
+            for a, b, overlapped in split_on_silence(samples, rate, max_chunk_s)]
+
+
+def _norm(word: str) -> str:
+    # Math read aloud comes back as symbols ("+", "="), which have no word characters
+    return re.sub(r"[^\w]", "", word.lower()) or word
+
+
+def _overlap(previous: list, following: list, max_words: int) -> int:
+    """
+    Length of the longest tail of previous repeated at the head of
+    following. The outermost words may be cut: the first repeated word of
+    following may be the end of a word, the last of previous its start.
+    """
+    for k in range(min(max_words, len(previous), len(following)), 0, -1):
+        pairs = [(_norm(a), _norm(b)) for a, b in zip(previous[-k:], following[:k])]
+        if k == 1:
+            a, b = pairs[0]
+            # One clipped word is only trusted when enough of it is left to tell it apart
+            if a and (a == b or (min(len(a), len(b)) >= 4 and (b.startswith(a) or a.endswith(b)))):
+                return 1
+            continue
+        (first_a, first_b), (last_a, last_b) = pairs[0], pairs[-1]
+        if (all(a == b for a, b in pairs[1:-1])
+                and first_b and first_a.endswith(first_b)
+                and last_a and last_b.startswith(last_a)):
+            return k
+    return 0
+
+
+def stitch(texts: list, overlapped: list, max_words: int = 12) -> str:
+    """Join chunk transcripts in order, dropping the words repeated across overlapping cuts"""
+    words = []
+    for text, overlaps in zip(texts, overlapped):
+        following = (text or "").split()
+        k = _overlap(words, following, max_words) if overlaps and words else 0
+        if k:
+            # Each side may hold a clipped copy of a word at the cut; keep the complete (longer) one
+            words[len(words) - k:] = [max(a, b, key=len) for a, b in zip(words[-k:], following[:k])]
+            following = following[k:]
+        words += following
+    return " ".join(words)
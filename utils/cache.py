@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process LRU in front of a persistent SQLite tier.
+
+    Values must be JSON-serializable. Entries expire after ttl_seconds in both
+    tiers, and each tier is bounded by item count with least-recently-used
+    eviction. Safe to share between Streamlit session threads.
+    """
+
+    def __init__(self,
+                 path: Optional[str],
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_memory_items: int = 1000,
+                 max_disk_items: int = 100_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed_at)")
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _remember(self, key: str, stored_at: float, value: Any):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._disk_count -= 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            exists = self._db.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if not exists:
+                self._disk_count += 1
+            # Evict the least recently used rows once the disk tier is over budget
+            if self._disk_count > self.max_disk_items:
+                self._db.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (self._disk_count - self.max_disk_items,),
+                )
+                self._disk_count = self.max_disk_items
+            self._db.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                if self._db.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount:
+                    self._disk_count -= 1
+                self._db.commit()
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
@@ -0,0 +1,201 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Callable, Optional, Union
+
+
+class FakeGroqClient:
+    """
+    Offline stand-in for the Groq/OpenAI client's chat.completions API.
+
+    `responses` is either a fixed string or a function of the prompt text.
+    Streaming splits the answer into chunks of `chunk_chars`, sleeping
+    `first_token_delay` before the first chunk and `chunk_delay` between the rest.
+    """
+
+    def __init__(self,
+                 responses: Union[str, Callable[[str], str]] = "Final answer: 42",
+                 first_token_delay: float = 0.0,
+                 chunk_delay: float = 0.0,
+                 chunk_chars: int = 8):
+        self.responses = responses
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _answer(self, messages: list) -> str:
+        if callable(self.responses):
+            return self.responses(messages[-1]["content"])
+        return self.responses
+
+    def _create(self, model: str, messages: list, stream: bool = False, **params):
+        self.calls += 1
+        text = self._answer(messages)
+        usage = SimpleNamespace(prompt_tokens=_tokens(messages[-1]["content"]), completion_tokens=_tokens(text))
+        if stream:
+            return self._stream(text, usage)
+
+        time.sleep(self.first_token_delay + self.chunk_delay * (len(text) // self.chunk_chars))
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    def _stream(self, text: str, usage: SimpleNamespace):
+        time.sleep(self.first_token_delay)
+        for start in range(0, len(text), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_delay)
+            delta = SimpleNamespace(content=text[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+        # Groq reports usage on the last chunk under x_groq
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+                              x_groq=SimpleNamespace(usage=usage))
+
+
+class FakeLLMServer:
+    """
+    Local HTTP server speaking the OpenAI / Groq chat-completions API, for
+    exercising real clients (connection pools, retries, rate limits) offline.
+
+        with FakeLLMServer(latency=0.05, rate_limit_rps=20) as server:
+            client = Groq(api_key="fake", base_url=server.url)
+
+    Any POST path ending in /chat/completions is answered; "stream": true gets
+    server-sent events. With rate_limit_rps, requests beyond a token bucket of
+    that rate (burst = one second's worth) get 429 with a retry-after header.
+    """
+
+    def __init__(self,
+                 responses: Union[str, Callable[[str], str]] = "Final answer: 42",
+                 latency: float = 0.0,
+                 rate_limit_rps: Optional[float] = None,
+                 port: int = 0):
+        self.responses = responses
+        self.latency = latency
+        self.rate_limit_rps = rate_limit_rps
+        self.stats = {"requests": 0, "completions": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+        self._tokens = rate_limit_rps or 0.0
+        self._refilled = time.monotonic()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self) -> Optional[float]:
+        """None if the request may proceed, else seconds until a token frees up"""
+        with self._lock:
+            self.stats["requests"] += 1
+            if not self.rate_limit_rps:
+                return None
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit_rps, self._tokens + (now - self._refilled) * self.rate_limit_rps)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            self.stats["rate_limited"] += 1
+            return (1 - self._tokens) / self.rate_limit_rps
+
+    def _answer(self, messages: list) -> str:
+        if callable(self.responses):
+            return self.responses(messages[-1]["content"])
+        return self.responses
+
+    def _delay(self, model: str, messages: list, text: str) -> float:
+        """Seconds to wait before answering; subclasses may vary it per request"""
+        return self.latency
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, body: dict, headers: dict = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    return self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                wait = server._admit()
+                if wait is not None:
+                    return self._json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                                      {"retry-after": f"{wait:.3f}", "retry-after-ms": str(int(wait * 1000))})
+
+                text = server._answer(body.get("messages", []))
+                model = body.get("model", "fake")
+                time.sleep(server._delay(model, body.get("messages", []), text))
+                with server._lock:
+                    server.stats["completions"] += 1
+                prompt = body.get("messages", [{}])[-1].get("content")
+                if body.get("stream"):
+                    return self._stream(model, prompt, text)
+
+                self._json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": _tokens(prompt), "completion_tokens": _tokens(text),
+                              "total_tokens": _tokens(prompt) + _tokens(text)},
+                })
+
+            def _stream(self, model: str, prompt: str, text: str):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.end_headers()
+                pieces = [text[i:i + 8] for i in range(0, len(text), 8)] + [None]
+                for piece in pieces:
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece} if piece else {},
+                                     "finish_reason": None if piece else "stop"}],
+                    }
+                    if piece is None:
+                        chunk["x_groq"] = {"usage": {"prompt_tokens": _tokens(prompt),
+                                                     "completion_tokens": _tokens(text)}}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+
+def _tokens(text: Optional[str]) -> int:
+    # Rough whitespace token count; good enough for usage accounting in tests
+    return len((text or "").split())
@@ -0,0 +1,337 @@
+"""
+Record/replay stand-ins for the Groq and OpenAI clients, for benchmarks that
+must run with no network.
+
+Record once against the real API:
+
+    client = RecordingClient(Groq(api_key=...), "benchmarks/fixtures/replay.jsonl")
+    client.chat.completions.create(...)          # answered by Groq, appended to the file
+
+then replay anywhere:
+
+    client = ReplayClient("benchmarks/fixtures/replay.jsonl", timing="sampled")
+    server = ReplayServer(client.fixtures, timing="sampled").start()   # for clients that only speak HTTP
+
+A request is matched to its recording by a hash of the prompt; prompts never
+recorded (an edited template, a new problem) get the most similar recorded
+prompt of the same kind and are counted in stats["nearest"]. Each replayed
+request sleeps for either the latency recorded with it ("recorded") or a
+draw from a lognormal latency model for its model ("sampled"), fitted to
+the fixture's recordings when there are enough of them.
+"""
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+from utils.fake_llm import FakeLLMServer
+
+
+class LatencyModel:
+    """
+    Lognormal time to first token plus lognormal output speed; transcriptions
+    take a lognormal overhead plus audio length / real-time factor.
+    """
+
+    def __init__(self, ttft_median: float, ttft_sigma: float = 0.4, tokens_per_s: float = 100.0,
+                 speed_sigma: float = 0.2, realtime_factor: Optional[float] = None):
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_s = tokens_per_s
+        self.speed_sigma = speed_sigma
+        self.realtime_factor = realtime_factor
+
+    def sample(self, rng: random.Random, completion_tokens: int = 0, audio_s: float = 0.0) -> tuple:
+        """(ttft_s, total_s)"""
+        ttft = rng.lognormvariate(math.log(self.ttft_median), self.ttft_sigma)
+        speed = rng.lognormvariate(math.log(self.tokens_per_s), self.speed_sigma)
+        total = ttft + completion_tokens / speed
+        if self.realtime_factor:
+            total += audio_s / self.realtime_factor
+        return ttft, total
+
+    @classmethod
+    def fit(cls, records: list) -> Optional["LatencyModel"]:
+        """Fitted to recorded timings; None with fewer than 5 usable recordings"""
+        ttfts = [r["ttft_s"] for r in records if r.get("ttft_s")]
+        speeds = [r["usage"]["completion_tokens"] / (r["total_s"] - r["ttft_s"]) for r in records
+                  if r.get("ttft_s") and r.get("total_s", 0) > r["ttft_s"] and (r.get("usage") or {}).get("completion_tokens")]
+        if len(ttfts) < 5 or len(speeds) < 5:
+            return None
+        log_ttft = [math.log(t) for t in ttfts]
+        log_speed = [math.log(s) for s in speeds]
+        return cls(math.exp(_mean(log_ttft)), _std(log_ttft), math.exp(_mean(log_speed)), _std(log_speed))
+
+
+def _mean(values: list) -> float:
+    return sum(values) / len(values)
+
+
+def _std(values: list) -> float:
+    mean = _mean(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / max(1, len(values) - 1))
+
+
+# Typical public figures for the models this app calls; override per fixture by recording enough requests
+PRESETS = {
+    "llama-3.3-70b-versatile": LatencyModel(ttft_median=0.25, ttft_sigma=0.45, tokens_per_s=275),
+    "gpt-4-turbo": LatencyModel(ttft_median=0.7, ttft_sigma=0.5, tokens_per_s=30),
+    "whisper-large-v3-turbo": LatencyModel(ttft_median=0.15, ttft_sigma=0.3, realtime_factor=200),
+    "whisper-1": LatencyModel(ttft_median=0.4, ttft_sigma=0.3, realtime_factor=30),
+}
+DEFAULT_PRESET = LatencyModel(ttft_median=0.5, ttft_sigma=0.5, tokens_per_s=60)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def prompt_text(messages: list) -> str:
+    return "\n".join(f"{m.get('role', 'user')}: {m.get('content') or ''}" for m in messages)
+
+
+def request_key(kind: str, payload: str) -> str:
+    return hashlib.sha256(f"{kind}\0{payload}".encode("utf-8")).hexdigest()
+
+
+def audio_key(audio: bytes) -> str:
+    return request_key("transcription", hashlib.sha256(audio).hexdigest())
+
+
+def _tokens(text: str) -> int:
+    # Whitespace count, matching utils.fake_llm when a recording has no usage
+    return len((text or "").split())
+
+
+class FixtureStore:
+    """Recorded requests in a JSON lines file, one record per request"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.records = {}
+        self._by_kind = {}
+        self._words = {}
+        self._nearest = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def _index(self, record: dict):
+        self.records[record["key"]] = record
+        self._by_kind.setdefault(record["kind"], []).append(record)
+        if record.get("prompt"):
+            self._words[record["key"]] = set(_WORD.findall(record["prompt"].lower()))
+
+    def append(self, record: dict):
+        with self._lock:
+            self._index(record)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def records_for_model(self, model: str) -> list:
+        return [r for r in self.records.values() if r.get("model") == model]
+
+    def lookup(self, kind: str, key: str, prompt: Optional[str] = None) -> tuple:
+        """(record, exact); the closest prompt of that kind (Jaccard over words) when not recorded"""
+        record = self.records.get(key)
+        if record is not None:
+            return record, True
+        with self._lock:
+            if key in self._nearest:
+                return self._nearest[key], False
+        candidates = self._by_kind.get(kind)
+        if not candidates:
+            raise KeyError(f"No recorded {kind} requests in {self.path}")
+        if prompt is None:
+            # Nothing to compare (audio): spread misses over the recordings deterministically
+            record = candidates[int(key[:8], 16) % len(candidates)]
+        else:
+            words = set(_WORD.findall(prompt.lower()))
+            record = max(candidates, key=lambda r: len(words & self._words.get(r["key"], set())) /
+                         (len(words | self._words.get(r["key"], set())) or 1))
+        with self._lock:
+            self._nearest[key] = record
+        return record, False
+
+
+class _Timing:
+    def __init__(self, fixtures: FixtureStore, timing: str, speed: float, seed: int):
+        if timing not in ("recorded", "sampled", "none"):
+            raise ValueError(f"timing must be recorded, sampled or none, not {timing!r}")
+        self.fixtures = fixtures
+        self.timing = timing
+        self.speed = speed
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._models = {}
+
+    def model_for(self, model: str) -> LatencyModel:
+        if model not in self._models:
+            self._models[model] = LatencyModel.fit(self.fixtures.records_for_model(model)) or \
+                PRESETS.get(model, DEFAULT_PRESET)
+        return self._models[model]
+
+    def delays(self, record: dict, model: Optional[str] = None) -> tuple:
+        """(ttft_s, total_s) to replay for record, already divided by speed"""
+        if self.timing == "none":
+            return 0.0, 0.0
+        if self.timing == "recorded" and record.get("total_s") is not None:
+            ttft, total = record.get("ttft_s") or record["total_s"], record["total_s"]
+        else:
+            tokens = (record.get("usage") or {}).get("completion_tokens") or _tokens(record["response"])
+            with self._rng_lock:
+                ttft, total = self.model_for(model or record.get("model")).sample(
+                    self._rng, tokens, record.get("audio_s") or 0.0)
+        return ttft / self.speed, total / self.speed
+
+
+class ReplayClient:
+    """
+    In-process replacement for Groq() / OpenAI() serving recorded responses:
+    chat.completions.create (plain and streamed) and audio.transcriptions.create.
+    speed > 1 replays proportionally faster.
+    """
+
+    def __init__(self, fixtures, timing: str = "sampled", speed: float = 1.0, seed: int = 0, chunk_chars: int = 16):
+        self.fixtures = fixtures if isinstance(fixtures, FixtureStore) else FixtureStore(fixtures)
+        self.timing = _Timing(self.fixtures, timing, speed, seed)
+        self.chunk_chars = chunk_chars
+        self.stats = {"chat": 0, "transcription": 0, "exact": 0, "nearest": 0}
+        self._stats_lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+
+    def _count(self, kind: str, exact: bool):
+        with self._stats_lock:
+            self.stats[kind] += 1
+            self.stats["exact" if exact else "nearest"] += 1
+
+    def _chat(self, model: str, messages: list, stream: bool = False, **params):
+        prompt = prompt_text(messages)
+        record, exact = self.fixtures.lookup("chat", request_key("chat", prompt), prompt)
+        self._count("chat", exact)
+        ttft, total = self.timing.delays(record, model)
+        text = record["response"]
+        usage = SimpleNamespace(**(record.get("usage") or {"prompt_tokens": _tokens(prompt),
+                                                          "completion_tokens": _tokens(text)}))
+        if stream:
+            return self._stream(text, usage, ttft, total)
+        time.sleep(total)
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(message=message, finish_reason="stop")],
+                               usage=usage)
+
+    def _stream(self, text: str, usage, ttft: float, total: float):
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        gap = max(0.0, total - ttft) / max(1, len(pieces) - 1)
+        time.sleep(ttft)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(gap)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+                              x_groq=SimpleNamespace(usage=usage))
+
+    def _transcribe(self, file, model: str, **params):
+        audio = _read_audio(file)
+        record, exact = self.fixtures.lookup("transcription", audio_key(audio))
+        self._count("transcription", exact)
+        time.sleep(self.timing.delays(record, model)[1])
+        return SimpleNamespace(text=record["response"])
+
+
+def _read_audio(file) -> bytes:
+    if isinstance(file, tuple):  # (filename, bytes-or-file[, content type]) as the SDKs accept
+        file = file[1]
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, Path)):
+        return Path(file).read_bytes()
+    return file.read()
+
+
+class ReplayServer(FakeLLMServer):
+    """FakeLLMServer answering from recordings, for clients that only talk HTTP (langchain's ChatOpenAI)"""
+
+    def __init__(self, fixtures, timing: str = "sampled", speed: float = 1.0, seed: int = 0, port: int = 0):
+        super().__init__(port=port)
+        self.fixtures = fixtures if isinstance(fixtures, FixtureStore) else FixtureStore(fixtures)
+        self.timing = _Timing(self.fixtures, timing, speed, seed)
+        self.stats.update({"exact": 0, "nearest": 0})
+
+    def _record(self, messages: list) -> tuple:
+        prompt = prompt_text(messages)
+        return self.fixtures.lookup("chat", request_key("chat", prompt), prompt)
+
+    def _answer(self, messages: list) -> str:
+        record, exact = self._record(messages)
+        with self._lock:
+            self.stats["exact" if exact else "nearest"] += 1
+        return record["response"]
+
+    def _delay(self, model: str, messages: list, text: str) -> float:
+        return self.timing.delays(self._record(messages)[0], model)[1]
+
+
+class RecordingClient:
+    """Pass requests through to a real client and append each request/response/timing to a FixtureStore"""
+
+    def __init__(self, client, fixtures):
+        self.client = client
+        self.fixtures = fixtures if isinstance(fixtures, FixtureStore) else FixtureStore(fixtures)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+
+    def _chat(self, model: str, messages: list, stream: bool = False, **params):
+        prompt = prompt_text(messages)
+        record = {"kind": "chat", "key": request_key("chat", prompt), "model": model, "prompt": prompt}
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(model=model, messages=messages, stream=stream, **params)
+        if stream:
+            return self._record_stream(response, record, start)
+        usage = getattr(response, "usage", None)
+        record.update(response=response.choices[0].message.content, ttft_s=None,
+                      total_s=round(time.perf_counter() - start, 4), usage=_usage_dict(usage))
+        self.fixtures.append(record)
+        return response
+
+    def _record_stream(self, stream, record: dict, start: float):
+        parts, ttft, usage = [], None, None
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        record.update(response="".join(parts), ttft_s=round(ttft, 4) if ttft else None,
+                      total_s=round(time.perf_counter() - start, 4), usage=_usage_dict(usage))
+        self.fixtures.append(record)
+
+    def _transcribe(self, file, model: str, audio_s: Optional[float] = None, **params):
+        audio = _read_audio(file)
+        start = time.perf_counter()
+        result = self.client.audio.transcriptions.create(file=("audio", io.BytesIO(audio)), model=model, **params)
+        self.fixtures.append({
+            "kind": "transcription", "key": audio_key(audio), "model": model, "audio_s": audio_s,
+            "response": getattr(result, "text", result), "ttft_s": None,
+            "total_s": round(time.perf_counter() - start, 4),
+        })
+        return result
+
+
+def _usage_dict(usage) -> Optional[dict]:
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return {k: usage.get(k) for k in ("prompt_tokens", "completion_tokens")}
+    return {k: getattr(usage, k, None) for k in ("prompt_tokens", "completion_tokens")}
@@ -0,0 +1,180 @@
+"""
+OCR results cached by image content, so Streamlit reruns, re-uploads and
+re-encoded copies of the same page do not run Tesseract again.
+
+The SHA-256 of the file bytes catches exact re-uploads without decoding.
+Near-identical images (a lossless re-save, a format conversion, a light
+re-compression) are found through a 64-bit DCT perceptual hash and then
+confirmed pixel by pixel: pages that differ in one digit share a hash and
+correlate almost perfectly, and returning another problem's text is far
+worse than running OCR again. So the ink of both images is binarized at
+full resolution (up to INK_WIDTH) and any 16x16 block where more than a
+couple of pixels differ rejects the match. Results live in a TieredCache
+(bounded LRU in memory, spilled to SQLite); the perceptual index is a
+bounded in-memory LRU.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+from PIL import Image
+
+from utils.cache import TieredCache
+from utils.ocr_handler import PIPELINE_VERSION
+from utils.single_flight import SingleFlight
+
+HASH_SIZE = 32  # DCT input; the hash is the 8x8 lowest frequencies minus DC
+# Candidates: hashes within this many bits and the same aspect ratio. A changed digit
+# moves the hash by 0-2 bits, so the hash only narrows the search; the ink diff decides
+MAX_DISTANCE = 2
+MAX_ASPECT_DIFF = 0.02
+# Ink masks are compared at up to this width; a digit is still 15+ pixels tall here
+INK_WIDTH = 1280
+INK_BLOCK = 16
+# Accepted: no block differs in more ink pixels than this. A changed digit differs in 20+,
+# a removed decimal point in 4, a quality-95 JPEG re-save in 2-3
+MAX_INK_DIFF = 2
+
+_DCT = np.cos(np.pi * (2 * np.arange(HASH_SIZE)[None, :] + 1) * np.arange(HASH_SIZE)[:, None] / (2 * HASH_SIZE))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint(image: Image.Image) -> tuple:
+    """(perceptual hash, aspect ratio) of a freshly opened image"""
+    aspect = image.width / max(1, image.height)
+    # JPEG decodes straight at a fraction of full size; must run before the image is loaded
+    image.draft("L", (4 * HASH_SIZE, 4 * HASH_SIZE))
+    small = np.asarray(image.convert("L").resize((HASH_SIZE, HASH_SIZE), Image.BOX), dtype=np.float64)
+    low = (_DCT @ small @ _DCT.T)[:8, :8].ravel()[1:]
+    phash = int("".join("1" if b else "0" for b in low > np.median(low)), 2)
+    return phash, aspect
+
+
+def ink_mask(image: Image.Image, shape: Optional[tuple] = None) -> np.ndarray:
+    """Pixels darker than halfway between paper and ink, at shape (rows, cols) or up to INK_WIDTH wide"""
+    gray = image.convert("L")
+    if shape is None:
+        width = min(INK_WIDTH, gray.width)
+        shape = (max(1, round(gray.height * width / gray.width)), width)
+    pixels = np.asarray(gray.resize((shape[1], shape[0]), Image.BOX))
+    paper, ink = np.percentile(pixels, [90, 0.1])
+    return pixels < (float(paper) + float(ink)) / 2
+
+
+def ink_diff(a: np.ndarray, b: np.ndarray) -> int:
+    """Most differing ink pixels in any INK_BLOCK x INK_BLOCK block of two same-shape masks"""
+    diff = np.pad(a ^ b, [(0, -n % INK_BLOCK) for n in a.shape])
+    rows, cols = diff.shape[0] // INK_BLOCK, diff.shape[1] // INK_BLOCK
+    return int(diff.reshape(rows, INK_BLOCK, cols, INK_BLOCK).sum(axis=(1, 3)).max())
+
+
+class PerceptualIndex:
+    """
+    Bounded LRU of (hash, aspect, packed ink mask) -> content keys. Lookup
+    scans the hashes (microseconds at this size) and decodes the query at
+    full resolution only when a candidate is found.
+    """
+
+    def __init__(self, max_items: int = 64, max_distance: int = MAX_DISTANCE, max_ink_diff: int = MAX_INK_DIFF):
+        self.max_items = max_items
+        self.max_distance = max_distance
+        self.max_ink_diff = max_ink_diff
+        self._entries = OrderedDict()  # content key -> (hash, aspect, shape, packed mask)
+        self._lock = threading.Lock()
+
+    def add(self, key: str, phash: int, aspect: float, mask: np.ndarray):
+        with self._lock:
+            self._entries[key] = (phash, aspect, mask.shape, np.packbits(mask))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def nearest(self, phash: int, aspect: float, open_image: Callable[[], Image.Image]) -> Optional[str]:
+        """Content key of an image with the same ink as open_image(), or None"""
+        with self._lock:
+            candidates = [(key, shape, packed) for key, (other_hash, other_aspect, shape, packed) in self._entries.items()
+                          if (other_hash ^ phash).bit_count() <= self.max_distance
+                          and abs(other_aspect - aspect) <= MAX_ASPECT_DIFF * aspect]
+        best, best_diff = None, self.max_ink_diff
+        masks = {}
+        for key, shape, packed in candidates:
+            if shape not in masks:
+                masks[shape] = ink_mask(open_image(), shape)
+            other = np.unpackbits(packed, count=shape[0] * shape[1]).reshape(shape).astype(bool)
+            diff = ink_diff(masks[shape], other)
+            if diff <= best_diff:
+                best, best_diff = key, diff
+        if best is not None:
+            with self._lock:
+                if best in self._entries:
+                    self._entries.move_to_end(best)
+        return best
+
+
+class OCRCache:
+    """
+    Process-wide OCR result cache shared by every session. Concurrent
+    requests for the same bytes run OCR once.
+    """
+
+    def __init__(self,
+                 path: Optional[str],
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600,
+                 max_memory_items: int = 256,
+                 max_disk_items: int = 10_000):
+        self.results = TieredCache(path, ttl_seconds=ttl_seconds, max_memory_items=max_memory_items,
+                                   max_disk_items=max_disk_items)
+        # Packed ink masks are up to ~250 KB each, so near matches are looked for among recent images only
+        self.index = PerceptualIndex(max_items=min(max_memory_items, 64))
+        self.stats = {"exact_hits": 0, "perceptual_hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    @staticmethod
+    def _key(kind: str, value) -> str:
+        # Cached text from an older preprocessing / recognition pipeline is never reused
+        return f"ocr:v{PIPELINE_VERSION}:{kind}:{value}"
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def hit_rate(self) -> float:
+        hits = self.stats["exact_hits"] + self.stats["perceptual_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def get_or_extract(self, data: bytes, extract: Callable[[Image.Image], dict]) -> dict:
+        """
+        OCR result for the image file bytes, from cache when the same or a
+        near-identical image was seen; otherwise extract(image) and store it.
+        The returned dict gains "cache": "exact", "perceptual" or "miss".
+        """
+        key = self._key("sha256", content_hash(data))
+        result = self.results.get(key)
+        if result is not None:
+            self._count("exact_hits")
+            return {**result, "cache": "exact"}
+        result, _ = self._flights.do(key, lambda emit: self._lookup_or_extract(key, data, extract))
+        return result
+
+    def _lookup_or_extract(self, key: str, data: bytes, extract: Callable) -> dict:
+        phash, aspect = fingerprint(Image.open(io.BytesIO(data)))
+        near = self.index.nearest(phash, aspect, lambda: Image.open(io.BytesIO(data)))
+        result = self.results.get(near) if near else None
+        if result is not None:
+            self._count("perceptual_hits")
+            self.results.set(key, result)
+            return {**result, "cache": "perceptual"}
+
+        self._count("misses")
+        result = extract(Image.open(io.BytesIO(data)))
+        self.results.set(key, result)
+        self.index.add(key, phash, aspect, ink_mask(Image.open(io.BytesIO(data))))
+        return {**result, "cache": "miss"}
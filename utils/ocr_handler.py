@@ -1,44 +1,301 @@
+"""
+Tesseract OCR for problem photos and multi-page worksheet scans.
+
+Each page is preprocessed (grayscale, rescale to the target DPI, dark
+background inverted, uneven lighting flattened, deskew, binarization) and
+cut into regions at wide blank bands, so a worksheet becomes one region
+per problem. Every region gets a single Tesseract pass:
+image_to_data returns the words and their confidences together, and the
+text is rebuilt from the words. Pages and regions run in a process pool.
+"""
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
 import pytesseract
-from PIL import Image
-import json
+from PIL import Image, ImageSequence
+
+# Bump when preprocessing or recognition changes, so cached OCR text is not reused
+PIPELINE_VERSION = 3
+TARGET_DPI = 300
+# Without DPI metadata (phone photos), assume the long side spans a letter page
+PAGE_LONG_SIDE_IN = 11.0
+MAX_SKEW_DEG = 5.0
+# Low-resolution pages (screenshots) are upsampled at most this much; region sizes follow the DPI reached
+MAX_UPSCALE = 4.0
+# Blank bands at least this tall separate regions; line spacing is well below it
+REGION_GAP_IN = 0.2
+MIN_REGION_IN = 0.05
+REGION_MARGIN_PX = 10
+# Background is estimated per block of this size; larger than a glyph so most blocks hold paper
+BACKGROUND_BLOCK_IN = 0.25
+# Lighting that varies less than this across the page is left alone
+MAX_BACKGROUND_SPREAD = 24
+# Text is a small part of a page; more ink than this means the threshold went wrong
+MAX_INK_FRACTION = 0.3
+
+
+def ink_threshold(gray: np.ndarray) -> int:
+    """
+    Grey level separating ink from paper: halfway from the paper (median)
+    to the darkest ink, and at least 4 noise deviations below the paper.
+    Unlike Otsu it holds up when ink is a fraction of a percent of the page
+    or the paper is clipped at white.
+    """
+    # Percentiles of a ~1M pixel sample are as good as of the whole page
+    step = max(1, int(math.sqrt(gray.size / 1_000_000)))
+    gray = gray[::step, ::step]
+    paper = float(np.median(gray))
+    noise = max(1.0, 1.4826 * float(np.median(np.abs(gray.astype(np.int16) - paper))))
+    darkest = float(np.percentile(gray, 0.05))
+    return int(min((paper + darkest) / 2, paper - 4 * noise))
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Grey level maximizing the between-class variance of the histogram"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * levels)
+    total_weight, total_mean = weight[-1], mean[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_mean * weight - mean * total_weight) ** 2 / (weight * (total_weight - weight))
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def binarization_threshold(gray: np.ndarray) -> int:
+    """ink_threshold, or Otsu when it would turn an implausible share of the page into ink"""
+    threshold = ink_threshold(gray)
+    step = max(1, int(math.sqrt(gray.size / 1_000_000)))
+    if float(np.mean(gray[::step, ::step] <= threshold)) > MAX_INK_FRACTION:
+        return otsu_threshold(gray)
+    return threshold
+
+
+def normalize_polarity(gray: np.ndarray) -> np.ndarray:
+    """
+    The page as dark ink on light paper. Ink is the minority, so its tail
+    lies farther from the median: light text on a dark background (dark
+    mode screenshots, blackboards, negatives) is inverted.
+    """
+    step = max(1, int(math.sqrt(gray.size / 1_000_000)))
+    sample = gray[::step, ::step]
+    darkest, paper, lightest = np.percentile(sample, [0.05, 50, 99.95])
+    if lightest - paper > 2 * (paper - darkest):
+        return 255 - gray
+    return gray
+
+
+def flatten_background(gray: np.ndarray, dpi: float) -> np.ndarray:
+    """
+    Divide out uneven lighting (shadows, vignetting in phone photos) so one
+    threshold fits the whole page: the paper level is the 90th percentile
+    of each block, the lightest of its neighbours where a block is mostly
+    ink, interpolated back to full size.
+    """
+    # Every 4th pixel is plenty for a level that changes over inches
+    sample = gray[::4, ::4]
+    block = max(4, int(BACKGROUND_BLOCK_IN * dpi) // 4)
+    rows, cols = -(-sample.shape[0] // block), -(-sample.shape[1] // block)
+    padded = np.pad(sample, ((0, rows * block - sample.shape[0]), (0, cols * block - sample.shape[1])), mode="edge")
+    blocks = padded.reshape(rows, block, cols, block).transpose(0, 2, 1, 3).reshape(rows, cols, -1)
+    paper = np.percentile(blocks, 90, axis=2)
+    if np.percentile(paper, 95) - np.percentile(paper, 5) < MAX_BACKGROUND_SPREAD:
+        return gray
+    around = np.pad(paper, 1, mode="edge")
+    paper = np.max([around[i:i + rows, j:j + cols] for i in range(3) for j in range(3)], axis=0)
+    background = np.asarray(Image.fromarray(paper.astype(np.float32), mode="F")
+                            .resize((gray.shape[1], gray.shape[0]), Image.BILINEAR))
+    return np.clip(gray * (255.0 / np.maximum(background, 1.0)), 0, 255).astype(np.uint8)
+
+
+def estimate_skew(ink: np.ndarray, max_angle: float = MAX_SKEW_DEG) -> float:
+    """
+    Counter-clockwise skew of the text lines in degrees: the angle whose
+    projection profile of the ink pixels is sharpest, coarse then fine.
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > 50_000:
+        keep = np.linspace(0, len(ys) - 1, 50_000).astype(np.int64)
+        ys, xs = ys[keep], xs[keep]
+    ys, xs = ys.astype(np.float64), xs.astype(np.float64)
+
+    def sharpness(angle: float) -> float:
+        a = math.radians(angle)
+        offsets = ys * math.cos(a) + xs * math.sin(a)
+        profile = np.bincount((offsets - offsets.min()).astype(np.int64))
+        return float(np.dot(profile, profile))
+
+    best = max(np.arange(-max_angle, max_angle + 1e-9, 0.5), key=sharpness)
+    return float(max(np.arange(best - 0.5, best + 0.5 + 1e-9, 0.1), key=sharpness))
+
+
+def preprocess(gray: np.ndarray, dpi: Optional[float] = None, target_dpi: int = TARGET_DPI) -> tuple:
+    """Grayscale page -> (rescaled, deskewed, binarized page (0 ink, 255 paper), its DPI)"""
+    image = Image.fromarray(gray)
+    if not dpi:
+        dpi = max(image.size) / PAGE_LONG_SIDE_IN
+    if dpi > target_dpi * 1.05 or dpi < target_dpi / 1.05:
+        scale = min(target_dpi / dpi, MAX_UPSCALE)
+        # BOX averages when shrinking; small text needs smooth edges when enlarged
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.BOX if scale < 1 else Image.BICUBIC)
+        gray = np.asarray(image)
+        dpi *= scale
+
+    gray = flatten_background(normalize_polarity(gray), dpi)
+    image = Image.fromarray(gray)
+    threshold = binarization_threshold(gray)
+    # Estimate on a ~1000 px wide copy; the angle does not depend on resolution
+    step = max(1, gray.shape[1] // 1000)
+    angle = estimate_skew(gray[::step, ::step] <= threshold)
+    if abs(angle) >= 0.1:
+        image = image.rotate(-angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+        gray = np.asarray(image)
+    return np.where(gray > threshold, 255, 0).astype(np.uint8), dpi
+
+
+def _runs(mask: np.ndarray) -> list:
+    """[start, end) of each run of True"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def split_regions(binary: np.ndarray, dpi: float = TARGET_DPI) -> list:
+    """Cut a binarized page at dpi into regions separated by tall blank bands, each cropped to its ink"""
+    ink = binary == 0
+    # A few stray pixels (scan noise) do not make a row text
+    rows = ink.sum(axis=1) > max(2, binary.shape[1] // 500)
+    gap = int(REGION_GAP_IN * dpi)
+    bands = []
+    for start, end in _runs(rows):
+        if bands and start - bands[-1][1] < gap:
+            bands[-1][1] = end
+        else:
+            bands.append([start, end])
+
+    regions = []
+    for top, bottom in bands:
+        if bottom - top < MIN_REGION_IN * dpi:
+            continue
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        top, bottom = max(0, top - REGION_MARGIN_PX), min(binary.shape[0], bottom + REGION_MARGIN_PX)
+        left = max(0, columns[0] - REGION_MARGIN_PX)
+        right = min(binary.shape[1], columns[-1] + 1 + REGION_MARGIN_PX)
+        regions.append(np.ascontiguousarray(binary[top:bottom, left:right]))
+    return regions
+
+
+def prepare_page(gray: np.ndarray, dpi: Optional[float], target_dpi: int = TARGET_DPI) -> list:
+    """(region, dpi) for each region of a page"""
+    binary, dpi = preprocess(gray, dpi, target_dpi)
+    return [(region, dpi) for region in split_regions(binary, dpi)]
+
+
+def text_from_data(data: dict) -> tuple:
+    """(text, word confidences 0-100) from image_to_data output: lines in reading order, blank line between paragraphs"""
+    lines, confidences = {}, []
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        if not word:
+            continue
+        key = (data["page_num"][i], data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        conf = float(data["conf"][i])
+        if conf > 0:
+            confidences.append(conf)
+
+    parts, previous = [], None
+    for key, words in lines.items():
+        if previous is not None and key[:3] != previous[:3]:
+            parts.append("")
+        parts.append(" ".join(words))
+        previous = key
+    return "\n".join(parts), confidences
+
+
+def recognize(region: np.ndarray, dpi: float = TARGET_DPI) -> dict:
+    """One Tesseract pass over a region: {"text", "confidences"}"""
+    data = pytesseract.image_to_data(
+        Image.fromarray(region),
+        # Regions are single text blocks; skip page layout analysis
+        config=f"--psm 6 --dpi {round(dpi)}",
+        output_type=pytesseract.Output.DICT,
+    )
+    text, confidences = text_from_data(data)
+    return {"text": text, "confidences": confidences}
+
+
+def _load_pages(source) -> list:
+    """(grayscale array, dpi or None) per page of a path, file, PIL image or list of them"""
+    if isinstance(source, (list, tuple)):
+        return [page for item in source for page in _load_pages(item)]
+    image = source if isinstance(source, Image.Image) else Image.open(source)
+    pages = []
+    for frame in ImageSequence.Iterator(image):
+        dpi = frame.info.get("dpi") or image.info.get("dpi")
+        pages.append((np.asarray(frame.convert("L")), float(dpi[0]) if dpi and dpi[0] > 1 else None))
+    return pages
+
 
 class OCRHandler:
-    def __init__(self):
+    """
+    Shared OCR engine; the worker pool is started on first use and reused.
+    workers=0 runs everything in the calling process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, target_dpi: int = TARGET_DPI):
         self.confidence_threshold = 0.7
-    
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.target_dpi = target_dpi
+        self._pool = None
+
+    def _map(self, fn, *iterables) -> list:
+        items = list(zip(*iterables))
+        if self.workers <= 1 or len(items) <= 1:
+            return [fn(*args) for args in items]
+        if self._pool is None:
+            # spawn: forking a threaded server process (Streamlit) is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return list(self._pool.map(fn, *iterables))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def extract_text_from_image(self, image_path_or_pil: any):
         """
-        Extract text from image using Tesseract
-        Returns: (text, confidence, warnings)
+        Extract text from an image, a multi-page scan (TIFF) or a list of pages.
+        Returns: {"text", "confidence", "warnings", "needs_review", "pages", "regions"}
         """
-        if isinstance(image_path_or_pil, str):
-            image = Image.open(image_path_or_pil)
-        else:
-            image = image_path_or_pil
-        
-        # Extract text with details
-        data = pytesseract.image_to_data(
-            image,
-            output_type=pytesseract.Output.DICT
-        )
-        
-        # Calculate average confidence
-        confidences = [int(c) for c in data['conf'] if int(c) > 0]
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-        avg_confidence = avg_confidence / 100.0
-        
-        extracted_text = pytesseract.image_to_string(image)
-        
+        pages = _load_pages(image_path_or_pil)
+        page_regions = self._map(prepare_page, [g for g, _ in pages], [d for _, d in pages],
+                                 [self.target_dpi] * len(pages))
+        regions = [region for page in page_regions for region in page]
+        results = self._map(recognize, [r for r, _ in regions], [d for _, d in regions])
+
+        extracted_text = "\n\n".join(r["text"] for r in results if r["text"])
+        confidences = [c for r in results for c in r["confidences"]]
+        avg_confidence = sum(confidences) / len(confidences) / 100.0 if confidences else 0.0
+
         warnings = []
         if avg_confidence < self.confidence_threshold:
             warnings.append(f"⚠️ Low OCR confidence ({avg_confidence:.0%}). Please review and correct.")
-        
+
         if len(extracted_text.strip()) < 10:
             warnings.append("⚠️ Very little text detected. Image might be unclear.")
-        
+
         return {
             "text": extracted_text,
             "confidence": avg_confidence,
             "warnings": warnings,
-            "needs_review": avg_confidence < self.confidence_threshold
+            "needs_review": avg_confidence < self.confidence_threshold,
+            "pages": len(pages),
+            "regions": len(regions),
         }
@@ -0,0 +1,70 @@
+import hashlib
+import re
+import unicodedata
+
+# Bump when normalization changes so old keys are never confused with new ones
+PROBLEM_KEY_VERSION = 2
+
+_SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻", "0123456789+-")
+_SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+_UNICODE_SYMBOLS = {
+    "×": "*", "·": "*", "⋅": "*", "∗": "*",
+    "÷": "/", "∕": "/",
+    "−": "-", "–": "-", "—": "-",
+    "≤": "<=", "⩽": "<=", "≥": ">=", "⩾": ">=", "≠": "!=",
+    "√": "sqrt", "π": "pi", "∞": "oo",
+    "∫": "integral ", "∑": "sum ", "Σ": "sum ",
+    "θ": "theta", "α": "alpha", "β": "beta",
+}
+
+_LATEX_COMMANDS = [
+    (re.compile(r"\\(?:left|right|displaystyle)\b"), ""),
+    (re.compile(r"\\[,;:! ]"), " "),
+    (re.compile(r"\\(?:cdot|times)\b"), "*"),
+    (re.compile(r"\\div\b"), "/"),
+    (re.compile(r"\\(?:le|leq)\b"), "<="),
+    (re.compile(r"\\(?:ge|geq)\b"), ">="),
+    (re.compile(r"\\(?:ne|neq)\b"), "!="),
+    (re.compile(r"\\infty\b"), "oo"),
+    (re.compile(r"\\d?frac\{([^{}]*)\}\{([^{}]*)\}"), r"(\1)/(\2)"),
+    (re.compile(r"\\sqrt\{([^{}]*)\}"), r"sqrt(\1)"),
+    (re.compile(r"\\(pi|theta|alpha|beta|sin|cos|tan|log|ln|exp|int|sum|lim)\b"), r"\1"),
+]
+
+_SUPERSCRIPT_RUN = re.compile("[⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻]+")
+_SUBSCRIPT_RUN = re.compile("[₀₁₂₃₄₅₆₇₈₉]+")
+_OPERATOR_SPACING = re.compile(r"\s*([-+*/^=<>!(),\[\]{}|])\s*")
+# Words are case-folded; single letters keep their case (matrix A is not scalar a)
+_WORD = re.compile(r"[A-Za-z]{2,}")
+
+
+def normalize_problem(problem: str) -> str:
+    """
+    Canonical form of a problem statement.
+
+    Two inputs that differ only in whitespace, unicode vs ASCII maths,
+    LaTeX spacing or the case of their words normalize identically, e.g.
+    "Solve x² − 5x + 6 = 0" and "solve $x^2-5x+6=0$". Variable and function
+    names are kept: a solution written in x is not an answer for y, and
+    f(x) is not g(x).
+    """
+    text = _SUPERSCRIPT_RUN.sub(lambda m: "^" + m.group().translate(_SUPERSCRIPTS), problem)
+    text = _SUBSCRIPT_RUN.sub(lambda m: "_" + m.group().translate(_SUBSCRIPTS), text)
+    for symbol, replacement in _UNICODE_SYMBOLS.items():
+        text = text.replace(symbol, replacement)
+    text = unicodedata.normalize("NFKC", text)
+
+    text = text.replace("$", " ")
+    for pattern, replacement in _LATEX_COMMANDS:
+        text = pattern.sub(replacement, text)
+
+    text = _WORD.sub(lambda m: m.group().lower(), " ".join(text.split()))
+    text = _OPERATOR_SPACING.sub(r"\1", text)
+    return text.rstrip(" .?")
+
+
+def problem_key(problem: str) -> str:
+    """Stable content-addressed key for a problem, identical across processes"""
+    canonical = f"v{PROBLEM_KEY_VERSION}:{normalize_problem(problem)}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,97 @@
+import threading
+from typing import Callable, Optional
+
+
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.partial = None
+        self.version = 0
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs fn(emit); callers arriving
+    while it runs attach to it and get the same result or exception. fn may
+    call emit(partial) with its progress so far (e.g. the accumulated
+    streamed text); every attached caller's on_update sees those updates,
+    starting with the latest one when it joins. A slow consumer only skips
+    intermediate updates, it never holds up the leader.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"upstream_calls": 0, "coalesced": 0}
+
+    def saved_calls(self) -> int:
+        return self.stats["coalesced"]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def do(self, key: str, fn: Callable, on_update: Optional[Callable] = None) -> tuple:
+        """Return (result, shared); shared is True for callers that did not run fn themselves"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats["upstream_calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if leader:
+            return self._lead(key, flight, fn, on_update), False
+        return self._follow(flight, on_update), True
+
+    def _lead(self, key: str, flight: _Flight, fn: Callable, on_update: Optional[Callable]):
+        local = [on_update]
+
+        def emit(partial):
+            with flight.cond:
+                flight.partial = partial
+                flight.version += 1
+                flight.cond.notify_all()
+            if local[0] is not None:
+                try:
+                    local[0](partial)
+                except Exception:
+                    # The leader's own consumer went away (closed session);
+                    # keep generating for everyone else attached
+                    local[0] = None
+
+        try:
+            flight.result = fn(emit)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Drop the key first so later arrivals start a fresh call instead of reading a finished one
+            with self._lock:
+                del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _follow(self, flight: _Flight, on_update: Optional[Callable]):
+        seen = 0
+        while True:
+            with flight.cond:
+                while flight.version == seen and not flight.done:
+                    flight.cond.wait()
+                partial, version, done = flight.partial, flight.version, flight.done
+            if on_update is not None and version != seen:
+                on_update(partial)
+            seen = version
+            if done:
+                break
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
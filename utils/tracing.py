@@ -0,0 +1,304 @@
+"""
+Lightweight spans around real work, exported as OTLP/JSON and aggregated
+into per-stage latency histograms.
+
+    with span("retrieve", k=3) as s:
+        docs = retriever.retrieve(...)
+        s.set("documents", len(docs))
+
+Spans nest through contextvars, so a span opened inside another (in the same
+thread, asyncio task, or asyncio.to_thread call) becomes its child. When a
+root span ends, its whole trace is written as one line of the OTLP JSON file
+format (an ExportTraceServiceRequest per line, what the OpenTelemetry
+Collector's file exporter writes and its otlpjsonfile receiver reads).
+
+    python -m utils.tracing traces/spans.jsonl     # p50/p95/p99 per stage
+"""
+import contextvars
+import json
+import math
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+SERVICE_NAME = "ai-math-mentor"
+# The trace file is rotated to <path>.1 past this size, and startup reads at most this much of it
+MAX_TRACE_FILE_BYTES = 64 * 1024 * 1024
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent", "start_ns", "end_ns", "attributes", "error", "spans")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+        # On the root: every finished span of the trace, itself last, exported in one piece
+        self.spans = [] if parent is None else None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_s(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    @property
+    def root(self) -> "Span":
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: constant memory however many samples,
+    percentiles accurate to the bucket width (~4.5%), mergeable across
+    processes by adding counts.
+    """
+
+    GROWTH = 2 ** (1 / 16)
+    MIN_S = 1e-5
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        return max(0, math.ceil(math.log(max(seconds, self.MIN_S) / self.MIN_S, self.GROWTH)))
+
+    def _upper(self, bucket: int) -> float:
+        return self.MIN_S * self.GROWTH ** bucket
+
+    def record(self, seconds: float):
+        bucket = self._bucket(seconds)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile sample, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._upper(bucket), self.max_s)
+        return self.max_s
+
+    def summary(self) -> dict:
+        return {
+            "n": self.count,
+            "mean_ms": self.total_s / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max_s * 1000,
+        }
+
+
+class StageHistograms:
+    """One LatencyHistogram per span name, shared by every session in the process"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def summary(self) -> list:
+        """[{"stage", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}], slowest p95 first"""
+        with self._lock:
+            rows = [{"stage": name, **h.summary()} for name, h in self._histograms.items()]
+        return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+    @classmethod
+    def from_file(cls, path: str, max_bytes: Optional[int] = MAX_TRACE_FILE_BYTES) -> "StageHistograms":
+        """Rebuild the histograms from the last max_bytes of an OTLP JSON lines file, e.g. across restarts"""
+        histograms = cls()
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - max_bytes) if max_bytes else 0)
+            if f.tell():
+                f.readline()  # partial line at the cut
+            for line in f:
+                try:
+                    request = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                for resource in request.get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        for span in scope.get("spans", []):
+                            seconds = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9
+                            histograms.record(span["name"], seconds)
+        return histograms
+
+
+class OTLPJsonFileExporter:
+    """
+    Append each finished trace to a JSON lines file in OTLP/JSON encoding.
+    Past max_bytes the file is renamed to <path>.1 (replacing the previous
+    one) and a new file is started, so disk use stays under 2 x max_bytes.
+    """
+
+    def __init__(self, path: str, service_name: str = SERVICE_NAME, max_bytes: int = MAX_TRACE_FILE_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self._size = self.path.stat().st_size if self.path.exists() else 0
+        self._lock = threading.Lock()
+
+    def export(self, spans: list):
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "utils.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+        line = (json.dumps(request, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._size and self._size + len(line) > self.max_bytes:
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+                self._size = 0
+            with open(self.path, 'ab') as f:
+                f.write(line)
+            self._size += len(line)
+
+
+class Tracer:
+    """Creates spans, records every finished span in the histograms and exports whole traces"""
+
+    def __init__(self, exporter: Optional[OTLPJsonFileExporter] = None, histograms: Optional[StageHistograms] = None):
+        self.exporter = exporter
+        self.histograms = histograms or StageHistograms()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        current = Span(name, _current.get(), attributes)
+        token = _current.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(current)
+
+    def _finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        self.histograms.record(span.name, span.duration_s)
+        root = span.root
+        with self._lock:
+            root.spans.append(span)
+            if span is not root:
+                return
+            spans = list(root.spans)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except OSError:
+                pass  # A full disk must not fail the request being traced
+
+
+_tracer = Tracer()
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Open a span on the process-wide tracer (see set_tracer)"""
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def trace_rows(root: Span) -> list:
+    """A finished trace as table rows: offset from the root's start and duration of each span"""
+    return [{
+        "stage": s.name,
+        "start_ms": (s.start_ns - root.start_ns) / 1e6,
+        "duration_ms": s.duration_s * 1000,
+        "status": "error" if s.error else "ok",
+        **s.attributes,
+    } for s in sorted(root.spans, key=lambda s: s.start_ns)]
+
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Per-stage latency percentiles from an OTLP JSON lines file")
+    parser.add_argument("path", nargs="?", default=os.getenv("TRACE_FILE", "traces/spans.jsonl"))
+    args = parser.parse_args()
+    if not Path(args.path).exists():
+        sys.exit(f"No trace file at {args.path}")
+
+    rows = StageHistograms.from_file(args.path).summary()
+    columns = ["stage", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    print("  ".join(f"{c:>10}" if c != "stage" else f"{c:<16}" for c in columns))
+    for row in rows:
+        print("  ".join(f"{row[c]:<16}" if c == "stage" else f"{row[c]:>10}" if c == "n" else f"{row[c]:>10.1f}"
+                        for c in columns))
+
+
+if __name__ == "__main__":
+    main()
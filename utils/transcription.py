@@ -0,0 +1,214 @@
+"""
+Speech-to-text behind a transcript cache, with pluggable backends.
+
+Audio goes to the backend straight from memory as a (filename, bytes)
+upload, named after its real container format, so nothing touches disk.
+Transcripts are cached by the SHA-256 of the audio plus backend, model and
+language, which makes Streamlit reruns with the same clip attached free.
+
+Recordings longer than max_chunk_s (a student reading out a whole
+worksheet) are split on silence (utils.audio_segments) and the chunks are
+transcribed concurrently on a shared worker pool, which also bounds the
+size of each upload. Partial transcripts, stitched in order, go to
+on_partial as chunks finish.
+
+A backend has a `name` and transcribe(audio, filename, language) -> str.
+Select one with ASR_BACKEND=groq|openai|replay; replay answers from
+recorded fixtures (utils.llm_replay) for tests and offline benchmarks.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+from utils.audio_segments import segment, stitch
+from utils.cache import TieredCache
+from utils.single_flight import SingleFlight
+from utils.tracing import span
+
+DEFAULT_BACKEND = "groq"
+# Groq bills at least 10 s per request, so chunks stay well above that
+MAX_CHUNK_S = 30.0
+# Bump when the request sent to the backends changes, so old transcripts are not reused
+TRANSCRIPT_VERSION = 1
+# Largest single upload the Whisper endpoints accept
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# (offset, magic bytes, extension)
+_SIGNATURES = [
+    (0, b"fLaC", "flac"),
+    (0, b"OggS", "ogg"),
+    (0, b"ID3", "mp3"),
+    (0, b"\x1a\x45\xdf\xa3", "webm"),
+    (4, b"ftyp", "m4a"),
+]
+
+
+def audio_format(audio: bytes, filename: Optional[str] = None) -> str:
+    """Container format from the file's magic bytes, else its extension, else mp3"""
+    if audio[:4] == b"RIFF" and audio[8:12] == b"WAVE":
+        return "wav"
+    for offset, magic, extension in _SIGNATURES:
+        if audio[offset:offset + len(magic)] == magic:
+            return extension
+    # MPEG audio frame sync without an ID3 tag
+    if len(audio) > 1 and audio[0] == 0xFF and audio[1] & 0xE0 == 0xE0:
+        return "mp3"
+    if filename and "." in filename:
+        return filename.rsplit(".", 1)[1].lower()
+    return "mp3"
+
+
+class WhisperAPIBackend:
+    """Whisper behind an OpenAI-compatible audio.transcriptions endpoint"""
+
+    def __init__(self, client, model: str):
+        self.client = client
+        self.model = model
+        self.name = model
+
+    def transcribe(self, audio: bytes, filename: str, language: Optional[str] = None) -> str:
+        if self.client is None:
+            raise ValueError(f"No API client configured for {self.name}")
+        params = {"language": language} if language else {}
+        transcript = self.client.audio.transcriptions.create(file=(filename, audio), model=self.model, **params)
+        return transcript if isinstance(transcript, str) else (getattr(transcript, "text", None) or "")
+
+
+class GroqWhisperBackend(WhisperAPIBackend):
+    def __init__(self, client=None, model: str = "whisper-large-v3-turbo"):
+        if client is None and os.getenv("GROQ_API_KEY"):
+            from agents.registry import get_groq_client
+            client = get_groq_client(os.environ["GROQ_API_KEY"])
+        super().__init__(client, model)
+
+
+class OpenAIWhisperBackend(WhisperAPIBackend):
+    def __init__(self, client=None, model: str = "whisper-1"):
+        if client is None:
+            from openai import OpenAI
+            from agents.registry import get_http_client
+            client = OpenAI(http_client=get_http_client())
+        super().__init__(client, model)
+
+
+class ReplayBackend(WhisperAPIBackend):
+    """Recorded transcripts from a utils.llm_replay fixture file; no network"""
+
+    def __init__(self, client=None, model: str = "whisper-large-v3-turbo", fixtures: Optional[str] = None,
+                 timing: str = "none"):
+        from utils.llm_replay import ReplayClient
+        fixtures = fixtures or os.getenv("ASR_REPLAY_FIXTURES", "benchmarks/fixtures/replay.jsonl")
+        super().__init__(client or ReplayClient(fixtures, timing=timing), model)
+        self.name = f"replay:{model}"
+
+
+BACKENDS = {
+    "groq": GroqWhisperBackend,
+    "openai": OpenAIWhisperBackend,
+    "replay": ReplayBackend,
+}
+
+
+def get_asr_backend(name: str = None, **kwargs):
+    """Construct the backend called name (default: ASR_BACKEND or groq)"""
+    name = name or os.getenv("ASR_BACKEND", DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
+
+
+class Transcriber:
+    """
+    Transcribe audio bytes through a backend, behind an optional transcript
+    cache. With a SingleFlight, concurrent requests for the same clip share
+    one backend call (and its partial transcripts).
+    """
+
+    def __init__(self, backend, cache: Optional[TieredCache] = None, single_flight: Optional[SingleFlight] = None,
+                 max_chunk_s: float = MAX_CHUNK_S, workers: int = 4):
+        self.backend = backend
+        self.cache = cache
+        self.single_flight = single_flight
+        self.max_chunk_s = max_chunk_s
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr")
+
+    def cache_key(self, audio: bytes, language: Optional[str]) -> str:
+        material = json.dumps({
+            "audio": hashlib.sha256(audio).hexdigest(),
+            "backend": self.backend.name,
+            "language": language,
+            "version": TRANSCRIPT_VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def transcribe(self, audio: bytes, filename: Optional[str] = None, language: Optional[str] = "en",
+                   on_partial: Optional[Callable[[str], None]] = None) -> dict:
+        """
+        Return {"text", "cached", "format", "chunks", "elapsed_s"}. For
+        chunked recordings on_partial(text so far) is called, from this
+        thread, each time the next chunk in order is done.
+        """
+        start = time.perf_counter()
+        extension = audio_format(audio, filename)
+        with span("asr", backend=self.backend.name, audio_bytes=len(audio), format=extension) as s:
+            key = self.cache_key(audio, language)
+            text = self.cache.get(key) if self.cache is not None else None
+            cached = text is not None
+            chunks = 0
+            if not cached:
+                def call(emit):
+                    return self._transcribe(audio, extension, language, emit)
+
+                if self.single_flight is not None:
+                    (text, chunks), _ = self.single_flight.do(key, call, on_update=on_partial)
+                else:
+                    (text, chunks) = call(on_partial or (lambda partial: None))
+                if self.cache is not None and text:
+                    self.cache.set(key, text)
+            s.set("cached", cached)
+            s.set("chunks", chunks)
+        return {"text": text, "cached": cached, "format": extension, "chunks": chunks,
+                "elapsed_s": time.perf_counter() - start}
+
+    def _transcribe(self, audio: bytes, extension: str, language: Optional[str], emit: Callable) -> tuple:
+        """(text, number of backend requests)"""
+        pieces = segment(audio, extension, self.max_chunk_s)
+        if pieces is None:
+            if len(audio) > MAX_UPLOAD_BYTES:
+                raise ValueError(f"{extension} recording of {len(audio) / 2 ** 20:.0f} MB is over the "
+                                 f"{MAX_UPLOAD_BYTES // 2 ** 20} MB upload limit and cannot be split here "
+                                 "(needs pydub and ffmpeg); upload it as WAV or a shorter clip")
+            return self.backend.transcribe(audio, f"audio.{extension}", language).strip(), 1
+
+        overlapped = [overlaps for _, overlaps in pieces]
+        # Each chunk gets its own copy of the context, so its span nests under "asr"
+        futures = {self._pool.submit(contextvars.copy_context().run, self._transcribe_chunk, piece, language): i
+                   for i, (piece, _) in enumerate(pieces)}
+        texts, shown = [None] * len(pieces), 0
+        try:
+            for future in as_completed(futures):
+                texts[futures[future]] = future.result()
+                ready = next((i for i, text in enumerate(texts) if text is None), len(texts))
+                if shown < ready < len(texts):
+                    shown = ready
+                    emit(stitch(texts[:ready], overlapped[:ready]))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return stitch(texts, overlapped), len(pieces)
+
+    def _transcribe_chunk(self, piece: bytes, language: Optional[str]) -> str:
+        # Chunks are cached too, so a retry after one chunk failed only resends that chunk
+        key = self.cache_key(piece, language)
+        text = self.cache.get(key) if self.cache is not None else None
+        if text is None:
+            with span("asr_chunk", audio_bytes=len(piece)):
+                text = self.backend.transcribe(piece, "audio.wav", language).strip()
+            if self.cache is not None and text:
+                self.cache.set(key, text)
+        return text